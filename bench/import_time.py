@@ -0,0 +1,70 @@
+"""Measure the cold-start cost of importing owt, and the per-adaptor prelude cost.
+
+Usage: python bench/import_time.py [--runs N]
+
+Each import is timed in a fresh interpreter, reporting the fastest and median of
+the runs. Run with -X importtime to see where the time goes, e.g.:
+
+    python -X importtime -c "import owt.server" 2>&1 | sort -t'|' -k2 -n | tail
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import timeit
+
+MODULES = ["owt", "owt.client", "owt.server"]
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def import_secs(module: str) -> float:
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - start)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+    )
+    return float(out.stdout)
+
+
+def prelude_secs(number: int = 10000) -> tuple[float, float]:
+    """Seconds per adaptor to bind the prelude, by import and from the prebuilt names."""
+    from owt.compiler import PRELUDE, prelude
+
+    base = {"__builtins__": __builtins__}
+
+    def run_prelude() -> None:
+        exec(PRELUDE, dict(base))  # noqa: S102
+
+    by_import = timeit.timeit(run_prelude, number=number)
+    prebuilt = timeit.timeit(lambda: dict(base).update(prelude()), number=number)
+    return by_import / number, prebuilt / number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+    for module in MODULES:
+        runs = [import_secs(module) for _ in range(args.runs)]
+        print(
+            f"import {module:12} min {min(runs) * 1000:7.1f}ms "
+            f"median {statistics.median(runs) * 1000:7.1f}ms"
+        )
+    by_import, prebuilt = prelude_secs()
+    print(
+        f"prelude      by import {by_import * 1e6:6.1f}us "
+        f"prebuilt {prebuilt * 1e6:6.1f}us"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Measure the cost of carrying many kwargs through pipeline stages.
+
+Usage: python bench/kwargs.py [--keys N] [--stages N]
+
+Runs a pipeline of stages that each pass the kwargs on, in the ways built-in
+stages do (Kwargs, NameOutput, Identity, Cond, Exec and KeepKWs), reporting the
+time per call and the peak memory traced while running one.
+"""
+
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from owt.summat.adaptor import Adaptor, CallOut, KeepKWs, Pipeline
+from owt.summat.functional import Cond, Const, Exec, Identity
+from owt.summat.io import Kwargs, NameOutput
+
+
+class Keep(Adaptor):
+    def call(self, **kwargs) -> CallOut:
+        return KeepKWs(kwargs.get("__last__"))
+
+
+def stages(n: int) -> list[Adaptor]:
+    cycle = [
+        Kwargs(default=0),
+        NameOutput("named"),
+        Identity(),
+        Cond(Identity(), Identity()),
+        Exec(lambda **_: None),
+        Keep(),
+    ]
+    return [Const(1)] + [cycle[i % len(cycle)] for i in range(n)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keys", type=int, default=100)
+    parser.add_argument("--stages", type=int, default=30)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+    kwargs = {f"k{i}": "x" * 1024 for i in range(args.keys)}
+    pipeline = Pipeline(stages(args.stages))
+    secs = timeit.timeit(lambda: pipeline(**kwargs), number=args.number)
+    tracemalloc.start()
+    pipeline(**kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{args.keys} keys, {args.stages} stages: "
+        f"{secs / args.number * 1e6:.1f}us per call, peak {peak / 1024:.1f}KiB"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Measure the per-stage overhead of running Owt pipelines.
+
+Usage: python bench/pipeline.py [--stages N ...]
+
+Compares pipelines of trivial F stages run as a flat Pipeline, as pipe() builds
+them, against the same stages chained with Adaptor.compose, which recurses once
+per stage.
+"""
+
+import argparse
+import functools
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from owt.summat.adaptor import Adaptor, Pipeline
+from owt.summat.functional import Const, F
+
+
+def per_call_secs(adaptor: Adaptor, number: int) -> float:
+    return timeit.timeit(lambda: adaptor(x=0), number=number) / number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stages", type=int, nargs="+", default=[1, 10, 30, 100])
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+    for n in args.stages:
+        stages = [Const(0)] + [F(lambda x: x + 1) for _ in range(n)]
+        flat = per_call_secs(Pipeline(stages), args.number)
+        try:
+            composed = per_call_secs(
+                functools.reduce(Adaptor.compose, stages), args.number
+            )
+            nested = f"{composed * 1e6:8.1f}us ({composed / n * 1e9:6.0f}ns/stage)"
+        except RecursionError:
+            nested = "RecursionError"
+        print(
+            f"{n:5} stages: flat {flat * 1e6:8.1f}us "
+            f"({flat / n * 1e9:6.0f}ns/stage), composed {nested}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,16 @@
-function makeRequest(code, text, speaker, sentenceTemplate, splitType) {
+async function registerCode(url, code) {
+  // Send the code once; the stream URL then carries only its hash.
+  const response = await fetch(new URL('/_owt/register', url), {
+    method: 'POST',
+    headers: {'Content-Type': 'application/json'},
+    body: JSON.stringify({'code_b64': btoa(code)}),
+  });
+  return (await response.json())['code_hash'];
+}
+
+function makeRequest(codeHash, text, speaker, sentenceTemplate, splitType) {
   return {
-    'code_b64': btoa(code),
+    'code_hash': codeHash,
     'kwargs_b64': btoa(JSON.stringify({
       'text': text.replace(/\n/g, '\\n'),
       'speaker': speaker,
@@ -11,16 +21,17 @@ function makeRequest(code, text, speaker, sentenceTemplate, splitType) {
 }
 
 function audioUrl(
-  url, code, text, speaker, sentenceTemplate, splitType) {
+  url, codeHash, text, speaker, sentenceTemplate, splitType) {
   const request = makeRequest(
-    code, text, speaker, sentenceTemplate, splitType);
+    codeHash, text, speaker, sentenceTemplate, splitType);
   return url + '?' + $.param(request);
 }
 
 async function getAudio(
   url, code, text, speaker, sentenceTemplate, splitType, onChunk) {
+  const codeHash = await registerCode(url, code);
   const source = new EventSource(
-    audioUrl(url, code, text, speaker, sentenceTemplate, splitType));
+    audioUrl(url, codeHash, text, speaker, sentenceTemplate, splitType));
   source.onmessage = function(event) {
     if (event.data.toLowerCase() == 'done') {
       source.close();
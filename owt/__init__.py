@@ -1,5 +1,24 @@
+import importlib
+from typing import Any
+
+import owt
+from owt import summat
 from owt.summat import syntax
-import owt.lib.shell
 
 pipe = syntax.pipe
-shell = owt.lib.shell
+
+# What adaptors get from the prelude, `from owt import *`. summat is imported anyway as
+# the package of syntax; helpers in owt.lib are left out, so that the prelude does not
+# import them. The compiler binds shell and lib to adaptors lazily instead, and they are
+# also reached as e.g. owt.shell or owt.lib.shell.
+__all__ = ["owt", "pipe", "summat", "syntax"]
+
+# Rarely used helpers, imported on first use.
+_LAZY = {"lib": "owt.lib", "shell": "owt.lib.shell"}
+
+
+def __getattr__(name: str) -> Any:
+    if module_name := _LAZY.get(name):
+        module = globals()[name] = importlib.import_module(module_name)
+        return module
+    raise AttributeError(f"module 'owt' has no attribute {name!r}")
@@ -0,0 +1,213 @@
+import contextlib
+import dataclasses
+import math
+import threading
+import time
+import types
+import weakref
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass
+from typing import Any
+
+
+class Rejected(RuntimeError):
+    """Not admitted: 429 if the wait queue was full, 503 if the wait timed out."""
+
+    def __init__(self, message: str, status: int, retry_after: int) -> None:
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+@dataclass(kw_only=True)
+class Gate:
+    """A semaphore with a bounded queue of waiters, keeping statistics on its use."""
+
+    name: str
+    limit: int
+    # Waiters beyond this are rejected at once (None for no bound).
+    max_waiting: int | None = 64
+    # Waiters are rejected after this many seconds (None to wait indefinitely).
+    max_wait_secs: float | None = 30.0
+    in_flight: int = 0
+    waiting: int = 0
+    admitted: int = 0
+    rejected: int = 0
+    timed_out: int = 0
+    wait_secs: float = 0.0
+    max_wait_seen: float = 0.0
+    # Moving average of how long slots are held, for estimating Retry-After.
+    hold_secs: float = 0.0
+    _cond: threading.Condition = dataclasses.field(default_factory=threading.Condition)
+
+    def retry_after(self) -> int:
+        """Seconds until the queue ahead is likely to have drained."""
+        return max(1, math.ceil(self.hold_secs * (self.waiting + 1) / self.limit))
+
+    def acquire(self) -> None:
+        start = time.monotonic()
+        with self._cond:
+            if self.in_flight >= self.limit or self.waiting:
+                if self.max_waiting is not None and self.waiting >= self.max_waiting:
+                    self.rejected += 1
+                    raise Rejected(
+                        f"Too many requests waiting for {self.name}",
+                        429,
+                        self.retry_after(),
+                    )
+                self.waiting += 1
+                try:
+                    admitted = self._cond.wait_for(
+                        lambda: self.in_flight < self.limit, self.max_wait_secs
+                    )
+                finally:
+                    self.waiting -= 1
+                if not admitted:
+                    self.timed_out += 1
+                    raise Rejected(
+                        f"Timed out waiting for {self.name}", 503, self.retry_after()
+                    )
+            self.in_flight += 1
+            self.admitted += 1
+            waited = time.monotonic() - start
+            self.wait_secs += waited
+            self.max_wait_seen = max(self.max_wait_seen, waited)
+
+    def release(self, held_secs: float) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self.hold_secs = (
+                held_secs
+                if self.admitted <= 1
+                else 0.8 * self.hold_secs + 0.2 * held_secs
+            )
+            self._cond.notify()
+
+    @contextlib.contextmanager
+    def hold(self) -> Iterator[None]:
+        self.acquire()
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "mean_wait_secs": self.wait_secs / self.admitted if self.admitted else 0.0,
+            "max_wait_secs": self.max_wait_seen,
+            "mean_hold_secs": self.hold_secs,
+        }
+
+
+@dataclass(kw_only=True)
+class Admission:
+    """Limits how many adaptors run at once: in all, per path prefix and per code hash.
+
+    A request holds a slot from each limit that applies to it for as long as it runs,
+    including streaming its response. Adaptors may also hold slots of named resources,
+    e.g. resource("parler-model", 1) around using a model that can serve one at a time.
+    Requests wait for slots in bounded queues, and are rejected if those are full or
+    the wait is too long.
+
+    Slots are held within one process. Resource slots are divided between the
+    resource_share processes running adaptors, so that they hold roughly the declared
+    number in all, though each process has at least one.
+    """
+
+    # Concurrent requests in all (None for no limit).
+    limit: int | None = None
+    # Concurrent requests for paths under each prefix.
+    path_limits: dict[str, int] = dataclasses.field(default_factory=dict)
+    # Concurrent requests for each code hash (None for no limit).
+    code_limit: int | None = None
+    max_waiting: int | None = 64
+    max_wait_secs: float | None = 30.0
+    resource_share: int = 1
+    _gates: dict[str, Gate] = dataclasses.field(default_factory=dict)
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.limit or self.path_limits or self.code_limit)
+
+    def gate(self, name: str, limit: int) -> Gate:
+        if (gate := self._gates.get(name)) is None:
+            with self._lock:
+                if (gate := self._gates.get(name)) is None:
+                    gate = self._gates[name] = Gate(
+                        name=name,
+                        limit=limit,
+                        max_waiting=self.max_waiting,
+                        max_wait_secs=self.max_wait_secs,
+                    )
+        return gate
+
+    def gates(self, path: str, code_hash: str) -> list[Gate]:
+        """The gates a request passes, most specific first, always in the same order."""
+        gates = []
+        if prefix := max(
+            (p for p in self.path_limits if path.startswith(p)), key=len, default=None
+        ):
+            gates.append(self.gate(f"path:{prefix}", self.path_limits[prefix]))
+        if self.code_limit:
+            gates.append(self.gate(f"code:{code_hash[:12]}", self.code_limit))
+        if self.limit:
+            gates.append(self.gate("global", self.limit))
+        return gates
+
+    def admit(self, path: str, code_hash: str) -> contextlib.ExitStack:
+        """Slots for a request, to be closed when it is done; raises Rejected."""
+        stack = contextlib.ExitStack()
+        try:
+            for gate in self.gates(path, code_hash):
+                stack.enter_context(gate.hold())
+        except BaseException:
+            stack.close()
+            raise
+        return stack
+
+    def resource(self, name: str, slots: int = 1) -> contextlib.AbstractContextManager:
+        """Hold one of slots for a named resource, declared with slots on first use."""
+        share = max(1, slots // self.resource_share)
+        return self.gate(f"resource:{name}", share).hold()
+
+    def stats(self) -> dict[str, Any]:
+        return {name: gate.stats() for name, gate in list(self._gates.items())}
+
+
+def held_until_done(result: Any, slots: contextlib.ExitStack) -> Any:
+    """Release slots once a result is produced, or once a stream result is consumed."""
+    held: Iterator[Any] | AsyncIterator[Any]
+    match result:
+        case (types.GeneratorType() | types.AsyncGeneratorType() as chunks, headers):
+            return held_until_done(chunks, slots), headers
+        case types.GeneratorType():
+            held = _held(result, slots)
+        case types.AsyncGeneratorType():
+            held = _held_async(result, slots)
+        case _:
+            slots.close()
+            return result
+    # Also release them if the stream is dropped without being started.
+    weakref.finalize(held, slots.close)
+    return held
+
+
+def _held(chunks: Iterator[Any], slots: contextlib.ExitStack) -> Iterator[Any]:
+    with slots:
+        yield from chunks
+
+
+async def _held_async(
+    chunks: AsyncIterator[Any], slots: contextlib.ExitStack
+) -> AsyncIterator[Any]:
+    with slots:
+        async for chunk in chunks:
+            yield chunk
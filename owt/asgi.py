@@ -0,0 +1,253 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import io
+import logging
+import sys
+from collections.abc import (
+    AsyncGenerator,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterator,
+)
+from dataclasses import dataclass
+from typing import Any
+
+from flask import Response
+
+logger = logging.getLogger(__name__)
+
+# Set in the WSGI environ of requests served by App, to the event loop serving them.
+LOOP_KEY = "owt.asgi.loop"
+
+type Scope = dict[str, Any]
+type Receive = Callable[[], Awaitable[dict[str, Any]]]
+type Send = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+class AsyncResponse(Response):
+    """A response with an async body, streamed from the event loop serving App."""
+
+    # The body is not a sequence to measure, though an empty one stands in for it.
+    automatically_set_content_length = False
+
+    def __init__(self, body: AsyncIterable[Any], **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.body = body
+
+
+def iter_async[T](agen: AsyncIterator[T]) -> Iterator[T]:
+    """Iterate an async generator synchronously, for servers without an event loop."""
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(anext(agen))
+            except StopAsyncIteration:
+                return
+    finally:
+        if aclose := getattr(agen, "aclose", None):
+            loop.run_until_complete(aclose())
+        loop.close()
+
+
+def await_result(awaitable: Awaitable[Any], environ: dict[str, Any]) -> Any:
+    """Complete an async adaptor's result from the (worker) thread handling its request.
+
+    Under App the awaitable runs on the serving event loop, otherwise on its own.
+    """
+    if loop := environ.get(LOOP_KEY):
+        return asyncio.run_coroutine_threadsafe(_wrap(awaitable), loop).result()
+    return asyncio.run(_wrap(awaitable))
+
+
+async def _wrap(awaitable: Awaitable[Any]) -> Any:
+    return await awaitable
+
+
+def environ(
+    scope: Scope, body: bytes, loop: asyncio.AbstractEventLoop
+) -> dict[str, Any]:
+    """A WSGI environ for an ASGI HTTP request."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    env = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+        LOOP_KEY: loop,
+    }
+    for name, value in scope.get("headers", []):
+        key = name.decode("latin1").upper().replace("-", "_")
+        value = value.decode("latin1")
+        if key not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            key = f"HTTP_{key}"
+            if key in env:
+                value = f"{env[key]},{value}"
+        env[key] = value
+    return env
+
+
+@dataclass(kw_only=True)
+class App:
+    """Serves a Flask app over ASGI, streaming async generator responses on the event loop.
+
+    Requests are dispatched by Flask as usual, in a bounded pool of threads so that
+    blocking adaptors don't stall the loop. A response body that is an async iterator
+    is then streamed from the loop without holding a thread, as are the gaps between
+    chunks of a synchronous stream, so idle and slow streaming clients cost no threads.
+    """
+
+    flask_app: Any
+    threads: int = 32
+    on_startup: Callable[[], None] | None = None
+    _executor: concurrent.futures.ThreadPoolExecutor | None = None
+
+    @property
+    def executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.threads, thread_name_prefix="owt-asgi"
+            )
+        return self._executor
+
+    async def offload[T](self, f: Callable[..., T], *args: Any) -> T:
+        # Carry over context variables, including the Flask request context.
+        ctx = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(ctx.run, f, *args)
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        match scope["type"]:
+            case "http":
+                await self.http(scope, receive, send)
+            case "lifespan":
+                await self.lifespan(receive, send)
+
+    async def lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            match message["type"]:
+                case "lifespan.startup":
+                    if self.on_startup:
+                        self.on_startup()
+                    await send({"type": "lifespan.startup.complete"})
+                case "lifespan.shutdown":
+                    self.executor.shutdown(wait=False, cancel_futures=True)
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+    async def http(self, scope: Scope, receive: Receive, send: Send) -> None:
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        env = environ(scope, bytes(body), asyncio.get_running_loop())
+        ctx = self.flask_app.request_context(env)
+        ctx.push()
+        try:
+            response = await self.offload(self.dispatch)
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": response.status_code,
+                    "headers": [
+                        (k.lower().encode("latin1"), v.encode("latin1"))
+                        for k, v in response.headers.to_wsgi_list()
+                    ],
+                }
+            )
+            streaming = asyncio.ensure_future(self.stream(response, send))
+            disconnected = asyncio.ensure_future(wait_disconnect(receive))
+            await asyncio.wait(
+                [streaming, disconnected], return_when=asyncio.FIRST_COMPLETED
+            )
+            if not streaming.done():
+                logger.info("Client disconnected from %s", scope["path"])
+            streaming.cancel()
+            disconnected.cancel()
+            await asyncio.gather(streaming, disconnected, return_exceptions=True)
+        finally:
+            ctx.pop()
+
+    def dispatch(self) -> Any:
+        try:
+            return self.flask_app.full_dispatch_request()
+        except Exception as e:  # noqa: BLE001 - Flask reports it, as under WSGI
+            return self.flask_app.handle_exception(e)
+
+    async def stream(self, response: Any, send: Send) -> None:
+        chunks = self.chunks(response)
+        try:
+            async for chunk in chunks:
+                if chunk:
+                    await send(
+                        {"type": "http.response.body", "body": chunk, "more_body": True}
+                    )
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await chunks.aclose()
+            try:
+                await self.offload(response.close)
+            except Exception as e:
+                # e.g. a synchronous stream still producing its abandoned chunk
+                logger.warning("Error closing response: %s", e, exc_info=True)
+
+    async def chunks(self, response: Any) -> AsyncGenerator[bytes]:
+        if isinstance(response, AsyncResponse):
+            body = response.body
+            try:
+                async for chunk in body:
+                    yield (
+                        chunk.encode("utf-8")
+                        if isinstance(chunk, str)
+                        else bytes(chunk)
+                    )
+            finally:
+                if aclose := getattr(body, "aclose", None):
+                    await aclose()
+            return
+        # Produce each chunk of a synchronous body in a thread, releasing it between chunks.
+        done = object()
+        it = response.iter_encoded()
+        while (chunk := await self.offload(next, it, done)) is not done:
+            yield chunk
+
+
+async def wait_disconnect(receive: Receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+def serve(app: App, address: str, port: int) -> None:
+    try:
+        import uvicorn
+    except ImportError:
+        raise RuntimeError(
+            "ASGI mode needs uvicorn: pip install -r requirements.asgi.txt"
+        )
+    uvicorn.run(app, host=address, port=int(port), lifespan="on")
@@ -0,0 +1,136 @@
+import concurrent.futures
+import dataclasses
+import functools
+import threading
+import time
+import weakref
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from typing import Any
+
+# Batchers in use, for reporting in server stats.
+BATCHERS: "weakref.WeakSet[Batcher]" = weakref.WeakSet()
+
+
+@dataclass(kw_only=True)
+class Batch:
+    items: list[Any] = dataclasses.field(default_factory=list)
+    futures: list[concurrent.futures.Future] = dataclasses.field(default_factory=list)
+    full: threading.Event = dataclasses.field(default_factory=threading.Event)
+    opened: float = dataclasses.field(default_factory=time.monotonic)
+
+
+@dataclass(kw_only=True, eq=False)
+class Batcher:
+    """Runs a function over items from concurrent callers in batches.
+
+    fn takes a list of items and returns a list of their results, in order. Each call
+    adds its items to the batch being collected and waits for their results. The first
+    call into a batch runs it, once it has max_size items or max_wait_secs have passed,
+    so batching needs no threads of its own. Calls with different kwargs, which are
+    passed on to fn, are batched separately, e.g. for different models or voices.
+
+    Batches for the same kwargs may run concurrently; guard fn with a resource or lock
+    if it can only run one at a time.
+    """
+
+    fn: Callable[..., list[Any]]
+    max_size: int = 8
+    max_wait_secs: float = 0.01
+    name: str = ""
+    batches: int = 0
+    items: int = 0
+    largest: int = 0
+    _collecting: dict[Hashable, Batch] = dataclasses.field(default_factory=dict)
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+
+    def __post_init__(self) -> None:
+        self.name = self.name or getattr(self.fn, "__qualname__", repr(self.fn))
+        BATCHERS.add(self)
+
+    def __call__(self, item: Any, **kwargs: Any) -> Any:
+        return self.map([item], **kwargs)[0]
+
+    def map(self, items: list[Any], **kwargs: Any) -> list[Any]:
+        """fn's results for items, computed in batches with other callers' items."""
+        key = tuple(sorted(kwargs.items()))
+        futures = []
+        leading = []
+        with self._lock:
+            for item in items:
+                if (batch := self._collecting.get(key)) is None:
+                    batch = self._collecting[key] = Batch()
+                    leading.append(batch)
+                future: concurrent.futures.Future = concurrent.futures.Future()
+                batch.items.append(item)
+                batch.futures.append(future)
+                futures.append(future)
+                if len(batch.items) >= self.max_size:
+                    del self._collecting[key]
+                    batch.full.set()
+        for batch in leading:
+            self._run(key, batch, kwargs)
+        return [future.result() for future in futures]
+
+    async def amap(self, items: list[Any], **kwargs: Any) -> list[Any]:
+        """map, for async adaptors, without blocking the event loop."""
+        import asyncio
+
+        return await asyncio.to_thread(functools.partial(self.map, items, **kwargs))
+
+    def _run(self, key: Hashable, batch: Batch, kwargs: dict[str, Any]) -> None:
+        batch.full.wait(max(0.0, batch.opened + self.max_wait_secs - time.monotonic()))
+        with self._lock:
+            if self._collecting.get(key) is batch:
+                del self._collecting[key]
+            self.batches += 1
+            self.items += len(batch.items)
+            self.largest = max(self.largest, len(batch.items))
+        try:
+            results = self.fn(batch.items, **kwargs)
+            if len(results) != len(batch.items):
+                raise ValueError(
+                    f"{self.name} returned {len(results)} results "
+                    f"for {len(batch.items)} items"
+                )
+        except Exception as e:  # noqa: BLE001 - raised to each caller in the batch
+            for future in batch.futures:
+                future.set_exception(e)
+            return
+        for future, result in zip(batch.futures, results):
+            future.set_result(result)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_size": self.items / self.batches if self.batches else 0.0,
+            "largest": self.largest,
+            "max_size": self.max_size,
+        }
+
+
+def batched(
+    max_size: int = 8, max_wait_ms: float = 10.0
+) -> Callable[[Callable[..., list[Any]]], Batcher]:
+    """Batch calls to a function of a list of items across concurrent requests.
+
+    For example, in an adaptor module, where state persists between requests:
+
+    @batched(max_size=8, max_wait_ms=20)
+    def synthesize(prompts: list[str], voice: str) -> list[np.ndarray]:
+        return model.generate(prompts, voice=voice)
+
+    def run(text: str, voice: str = "default"):
+        for sentence in sentences(text):
+            yield encode(synthesize(sentence, voice=voice))
+    """
+
+    def wrap(fn: Callable[..., list[Any]]) -> Batcher:
+        return Batcher(fn=fn, max_size=max_size, max_wait_secs=max_wait_ms / 1000)
+
+    return wrap
+
+
+def stats() -> dict[str, Any]:
+    return {batcher.name: batcher.stats() for batcher in list(BATCHERS)}
@@ -0,0 +1,780 @@
+import abc
+import dataclasses
+import hashlib
+import json
+import logging
+import mmap
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+import weakref
+from collections.abc import Callable, Hashable, Iterator
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+def sizeof(value: Any) -> int:
+    """Approximate resident size of a cached value in bytes."""
+    seen: set[int] = set()
+
+    def go(v: Any) -> int:
+        if id(v) in seen:
+            return 0
+        seen.add(id(v))
+        match v:
+            case memoryview():
+                return v.nbytes
+            case bytes() | bytearray() | str() | int() | float() | bool() | None:
+                return sys.getsizeof(v)
+            case tuple() | list() | set() | frozenset():
+                return sys.getsizeof(v) + sum(go(x) for x in v)
+            case dict():
+                return sys.getsizeof(v) + sum(go(k) + go(x) for k, x in v.items())
+        if isinstance(getattr(v, "nbytes", None), int):
+            # numpy arrays and similar buffers
+            return sys.getsizeof(v) + v.nbytes
+        return sys.getsizeof(v)
+
+    return go(value)
+
+
+@dataclass(kw_only=True)
+class CacheEntry:
+    value: Any
+
+    # Approximate resident size in bytes.
+    size: int
+
+    # Seconds taken to compute the value.
+    cost: float
+
+    # Monotonic time after which the entry is stale, if any.
+    expires_at: float | None = None
+
+    hits: int = 0
+
+    # GreedyDual-Size-Frequency priority; lowest is evicted first.
+    priority: float = 0.0
+
+    def expired(self, now: float) -> bool:
+        return self.expires_at is not None and now >= self.expires_at
+
+
+class Cache(abc.ABC):
+    """A result cache keyed by CacheKey, pluggable into the Server."""
+
+    @abc.abstractmethod
+    def lookup(self, key: Hashable) -> CacheEntry | None: ...
+
+    @abc.abstractmethod
+    def put(
+        self,
+        key: Hashable,
+        value: Any,
+        *,
+        cost: float = 0.0,
+        ttl: float | None = None,
+        force: bool = False,
+    ) -> bool: ...
+
+    @abc.abstractmethod
+    def pop(self, key: Hashable) -> CacheEntry | None: ...
+
+    @abc.abstractmethod
+    def stats(self) -> dict[str, Any]: ...
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self.lookup(key)
+        return default if entry is None else entry.value
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.lookup(key) is not None
+
+
+@dataclass(kw_only=True)
+class ResultCache(Cache):
+    """In-memory result cache bounded by total bytes and entry count.
+
+    Eviction is cost-aware (GreedyDual-Size-Frequency): entries that were slow to
+    compute relative to their size, and that are hit often, are kept longest.
+    """
+
+    max_bytes: int | None = 256 * 1024 * 1024
+    max_entries: int | None = 1024
+
+    # TTL in seconds applied when put() is not given one; None never expires.
+    default_ttl: float | None = None
+
+    # Results both cheaper than admit_min_secs and smaller than admit_min_bytes are not cached.
+    admit_min_secs: float = 0.0
+    admit_min_bytes: int = 0
+
+    # Called with (key, entry) for every entry evicted to make room.
+    on_evict: Callable[[Hashable, CacheEntry], None] | None = None
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    rejections: int = 0
+
+    _entries: dict[Hashable, CacheEntry] = dataclasses.field(default_factory=dict)
+    _bytes: int = 0
+    _inflation: float = 0.0
+    _lock: threading.RLock = dataclasses.field(default_factory=threading.RLock)
+
+    def _priority(self, entry: CacheEntry) -> float:
+        return self._inflation + (1 + entry.hits) * entry.cost / max(entry.size, 1)
+
+    def _remove(self, key: Hashable) -> CacheEntry | None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+        return entry
+
+    def lookup(self, key: Hashable) -> CacheEntry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expired(time.monotonic()):
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry.hits += 1
+            entry.priority = self._priority(entry)
+            return entry
+
+    def admits(self, size: int, cost: float) -> bool:
+        if self.max_bytes is not None and size > self.max_bytes:
+            return False
+        return not (cost < self.admit_min_secs and size < self.admit_min_bytes)
+
+    def put(
+        self,
+        key: Hashable,
+        value: Any,
+        *,
+        cost: float = 0.0,
+        ttl: float | None = None,
+        force: bool = False,
+    ) -> bool:
+        """Cache a value, unless it fails admission; force skips the cost/size thresholds."""
+        size = sizeof(value)
+        if not (force or self.admits(size, cost)):
+            with self._lock:
+                self._remove(key)
+                self.rejections += 1
+            logger.info("Not admitting %s to cache (%d bytes, %.3fs)", key, size, cost)
+            return False
+
+        ttl = self.default_ttl if ttl is None else ttl
+        entry = CacheEntry(
+            value=value,
+            size=size,
+            cost=cost,
+            expires_at=None if ttl is None else time.monotonic() + ttl,
+        )
+        with self._lock:
+            if previous := self._remove(key):
+                entry.hits = previous.hits
+            entry.priority = self._priority(entry)
+            self._entries[key] = entry
+            self._bytes += size
+            evicted = self._evict()
+        # on_evict may be slow, e.g. spilling to disk, so it is called without the lock.
+        if self.on_evict:
+            for evicted_key, evicted_entry in evicted:
+                self.on_evict(evicted_key, evicted_entry)
+        return True
+
+    def _evict(self) -> list[tuple[Hashable, CacheEntry]]:
+        """Evict entries until within budget, returning those evicted to make room."""
+        now = time.monotonic()
+        for key in [k for k, e in self._entries.items() if e.expired(now)]:
+            self._remove(key)
+            self.expirations += 1
+
+        def over() -> bool:
+            return (self.max_bytes is not None and self._bytes > self.max_bytes) or (
+                self.max_entries is not None and len(self._entries) > self.max_entries
+            )
+
+        evicted = []
+        while self._entries and over():
+            key = min(self._entries, key=lambda k: self._entries[k].priority)
+            entry = self._entries[key]
+            self._inflation = entry.priority
+            self._remove(key)
+            self.evictions += 1
+            logger.debug("Evicted %s from cache (%d bytes)", key, entry.size)
+            evicted.append((key, entry))
+        return evicted
+
+    def pop(self, key: Hashable) -> CacheEntry | None:
+        with self._lock:
+            return self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "rejections": self.rejections,
+        }
+
+
+class Recording:
+    """Records the chunks of a generator as they are first consumed, for replay.
+
+    Each iteration over a Recording replays the chunks recorded so far and then
+    attaches to the live source. Whichever consumer reaches the end of the
+    recording first pulls the next chunk from the source, so a dropped client
+    does not strand the others, and the source is never advanced concurrently.
+
+    If every consumer goes away before the end, or the recording is collected,
+    the source is closed so that it releases whatever it holds, and the recording
+    fails with StreamAbandoned.
+    """
+
+    def __init__(
+        self,
+        source: Iterator[Any],
+        on_complete: Callable[["Recording"], None] | None = None,
+        on_error: Callable[["Recording", Exception], None] | None = None,
+    ) -> None:
+        self.chunks: list[Any] = []
+        self.complete = False
+        self.error: Exception | None = None
+        self.started = time.monotonic()
+        self.elapsed: float | None = None
+        self._source = source
+        self._on_complete = on_complete
+        self._on_error = on_error
+        self._producing = False
+        self._consumers = 0
+        self._cond = threading.Condition()
+        weakref.finalize(self, close_source, source)
+
+    @classmethod
+    def of(cls, chunks: list[Any]) -> "Recording":
+        """A complete recording of the given chunks, e.g. restored from disk."""
+        recording = cls(iter(()))
+        recording.chunks = list(chunks)
+        recording.complete = True
+        recording.elapsed = 0.0
+        return recording
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + sizeof(self.chunks)
+
+    @property
+    def finished(self) -> bool:
+        return self.complete or self.error is not None
+
+    def _produce(self) -> bool:
+        """Pull one chunk from the source; False once it is exhausted."""
+        try:
+            chunk = next(self._source)
+        except StopIteration:
+            with self._cond:
+                self.complete = True
+                self.elapsed = time.monotonic() - self.started
+                self._producing = False
+                self._cond.notify_all()
+            if self._on_complete:
+                self._on_complete(self)
+            return False
+        except Exception as e:
+            with self._cond:
+                self.error = e
+                self._producing = False
+                self._cond.notify_all()
+            if self._on_error:
+                self._on_error(self, e)
+            raise
+        except BaseException:
+            # e.g. KeyboardInterrupt; leave the source for another consumer to resume.
+            with self._cond:
+                self._producing = False
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            self.chunks.append(chunk)
+            self._producing = False
+            self._cond.notify_all()
+        return True
+
+    def __iter__(self) -> Iterator[Any]:
+        with self._cond:
+            self._consumers += 1
+        try:
+            i = 0
+            while True:
+                with self._cond:
+                    while i >= len(self.chunks) and self._producing:
+                        self._cond.wait()
+                    produce = i >= len(self.chunks)
+                    if produce:
+                        if self.error is not None:
+                            raise self.error
+                        if self.complete:
+                            return
+                        self._producing = True
+                if produce and not self._produce():
+                    return
+                yield self.chunks[i]
+                i += 1
+        finally:
+            self._detach()
+
+    def _detach(self) -> None:
+        with self._cond:
+            self._consumers -= 1
+            if self._consumers or self.finished:
+                return
+            error = self.error = StreamAbandoned(
+                f"Stream abandoned after {len(self.chunks)} chunks"
+            )
+            self._cond.notify_all()
+        close_source(self._source)
+        if self._on_error:
+            self._on_error(self, error)
+
+
+class StreamAbandoned(RuntimeError):
+    """Every consumer of a recording went away before its source finished."""
+
+
+def close_source(source: Iterator[Any]) -> None:
+    if close := getattr(source, "close", None):
+        close()
+
+
+def _is_ndarray(value: Any) -> bool:
+    # Avoid importing numpy unless a value could be an array.
+    if type(value).__module__ != "numpy":
+        return False
+    import numpy as np
+
+    return isinstance(value, np.ndarray) and not value.dtype.hasobject
+
+
+@dataclass(kw_only=True)
+class DiskCache(Cache):
+    """Persistent result cache in a content-addressed directory on local disk.
+
+    Each key is stored as <digest>.data alongside <digest>.meta, both written
+    atomically, so the directory survives restarts and can be shared by several
+    server processes on the same host. bytes and numpy results are served back
+    memory-mapped rather than read onto the heap. Keys are named by their digest()
+    if they have one, such as CacheKey, and otherwise by a hash of their repr, which
+    must then be stable and complete.
+    """
+
+    root: str
+    max_bytes: int | None = 4 * 1024 * 1024 * 1024
+
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    # Estimated bytes on disk; rescanned when it exceeds the budget.
+    _bytes: int | None = None
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+
+    def __post_init__(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+
+    def _paths(self, key: Hashable) -> tuple[str, str]:
+        if callable(digest_of := getattr(key, "digest", None)):
+            digest = digest_of()
+        else:
+            digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        base = os.path.join(self.root, digest[:2], digest)
+        return base + ".meta", base + ".data"
+
+    @staticmethod
+    def _write_atomic(path: str, write: Callable[[Any], None]) -> int:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+                size = f.tell()
+            os.replace(tmp, path)
+            return size
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    @staticmethod
+    def _encode(value: Any) -> tuple[str, Any, Callable[[Any], None]] | None:
+        """The kind of a storable value, extra metadata and a writer for its data."""
+        match value:
+            case (Recording() as recording, headers) if recording.complete:
+                data = pickle.dumps(recording.chunks)
+                return "stream", headers, lambda f: f.write(data)
+            case Recording() as recording if recording.complete:
+                data = pickle.dumps(recording.chunks)
+                return "stream", None, lambda f: f.write(data)
+            case Recording() | (Recording(), _):
+                return None
+            case bytes() | bytearray() | memoryview():
+                return "bytes", None, lambda f: f.write(value)
+        if _is_ndarray(value):
+            import numpy as np
+
+            return "npy", None, lambda f: np.lib.format.write_array(f, value)
+        try:
+            data = pickle.dumps(value)
+        except Exception as e:
+            logger.debug("Not storing unpicklable value on disk: %s", e, exc_info=True)
+            return None
+        return "pickle", None, lambda f: f.write(data)
+
+    @staticmethod
+    def _decode(kind: str, extra: Any, data_path: str) -> Any:
+        match kind:
+            case "bytes":
+                with open(data_path, "rb") as f:
+                    if os.fstat(f.fileno()).st_size == 0:
+                        return b""
+                    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            case "npy":
+                import numpy as np
+
+                return np.load(data_path, mmap_mode="r")
+            case "stream":
+                with open(data_path, "rb") as f:
+                    recording = Recording.of(pickle.load(f))
+                return recording if extra is None else (recording, extra)
+            case _:
+                with open(data_path, "rb") as f:
+                    return pickle.load(f)
+
+    def _unlink(self, key: Hashable) -> bool:
+        removed = False
+        for path in self._paths(key):
+            try:
+                os.unlink(path)
+                removed = True
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def stored(self, key: Hashable) -> bool:
+        return os.path.exists(self._paths(key)[0])
+
+    def lookup(self, key: Hashable) -> CacheEntry | None:
+        meta_path, data_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            expires_at = meta["expires_at"]
+            if expires_at is not None and time.time() >= expires_at:
+                self._unlink(key)
+                self.expirations += 1
+                value = None
+            else:
+                value = self._decode(meta["kind"], meta["extra"], data_path)
+                # mtime of the data file tracks recency for eviction.
+                os.utime(data_path)
+        except (OSError, EOFError, ValueError, KeyError, pickle.UnpicklingError) as e:
+            logger.debug("Disk cache miss for %s: %s", key, e)
+            value = None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return CacheEntry(
+            value=value,
+            size=meta["size"],
+            cost=meta["cost"],
+            expires_at=(
+                None
+                if expires_at is None
+                else time.monotonic() + expires_at - time.time()
+            ),
+        )
+
+    def put(
+        self,
+        key: Hashable,
+        value: Any,
+        *,
+        cost: float = 0.0,
+        ttl: float | None = None,
+        force: bool = False,
+    ) -> bool:
+        encoded = self._encode(value)
+        if encoded is None:
+            return False
+        kind, extra, write = encoded
+        meta_path, data_path = self._paths(key)
+        try:
+            size = self._write_atomic(data_path, write)
+            meta = {
+                "key": repr(key),
+                "kind": kind,
+                "extra": extra,
+                "size": size,
+                "cost": cost,
+                "expires_at": None if ttl is None else time.time() + ttl,
+            }
+            self._write_atomic(meta_path, lambda f: f.write(json.dumps(meta).encode()))
+        except (OSError, TypeError) as e:
+            logger.warning("Failed to write %s to disk cache: %s", key, e)
+            self._unlink(key)
+            return False
+        self.writes += 1
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes += size
+        self._enforce_budget()
+        return True
+
+    def _scan(self) -> list[tuple[float, int, str]]:
+        """(mtime, size, data path) for every stored value."""
+        found = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(".data"):
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    found.append((st.st_mtime, st.st_size, path))
+        return found
+
+    def _enforce_budget(self) -> None:
+        if self.max_bytes is None:
+            return
+        with self._lock:
+            if self._bytes is not None and self._bytes <= self.max_bytes:
+                return
+            found = sorted(self._scan())
+            total = sum(size for _, size, _ in found)
+            for _, size, data_path in found:
+                if total <= self.max_bytes:
+                    break
+                for path in (data_path[: -len(".data")] + ".meta", data_path):
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+                self.evictions += 1
+            self._bytes = total
+
+    def pop(self, key: Hashable) -> CacheEntry | None:
+        # Values are not read back just to be discarded.
+        self._unlink(key)
+        return None
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "root": self.root,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+@dataclass(kw_only=True)
+class TieredCache(Cache):
+    """A memory cache backed by a persistent disk tier.
+
+    Results are written through to disk so they survive restarts, and memory
+    evictions spill to disk if they are not there already. Large bytes and numpy
+    results skip the memory tier entirely and are served memory-mapped from disk.
+    """
+
+    memory: ResultCache
+    disk: DiskCache
+
+    # bytes and numpy results at least this large are kept off the heap.
+    spill_min_bytes: int = 1024 * 1024
+
+    write_through: bool = True
+
+    def __post_init__(self) -> None:
+        self.memory.on_evict = self._spill
+
+    def _spill(self, key: Hashable, entry: CacheEntry) -> None:
+        if self.disk.stored(key):
+            return
+        ttl = entry.expires_at and entry.expires_at - time.monotonic()
+        if ttl is None or ttl > 0:
+            self.disk.put(key, entry.value, cost=entry.cost, ttl=ttl)
+
+    def _off_heap(self, value: Any) -> bool:
+        match value:
+            case bytes() | bytearray() | memoryview():
+                return sizeof(value) >= self.spill_min_bytes
+        return _is_ndarray(value) and value.nbytes >= self.spill_min_bytes
+
+    def lookup(self, key: Hashable) -> CacheEntry | None:
+        if entry := self.memory.lookup(key):
+            return entry
+        entry = self.disk.lookup(key)
+        if entry is None or isinstance(entry.value, mmap.mmap):
+            return entry
+        if type(entry.value).__module__ == "numpy":
+            return entry
+        ttl = entry.expires_at and entry.expires_at - time.monotonic()
+        self.memory.put(key, entry.value, cost=entry.cost, ttl=ttl, force=True)
+        return entry
+
+    def put(
+        self,
+        key: Hashable,
+        value: Any,
+        *,
+        cost: float = 0.0,
+        ttl: float | None = None,
+        force: bool = False,
+    ) -> bool:
+        if self._off_heap(value):
+            self.memory.pop(key)
+            return self.disk.put(key, value, cost=cost, ttl=ttl)
+        cached = self.memory.put(key, value, cost=cost, ttl=ttl, force=force)
+        if cached and self.write_through:
+            self.disk.put(key, value, cost=cost, ttl=ttl)
+        return cached
+
+    def pop(self, key: Hashable) -> CacheEntry | None:
+        self.disk.pop(key)
+        return self.memory.pop(key)
+
+    def stats(self) -> dict[str, Any]:
+        return {"memory": self.memory.stats(), "disk": self.disk.stats()}
+
+
+@dataclass(kw_only=True)
+class Flight:
+    done: threading.Event = dataclasses.field(default_factory=threading.Event)
+    result: Any = None
+    error: Exception | None = None
+    waiters: int = 0
+
+
+@dataclass(kw_only=True)
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into a single execution.
+
+    The first caller for a key runs the function; callers arriving while it is in
+    flight wait for and share its result, or have its exception raised to them.
+    A flight ends once the function returns, so a stream it returns is shared with
+    later callers through LiveRecordings instead.
+    """
+
+    leaders: int = 0
+    coalesced: int = 0
+    _flights: dict[Hashable, Flight] = dataclasses.field(default_factory=dict)
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+
+    def do(self, key: Hashable, f: Callable[[], Any]) -> tuple[Any, bool]:
+        """Returns f's result and whether it was shared from another caller's flight."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if flight is None:
+                flight = self._flights[key] = Flight()
+                self.leaders += 1
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+
+        if not leader:
+            logger.info("Waiting on in-flight execution for %s", key)
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = f()
+            return flight.result, False
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "in_flight": len(self._flights),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
+
+
+@dataclass(kw_only=True)
+class LiveRecordings:
+    """Streams still being recorded, by key, so that requests for the same key attach
+    to them rather than generating the stream again.
+
+    A recording is only cached once complete, so until then it is found here. It is
+    removed once it is cached, fails or is abandoned.
+    """
+
+    attached: int = 0
+    _live: dict[Hashable, Any] = dataclasses.field(default_factory=dict)
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+
+    def add(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._live[key] = value
+
+    def get(self, key: Hashable) -> Any:
+        """The live recording for key, or None if it is not being recorded."""
+        with self._lock:
+            value = self._live.get(key)
+            if value is not None:
+                self.attached += 1
+            return value
+
+    def remove(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if self._live.get(key) is value:
+                del self._live[key]
+
+    def stats(self) -> dict[str, Any]:
+        return {"live": len(self._live), "attached": self.attached}
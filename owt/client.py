@@ -1,10 +1,16 @@
 import argparse
+import functools
+import hashlib
+import time
 import urllib.parse
 import requests
 import sys
 import base64
 import logging
+from typing import Any
+from owt import formats
 
+logger = logging.getLogger(__name__)
 
 parser = argparse.ArgumentParser(description="Owt CLI")
 parser.add_argument(
@@ -26,39 +32,232 @@ kwargs_group.add_argument("--kwargs", help="Kwargs to call with (as valid python
 kwargs_group.add_argument(
     "--arg", nargs=2, action="append", help="Args as --arg name value"
 )
+parser.add_argument(
+    "--file",
+    action="append",
+    default=[],
+    metavar="NAME=PATH",
+    help="Send a file's bytes as kwarg NAME (.npy files as arrays), in a binary body",
+)
+parser.add_argument(
+    "--binary-format",
+    choices=["multipart", "msgpack"],
+    default="multipart",
+    help="How to send binary kwargs",
+)
+parser.add_argument(
+    "--response-format",
+    choices=list(formats.RESPONSE_FORMATS),
+    help="Encoding for structured results (default: JSON)",
+)
+parser.add_argument(
+    "--job",
+    action="store_true",
+    help="Run as a job, polling for its result rather than holding a connection open",
+)
+parser.add_argument(
+    "--job-timeout",
+    type=float,
+    help="Seconds to wait for a job before cancelling it and failing (default: forever)",
+)
 parser.add_argument("--method", default="GET", help="HTTP method to use")
 parser.add_argument("--fn-name", default="run", help="Runner function name")
 # Switch to only print URL
 parser.add_argument("--url", action="store_true", help="Print URL only")
+parser.add_argument(
+    "--no-hash",
+    action="store_true",
+    help="Always send code, rather than its hash with code as a fallback",
+)
+
+
+def code_hash(code_b64: bytes) -> str:
+    """The hash by which the server knows code it has already been sent."""
+    return hashlib.sha256(code_b64).hexdigest()
+
+
+def is_unknown_code_hash(response: requests.Response) -> bool:
+    if response.status_code != 404:
+        return False
+    try:
+        return response.json().get("error") == "unknown_code_hash"
+    except ValueError:
+        return False
+
+
+def binary_request(
+    address: str,
+    data: dict[str, Any],
+    binary_kwargs: dict[str, Any],
+    binary_format: str = "multipart",
+) -> requests.PreparedRequest:
+    """A POST carrying binary kwargs as raw bytes rather than base64 in JSON."""
+    match binary_format:
+        case "multipart":
+            files = {}
+            for name, value in binary_kwargs.items():
+                if formats.is_ndarray(value):
+                    files[name] = (name, formats.encode_npy(value), formats.NPY)
+                elif isinstance(value, memoryview):
+                    files[name] = (name, value.tobytes(), formats.OCTET_STREAM)
+                else:
+                    files[name] = (name, value, formats.OCTET_STREAM)
+            return requests.Request("POST", address, data=data, files=files).prepare()
+        case "msgpack":
+            return requests.Request(
+                "POST",
+                address,
+                data=formats.pack({**data, "kwargs": binary_kwargs}),
+                headers={"Content-Type": formats.MSGPACK},
+            ).prepare()
+        case f:
+            raise ValueError(f"Unsupported binary format: {f}")
+
+
+def send(
+    address: str,
+    method: str,
+    data: dict[str, Any],
+    binary_kwargs: dict[str, Any] | None = None,
+    binary_format: str = "multipart",
+) -> requests.Response:
+    if binary_kwargs:
+        with requests.Session() as session:
+            return session.send(
+                binary_request(address, data, binary_kwargs, binary_format)
+            )
+    match method.lower():
+        case "get":
+            return requests.get(address, params=data)
+        case "post":
+            return requests.post(address, json=data)
+        case m:
+            raise ValueError(f"Unsupported method: {m}")
+
+
+def job_address(address: str, job_path: str = "") -> str:
+    """The jobs endpoint on the server at address, for running at its path."""
+    url = urllib.parse.urlsplit(address)
+    return urllib.parse.urlunsplit(
+        (url.scheme, url.netloc, f"/_owt/jobs{job_path or url.path}", "", "")
+    )
+
+
+def run_job(
+    address: str,
+    method: str,
+    data: dict[str, Any],
+    binary_kwargs: dict[str, Any] | None = None,
+    binary_format: str = "multipart",
+    wait_secs: float = 30.0,
+    timeout: float | None = None,
+    backoff_secs: float = 0.1,
+    max_backoff_secs: float = 5.0,
+) -> requests.Response:
+    """Submit a request as a job, then wait for and return its result.
+
+    The result is polled for with the server waiting up to wait_secs each time. A poll
+    that returns sooner is retried after a delay doubling from backoff_secs up to
+    max_backoff_secs. If timeout is given and the job has not finished by then, it is
+    cancelled and TimeoutError raised.
+    """
+    # Jobs are always submitted by POST.
+    del method
+    submitted = send(job_address(address), "post", data, binary_kwargs, binary_format)
+    if submitted.status_code != 202:
+        return submitted
+    job_id = submitted.json()["id"]
+    result = job_address(address, f"/{job_id}/result")
+    deadline = None if timeout is None else time.monotonic() + timeout
+    delay = backoff_secs
+    while True:
+        wait = (
+            wait_secs
+            if deadline is None
+            else min(wait_secs, deadline - time.monotonic())
+        )
+        start = time.monotonic()
+        response = requests.get(result, params={"wait": max(wait, 0.0)})
+        if response.status_code != 202:
+            return response
+        now = time.monotonic()
+        if deadline is not None and now >= deadline:
+            requests.delete(job_address(address, f"/{job_id}"))
+            raise TimeoutError(f"Job {job_id} did not finish within {timeout}s")
+        if now - start < wait:
+            time.sleep(delay if deadline is None else min(delay, deadline - now))
+            delay = min(delay * 2, max_backoff_secs)
 
 
 def call_owt(
-    address: str, method: str, code: str, kwargs: str, fn_name: str, url_only: bool
-) -> bytes:
+    address: str,
+    method: str,
+    code: str,
+    kwargs: str,
+    fn_name: str,
+    url_only: bool,
+    by_hash: bool = True,
+    binary_kwargs: dict[str, Any] | None = None,
+    binary_format: str = "multipart",
+    response_format: str | None = None,
+    job: bool = False,
+    job_timeout: float | None = None,
+) -> Any:
+    """The result of calling code on the server, decoded by its content type."""
     code_b64 = base64.b64encode(code.encode())
     kwargs_b64 = base64.b64encode(kwargs.encode())
-    data = {
-        "code_b64": code_b64,
-        "kwargs_b64": kwargs_b64,
+    data: dict[str, Any] = {
+        "code_b64": code_b64.decode(),
+        "kwargs_b64": kwargs_b64.decode(),
+        "fn_name": fn_name,
     }
+    if response_format:
+        data["response_format"] = response_format
+
+    # Binary kwargs are sent as raw bytes in a POST body, alongside the other fields.
+    binary: dict[str, Any] = (
+        {"binary_kwargs": binary_kwargs, "binary_format": binary_format}
+        if binary_kwargs
+        else {}
+    )
 
     if url_only:
         return (f"{address}?{urllib.parse.urlencode(data)}").encode()
 
-    match method.lower():
-        case "get":
-            return requests.get(address, params=data).content
-        case "post":
-            return requests.post(address, json=data).content
-        case m:
-            raise ValueError(f"Unsupported method: {m}")
+    call = functools.partial(run_job, timeout=job_timeout) if job else send
+
+    if by_hash:
+        # Send only the hash, uploading the code if the server hasn't seen it yet.
+        by_hash_data = {**data, "code_hash": code_hash(code_b64)}
+        del by_hash_data["code_b64"]
+        response = call(address, method, by_hash_data, **binary)
+        if not is_unknown_code_hash(response):
+            return decode(response)
+        logger.info("Server does not know code hash, uploading code")
+
+    return decode(call(address, method, data, **binary))
+
+
+def decode(response: requests.Response) -> Any:
+    """A response's result, decoding arrays and structured data by content type."""
+    return formats.decode(response.content, response.headers.get("Content-Type"))
+
+
+def read_files(specs: list[str]) -> dict[str, Any]:
+    files: dict[str, Any] = {}
+    for spec in specs:
+        name, path = spec.split("=", 1)
+        with open(path, "rb") as f:
+            data = f.read()
+        files[name] = formats.decode_npy(data) if path.endswith(".npy") else data
+    return files
 
 
 def main():
     try:
         args = parser.parse_args()
     except argparse.ArgumentError as e:
-        logging.error(f"Error parsing arguments: {e}")
+        logger.error(f"Error parsing arguments: {e}")
         sys.exit(1)
     result = call_owt(
         address=args.address,
@@ -71,8 +270,17 @@ def main():
         ),
         fn_name=args.fn_name,
         url_only=args.url,
+        by_hash=not args.no_hash,
+        binary_kwargs=read_files(args.file),
+        binary_format=args.binary_format,
+        response_format=args.response_format,
+        job=args.job,
+        job_timeout=args.job_timeout,
     )
-    sys.stdout.buffer.write(result)
+    if isinstance(result, bytes):
+        sys.stdout.buffer.write(result)
+    else:
+        print(result)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,323 @@
+import ast
+import base64
+import collections
+import dataclasses
+import functools
+import hashlib
+import importlib
+import logging
+import threading
+import types
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from owt.summat.syntax import Owt
+
+logger = logging.getLogger(__name__)
+
+# Made available to every adaptor before its own code runs.
+PRELUDE = "from owt import *"
+
+# Helpers also bound for adaptors, as they were before PRELUDE left them out, but
+# imported only once an adaptor uses them.
+LAZY_PRELUDE = {"lib": "owt.lib", "shell": "owt.lib.shell"}
+
+
+class LazyModule:
+    """Stands in for a module, importing it on first attribute access."""
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(importlib.import_module(self._name), attr)
+
+    def __repr__(self):
+        return f"LazyModule({self._name!r})"
+
+
+@functools.cache
+def prelude() -> Mapping[str, Any]:
+    """The names PRELUDE binds, imported once rather than each time an adaptor runs."""
+    namespace: dict[str, Any] = {}
+    exec(PRELUDE, namespace)  # noqa: S102
+    del namespace["__builtins__"]
+    for name, module in LAZY_PRELUDE.items():
+        namespace.setdefault(name, LazyModule(module))
+    return types.MappingProxyType(namespace)
+
+
+@dataclass(frozen=True)
+class CodeKey:
+    """Identifies a compiled adaptor by the hash of its source and the function it exposes."""
+
+    code_hash: str
+    fn_name: str = "run"
+
+    @classmethod
+    def of(cls, code_b64: str, fn_name: str = "run") -> "CodeKey":
+        # Hash the encoded form so that repeat calls need not decode the code at all.
+        return cls(
+            code_hash=hashlib.sha256(code_b64.encode("utf-8")).hexdigest(),
+            fn_name=fn_name,
+        )
+
+    def __repr__(self):
+        return f"CodeKey({self.code_hash[:12]}, {self.fn_name})"
+
+
+@dataclass(frozen=True, kw_only=True)
+class CompiledAdaptor:
+    key: CodeKey
+
+    # Which wrapping of the user code defined the function (explicit, implicit, implicit_terse).
+    mode: str
+
+    # The compiled module code object that defined the function.
+    code: types.CodeType
+
+    # The resolved callable or built Owt pipeline.
+    fn: Callable[..., Any]
+
+
+def _binds(stmts: list[ast.stmt], name: str) -> bool:
+    """Whether any module-level statement may bind the given name."""
+
+    def target_binds(target: ast.expr) -> bool:
+        match target:
+            case ast.Name(id=id):
+                return id == name
+            case ast.Tuple(elts=elts) | ast.List(elts=elts):
+                return any(target_binds(e) for e in elts)
+            case ast.Starred(value=value):
+                return target_binds(value)
+        return False
+
+    for stmt in stmts:
+        match stmt:
+            case ast.FunctionDef() | ast.AsyncFunctionDef() | ast.ClassDef():
+                if stmt.name == name:
+                    return True
+            case ast.Assign(targets=targets):
+                if any(target_binds(t) for t in targets):
+                    return True
+            case ast.AnnAssign(target=target) | ast.AugAssign(target=target):
+                if target_binds(target):
+                    return True
+            case ast.Import(names=aliases) | ast.ImportFrom(names=aliases):
+                for alias in aliases:
+                    if alias.name == "*":
+                        return True
+                    if (alias.asname or alias.name.split(".")[0]) == name:
+                        return True
+            case ast.If() | ast.For() | ast.AsyncFor() | ast.While():
+                if _binds(stmt.body, name) or _binds(stmt.orelse, name):
+                    return True
+            case ast.With() | ast.AsyncWith():
+                if _binds(stmt.body, name):
+                    return True
+            case ast.Try():
+                blocks = [stmt.body, stmt.orelse, stmt.finalbody]
+                blocks += [handler.body for handler in stmt.handlers]
+                if any(_binds(block, name) for block in blocks):
+                    return True
+    return False
+
+
+def _terse_root(expr: ast.expr) -> str | None:
+    """The Owt stage called at the root of an a().b().c chain, if there is one."""
+    called = False
+    while True:
+        match expr:
+            case ast.Call(func=inner):
+                expr, called = inner, True
+            case ast.Attribute(value=inner) | ast.Subscript(value=inner):
+                expr, called = inner, False
+            case ast.Name(id=id) if called and hasattr(Owt, id):
+                return id
+            case _:
+                return None
+
+
+def _parse_expression(source: str) -> ast.expr:
+    # Wrapping in parentheses permits multi-line chains; the opening line is then
+    # stripped from the line numbers so errors refer to the code as sent.
+    tree = ast.parse(source, mode="eval")
+    ast.increment_lineno(tree, -1)
+    return tree.body
+
+
+def parse_adaptor(code: str, fn_name: str = "run") -> tuple[str, ast.Module]:
+    """Classify adaptor code and build the module that defines fn_name.
+
+    Code is one of:
+    - explicit: a module that defines fn_name itself
+    - implicit: a single expression, bound to fn_name
+    - implicit_terse: a chain starting at an Owt stage, e.g. path().f(...), bound to fn_name as pipe().path().f(...)
+    """
+    explicit_error: SyntaxError | None = None
+    try:
+        module = ast.parse(code, mode="exec")
+        if _binds(module.body, fn_name):
+            return "explicit", module
+    except SyntaxError as e:
+        explicit_error = e
+
+    def assign(value: ast.expr) -> ast.Module:
+        target = ast.Name(id=fn_name, ctx=ast.Store())
+        assignment = ast.Assign(targets=[target], value=value)
+        ast.copy_location(assignment, value)
+        ast.copy_location(target, value)
+        return ast.Module(body=[assignment], type_ignores=[])
+
+    try:
+        expr = _parse_expression(f"(\n{code}\n)")
+        if _terse_root(expr) is None:
+            return "implicit", assign(expr)
+    except SyntaxError:
+        pass
+
+    try:
+        return "implicit_terse", assign(_parse_expression(f"(pipe()\n.{code}\n)"))
+    except SyntaxError:
+        pass
+
+    if explicit_error:
+        raise explicit_error
+    raise RuntimeError(
+        f"Code neither defines '{fn_name}' nor is an expression to bind to it"
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def normalized_code_hash(code_b64: str, fn_name: str = "run") -> str:
+    """Hash of the adaptor's syntax tree and entry point, insensitive to formatting
+    and comments."""
+    code = base64.b64decode(code_b64).decode("utf-8")
+    try:
+        mode, module = parse_adaptor(code, fn_name)
+        normalized = f"{mode}:{fn_name}:{ast.dump(module)}"
+    except (SyntaxError, RuntimeError):
+        normalized = f"{fn_name}:{code}"
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def compile_adaptor(
+    code: str,
+    key: CodeKey,
+    base_globals: Mapping[str, Any],
+    namespace: dict[str, Any] | None = None,
+    filename: str | None = None,
+) -> CompiledAdaptor:
+    """Classify, compile and execute adaptor code exactly once, resolving key.fn_name.
+
+    Code runs in a new namespace seeded from base_globals, unless one is given.
+    """
+    if namespace is None:
+        namespace = dict(base_globals)
+    namespace.update(prelude())
+    mode, module = parse_adaptor(code, key.fn_name)
+    logger.debug("Adaptor %s parsed in %s mode", key, mode)
+    code_obj = compile(module, filename or f"<owt:{key.code_hash[:12]}>", "exec")
+    # Running adaptor code is what owt is for.
+    exec(code_obj, namespace)  # noqa: S102
+    fn = namespace.get(key.fn_name)
+    if not fn:
+        raise RuntimeError(f"No '{key.fn_name}' defined by {mode} code")
+    return CompiledAdaptor(key=key, mode=mode, code=code_obj, fn=fn)
+
+
+@dataclass(kw_only=True)
+class AdaptorCache:
+    """Bounded LRU of compiled adaptors, keyed by CodeKey."""
+
+    max_size: int = 256
+    hits: int = 0
+    misses: int = 0
+    _entries: collections.OrderedDict[CodeKey, CompiledAdaptor] = dataclasses.field(
+        default_factory=collections.OrderedDict
+    )
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+
+    def get(self, key: CodeKey) -> CompiledAdaptor | None:
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return compiled
+
+    def put(self, compiled: CompiledAdaptor) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[compiled.key] = compiled
+            self._entries.move_to_end(compiled.key)
+            while len(self._entries) > self.max_size:
+                evicted, _ = self._entries.popitem(last=False)
+                logger.debug("Evicted compiled adaptor %s", evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: CodeKey) -> bool:
+        return key in self._entries
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class UnknownCodeHash(LookupError):
+    def __init__(self, code_hash: str) -> None:
+        super().__init__(f"Unknown code_hash: {code_hash}")
+        self.code_hash = code_hash
+
+
+@dataclass(kw_only=True)
+class CodeRegistry:
+    """Adaptor source by code hash, so clients can send code once and call by hash.
+
+    Compiled adaptors may be evicted from the AdaptorCache; the registry keeps the
+    source so they can be recompiled on demand.
+    """
+
+    max_size: int = 4096
+    _codes: collections.OrderedDict[str, str] = dataclasses.field(
+        default_factory=collections.OrderedDict
+    )
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+
+    def register(self, code_b64: str) -> str:
+        code_hash = CodeKey.of(code_b64).code_hash
+        with self._lock:
+            self._codes[code_hash] = code_b64
+            self._codes.move_to_end(code_hash)
+            while len(self._codes) > self.max_size:
+                self._codes.popitem(last=False)
+        return code_hash
+
+    def lookup(self, code_hash: str) -> str:
+        with self._lock:
+            code_b64 = self._codes.get(code_hash)
+            if code_b64 is None:
+                raise UnknownCodeHash(code_hash)
+            self._codes.move_to_end(code_hash)
+            return code_b64
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def stats(self) -> dict[str, Any]:
+        return {"size": len(self._codes), "max_size": self.max_size}
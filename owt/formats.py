@@ -0,0 +1,221 @@
+import ast
+import io
+import json
+import math
+import mmap
+import os
+from collections.abc import Mapping
+from typing import IO, Any
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK = "application/msgpack"
+MULTIPART = "multipart/form-data"
+NPY = "application/x-npy"
+OCTET_STREAM = "application/octet-stream"
+ARROW = "application/vnd.apache.arrow.stream"
+JSON = "application/json"
+
+# Response encodings, by the name a request may give as its response_format
+RESPONSE_FORMATS = {"json": JSON, "npy": NPY, "msgpack": MSGPACK, "arrow": ARROW}
+
+# msgpack extension type for numpy arrays, carried in .npy format
+NPY_EXT = 1
+
+_NPY_MAGIC = b"\x93NUMPY"
+
+
+def _msgpack() -> Any:
+    if msgpack is None:
+        raise RuntimeError(
+            "msgpack payloads need msgpack: pip install -r requirements.fast.txt"
+        )
+    return msgpack
+
+
+def is_ndarray(value: Any) -> bool:
+    # Avoid importing numpy unless a value could be an array.
+    if type(value).__module__ != "numpy":
+        return False
+    import numpy as np
+
+    return isinstance(value, np.ndarray) and not value.dtype.hasobject
+
+
+def is_numpy_scalar(value: Any) -> bool:
+    return type(value).__module__ == "numpy" and hasattr(value, "item")
+
+
+def json_default(o: Any) -> Any:
+    """For json.dumps, encoding numpy arrays and scalars as their Python equivalents."""
+    if is_ndarray(o):
+        return o.tolist()
+    if is_numpy_scalar(o):
+        return o.item()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def encode_npy(array: Any) -> bytes:
+    import numpy as np
+
+    buf = io.BytesIO()
+    np.save(buf, array, allow_pickle=False)
+    return buf.getvalue()
+
+
+def npy_buffers(value: Any) -> list[bytes | memoryview]:
+    """The .npy header followed by the array's own buffer, copied only if not contiguous."""
+    import numpy as np
+
+    array = np.asarray(value)
+    if array.dtype.hasobject:
+        raise ValueError("Cannot encode arrays of Python objects as .npy")
+    if not (array.flags.c_contiguous or array.flags.f_contiguous):
+        array = np.ascontiguousarray(array)
+    header = np.lib.format.header_data_from_array_1_0(array)
+    buf = io.BytesIO()
+    np.lib.format.write_array_header_1_0(buf, header)
+    data = array.reshape(-1, order="F" if header["fortran_order"] else "C")
+    return [buf.getvalue(), memoryview(data.view(np.uint8))]
+
+
+def decode_npy(data: bytes | memoryview | mmap.mmap) -> Any:
+    """A read-only array over .npy data, without copying it."""
+    import numpy as np
+
+    view = memoryview(data)
+    if bytes(view[:6]) != _NPY_MAGIC:
+        raise ValueError("Not .npy data")
+    major = view[6]
+    # Version 1 has a 2-byte header length, later versions 4 bytes.
+    prefix = 10 if major == 1 else 12
+    offset = prefix + int.from_bytes(view[8:prefix], "little")
+    header = ast.literal_eval(bytes(view[prefix:offset]).decode("latin1"))
+    dtype = np.lib.format.descr_to_dtype(header["descr"])
+    shape = header["shape"]
+    array = np.frombuffer(view, dtype=dtype, count=math.prod(shape), offset=offset)
+    return array.reshape(shape, order="F" if header["fortran_order"] else "C")
+
+
+def pack(value: Any) -> bytes:
+    """Encode as msgpack, with bytes as binary and numpy arrays as .npy extensions."""
+
+    def default(o: Any) -> Any:
+        if is_ndarray(o):
+            return _msgpack().ExtType(NPY_EXT, encode_npy(o))
+        if is_numpy_scalar(o):
+            return o.item()
+        raise TypeError(f"Cannot encode {type(o).__name__} as msgpack")
+
+    return _msgpack().packb(value, default=default, use_bin_type=True)
+
+
+def unpack(data: bytes | memoryview) -> Any:
+    def ext_hook(code: int, ext: bytes) -> Any:
+        if code == NPY_EXT:
+            return decode_npy(ext)
+        return _msgpack().ExtType(code, ext)
+
+    return _msgpack().unpackb(data, ext_hook=ext_hook, raw=False)
+
+
+def encode_arrow(value: Any) -> memoryview:
+    """An Arrow IPC stream of one table.
+
+    A mapping is encoded as a table of its columns. Anything else is taken as an
+    array and stored as a single "values" column, nested in fixed-size lists for
+    each dimension beyond the first, with its shape in the schema metadata.
+    """
+    import numpy as np
+    import pyarrow as pa
+
+    match value:
+        case Mapping():
+            table = pa.table(dict(value))
+        case _:
+            array = np.asarray(value)
+            values = pa.array(array.reshape(-1))
+            for size in reversed(array.shape[1:]):
+                values = pa.FixedSizeListArray.from_arrays(values, size)
+            table = pa.table(
+                {"values": values},
+                metadata={"owt.shape": json.dumps(array.shape)},
+            )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return memoryview(sink.getvalue())
+
+
+def decode_arrow(data: bytes | memoryview) -> Any:
+    import pyarrow as pa
+
+    table = pa.ipc.open_stream(data).read_all()
+    metadata = table.schema.metadata or {}
+    if shape := metadata.get(b"owt.shape"):
+        shape = json.loads(shape)
+        values = table.column("values").combine_chunks()
+        for _ in shape[1:]:
+            values = values.flatten()
+        return values.to_numpy(zero_copy_only=False).reshape(shape)
+    return {name: table.column(name).to_numpy() for name in table.column_names}
+
+
+def encode_result(value: Any, response_format: str) -> list[bytes | memoryview]:
+    """Buffers encoding a result in the given response format."""
+    match response_format:
+        case "json":
+            return [json.dumps(value, default=json_default).encode("utf-8")]
+        case "npy":
+            return npy_buffers(value)
+        case "msgpack":
+            return [pack(value)]
+        case "arrow":
+            return [encode_arrow(value)]
+        case f:
+            raise ValueError(f"Unknown response format: {f}")
+
+
+def decode(data: bytes, content_type: str | None) -> Any:
+    """Decode a response body according to its content type."""
+    match (content_type or "").split(";")[0].strip():
+        case "application/json":
+            return json.loads(data)
+        case "application/x-npy":
+            return decode_npy(data)
+        case "application/msgpack":
+            return unpack(data)
+        case "application/vnd.apache.arrow.stream":
+            return decode_arrow(data)
+        case _:
+            return data
+
+
+def read_part(stream: IO[bytes], content_type: str | None = None) -> Any:
+    """The content of an uploaded multipart part, decoded if it is .npy.
+
+    Parts large enough to have been spooled to disk are mapped rather than read
+    onto the heap; smaller parts are held in memory anyway and are copied out.
+    """
+    # SpooledTemporaryFile: use the underlying file so as not to force a rollover.
+    f = getattr(stream, "_file", stream)
+    data: bytes | memoryview
+    if isinstance(f, io.BytesIO):
+        data = f.getvalue()
+    else:
+        try:
+            f.flush()
+            fileno = f.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            fileno = None
+        if fileno is not None and (size := os.fstat(fileno).st_size):
+            data = memoryview(mmap.mmap(fileno, size, access=mmap.ACCESS_READ))
+        else:
+            f.seek(0)
+            data = f.read()
+    if content_type == NPY:
+        return decode_npy(data)
+    return data
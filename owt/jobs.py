@@ -0,0 +1,197 @@
+import contextlib
+import dataclasses
+import logging
+import queue
+import threading
+import time
+import types
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from owt.cache import Recording
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(RuntimeError):
+    pass
+
+
+@dataclass(kw_only=True)
+class Job:
+    id: str
+    fn: Callable[[], Any]
+    # Entered around running fn and consuming any stream it returns.
+    context: Callable[[], contextlib.AbstractContextManager[Any]] = (
+        contextlib.nullcontext
+    )
+
+    # queued, running, done, failed or cancelled
+    status: str = "queued"
+    result: Any = None
+    # A stream result, recorded as it is produced, so it can be read while running.
+    recording: Recording | None = None
+    headers: Any = None
+    error: str | None = None
+    submitted: float = dataclasses.field(default_factory=time.time)
+    started: float | None = None
+    finished: float | None = None
+    # Anything the submitter wants to keep with the job, e.g. how to encode its result.
+    meta: dict[str, Any] = dataclasses.field(default_factory=dict)
+    cancel_requested: threading.Event = dataclasses.field(
+        default_factory=threading.Event
+    )
+    done: threading.Event = dataclasses.field(default_factory=threading.Event)
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "stream": self.recording is not None,
+            "chunks": len(self.recording.chunks) if self.recording else None,
+            "error": self.error,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "cancel_requested": self.cancel_requested.is_set(),
+        }
+
+
+@dataclass(kw_only=True)
+class Jobs:
+    """Runs submitted work on a bounded number of threads, keeping results for retrieval.
+
+    Work beyond max_queued is refused rather than queued. A stream result is consumed
+    to the end by the job, whether or not anyone is reading it, and recorded so that
+    it can be read from the start at any point. Finished jobs are kept for retain_secs.
+    Cancelling a queued job drops it; a running job stops at its stream's next chunk,
+    or otherwise has its result discarded when done.
+
+    Jobs are held in memory by the process serving them.
+    """
+
+    workers: int = 2
+    max_queued: int = 256
+    retain_secs: float = 3600.0
+    _jobs: dict[str, Job] = dataclasses.field(default_factory=dict)
+    _queue: queue.Queue[Job] | None = None
+    _threads: list[threading.Thread] = dataclasses.field(default_factory=list)
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+
+    def _start(self) -> queue.Queue[Job]:
+        # Threads start with the first job, so processes never submitting jobs have none.
+        if self._queue is None:
+            self._queue = queue.Queue(maxsize=self.max_queued)
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._work, daemon=True, name=f"owt-jobs-{i}"
+                )
+                thread.start()
+                self._threads.append(thread)
+        return self._queue
+
+    def submit(
+        self,
+        fn: Callable[[], Any],
+        context: Callable[
+            [], contextlib.AbstractContextManager[Any]
+        ] = contextlib.nullcontext,
+        **meta: Any,
+    ) -> Job:
+        job = Job(id=uuid.uuid4().hex, fn=fn, context=context, meta=meta)
+        with self._lock:
+            self._expire()
+            q = self._start()
+            try:
+                q.put_nowait(job)
+            except queue.Full:
+                raise JobQueueFull(f"Job queue is full ({self.max_queued} queued)")
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            self._expire()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Job | None:
+        with self._lock:
+            if (job := self._jobs.get(job_id)) is None:
+                return None
+            job.cancel_requested.set()
+            if job.status == "queued":
+                # Left in the queue, to be skipped.
+                self._finish(job, "cancelled")
+        return job
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.retain_secs
+        for job_id in [
+            job.id
+            for job in self._jobs.values()
+            if job.finished is not None and job.finished < cutoff
+        ]:
+            del self._jobs[job_id]
+
+    def _finish(self, job: Job, status: str, error: str | None = None) -> None:
+        job.status = status
+        job.error = error
+        job.finished = time.time()
+        if status != "done":
+            job.result = None
+        job.done.set()
+
+    def _work(self) -> None:
+        assert self._queue
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                if job.status != "queued":
+                    continue
+                job.status = "running"
+                job.started = time.time()
+            try:
+                with job.context():
+                    self._run(job)
+            except Exception as e:
+                logger.exception("Job %s failed", job.id)
+                with self._lock:
+                    self._finish(job, "failed", f"{type(e).__name__}: {e}")
+                continue
+            with self._lock:
+                if job.cancel_requested.is_set():
+                    self._finish(job, "cancelled")
+                else:
+                    self._finish(job, "done")
+
+    def _run(self, job: Job) -> None:
+        result = job.fn()
+        match result:
+            case (types.GeneratorType() as chunks, headers):
+                pass
+            case types.GeneratorType() as chunks:
+                headers = None
+            case _:
+                job.result = result
+                return
+        job.recording, job.headers = Recording(chunks), headers
+        for _ in job.recording:
+            if job.cancel_requested.is_set():
+                # Unless a reader is producing the next chunk, in which case it ends.
+                with contextlib.suppress(ValueError):
+                    chunks.close()
+                return
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {
+            "workers": self.workers,
+            "queued": statuses.count("queued"),
+            "running": statuses.count("running"),
+            "done": statuses.count("done"),
+            "failed": statuses.count("failed"),
+            "cancelled": statuses.count("cancelled"),
+        }
@@ -0,0 +1,12 @@
+import importlib
+from typing import Any
+
+
+def __getattr__(name: str) -> Any:
+    # Helpers are imported on first use, e.g. as owt.lib.shell.
+    try:
+        return importlib.import_module(f"{__name__}.{name}")
+    except ModuleNotFoundError as e:
+        if e.name != f"{__name__}.{name}":
+            raise
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from e
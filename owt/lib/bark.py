@@ -1,10 +1,76 @@
 # lib/bark.py
-from typing import Literal
+from typing import Iterator, Literal
+from owt import objects
 from owt.lib import stream, encoding, tts
+import contextlib
 import os
 import logging
+import threading
 import numpy as np
 
+logger = logging.getLogger(__name__)
+
+# bark holds one set of models in its own globals, so only one config is loaded at
+# a time. It is swapped for another only once no generation is using it.
+_config_changed = threading.Condition()
+_config: tuple[str, int] | None = None
+_users = 0
+
+# Guards bark's globals, and which models are loaded in them.
+_models_lock = threading.Lock()
+_loaded: list | None = None
+
+
+def _load(model_size: str) -> list:
+    global _loaded
+    from bark import generation  # type: ignore
+
+    small = model_size == "small"
+    with _models_lock:
+        generation.preload_models(
+            text_use_small=small, coarse_use_small=small, fine_use_small=small
+        )
+        # The models themselves, so that their tensors are measured.
+        _loaded = [
+            m["model"] if isinstance(m, dict) else m
+            for m in generation.models.values()
+        ]
+        return _loaded
+
+
+def _unload(models: list) -> None:
+    global _loaded
+    from bark.generation import clean_models  # type: ignore
+
+    with _models_lock:
+        # Unless these were already replaced, e.g. reloaded after being evicted.
+        if _loaded is models:
+            clean_models()
+            _loaded = None
+
+
+@contextlib.contextmanager
+def _models(model_size: str, cuda_device: int) -> Iterator[list]:
+    """Keep bark's models loaded for a config, and not swapped, while in use."""
+    global _config, _users
+    config = (model_size, cuda_device)
+    with _config_changed:
+        _config_changed.wait_for(lambda: _config == config or not _users)
+        if _config != config:
+            if _config is not None:
+                objects.discard(("bark", *_config))
+            _config = config
+        _users += 1
+    try:
+        with objects.use(
+            ("bark", *config), lambda: _load(model_size), on_evict=_unload
+        ) as models:
+            yield models
+    finally:
+        with _config_changed:
+            _users -= 1
+            _config_changed.notify_all()
+
 def run(
     text: str = "",
     speaker: str = "v2/en_speaker_6",
@@ -23,10 +89,8 @@ def run(
         case "large":
             os.environ["SUNO_USE_SMALL_MODELS"] = "0"
 
-    from bark.generation import generate_text_semantic, preload_models, SAMPLE_RATE  # type: ignore
     from bark.api import semantic_to_waveform  # type: ignore
-
-    preload_models()
+    from bark.generation import SAMPLE_RATE, generate_text_semantic  # type: ignore
 
     full_wav_array: np.ndarray | None = None
 
@@ -34,9 +98,7 @@ def run(
         nonlocal full_wav_array
         raw_sentence = " ".join(sentences)
         sentence = sentence_template % raw_sentence
-        logging.info(
-            "Generating sentence: %s", sentence
-        )
+        logger.info("Generating sentence: %s", sentence)
         semantic_tokens: np.ndarray = generate_text_semantic(
             sentence,
             history_prompt=speaker,
@@ -57,11 +119,15 @@ def run(
             cumulative=encoding.base64_wav(full_wav_array, SAMPLE_RATE))
 
     def output():
-        match split_type:
-            case "sentence":
-                yield from tts.over_sentences(text, generate, batch_size=batch_size)
-            case "none":
-                yield generate([text])
+        # Held for the whole stream, so the models are not swapped or freed under it.
+        with _models(model_size, cuda_device):
+            match split_type:
+                case "sentence":
+                    yield from tts.over_sentences(
+                        text, generate, batch_size=batch_size
+                    )
+                case "none":
+                    yield generate([text])
         yield stream.done()
 
     return stream.response(output)
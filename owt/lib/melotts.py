@@ -1,6 +1,7 @@
 import torch
 import io
 from melo.api import TTS  # type: ignore
+from owt import objects
 from owt.lib import stream, encoding, tts
 
 def run(
@@ -12,7 +13,9 @@ def run(
 ):
     device = "cuda:0" if torch.cuda.is_available() else "cpu"
     print(f"Using device: {device}")
-    model = TTS(language='EN', device=device)
+    model = objects.get(
+        ("melotts", "EN", device), lambda: TTS(language="EN", device=device)
+    )
     speaker_ids = model.hps.data.spk2id
 
     def generate(prompts):
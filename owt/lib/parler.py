@@ -1,3 +1,4 @@
+from owt import objects
 from owt.lib import stream, encoding
 from typing import Literal
 import torch
@@ -9,8 +10,6 @@ import nltk  # type: ignore
 import dataclasses 
 
 
-_CACHE = None
-
 
 def compile_forward_pass(model, tokenizer, device, compile_mode):
     print("Compiling forward pass...")
@@ -26,6 +25,16 @@ def compile_forward_pass(model, tokenizer, device, compile_mode):
         _ = model.generate(**model_kwargs)
     print("Warmup complete.")
 
+def load(model_name, attention, compile_mode, device):
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    feature_extractor = AutoFeatureExtractor.from_pretrained(model_name)
+    model = ParlerTTSForConditionalGeneration.from_pretrained(
+        model_name, torch_dtype=torch.bfloat16, attn_implementation=attention
+    ).to(device, dtype=torch.bfloat16)
+    if compile_mode != "none":
+        compile_forward_pass(model, tokenizer, device, compile_mode)
+    return model, tokenizer, feature_extractor
+
 def run(
     prompt: str = "",
     description: str = "A female speaker delivers a slightly expressive and animated speech with a moderate speed and pitch. The recording is of very high quality, with the speaker's voice sounding clear and very close up.",
@@ -46,21 +55,11 @@ def run(
     device = "cuda:0" if torch.cuda.is_available() else "cpu"
     print(f"Using device: {device}")
 
-    global _CACHE
-    if _CACHE is not None:
-        print("Using cached model/tokenizer.")
-        model, tokenizer, feature_extractor = _CACHE
-    else:
-        tokenizer = AutoTokenizer.from_pretrained(model_name)
-        feature_extractor = AutoFeatureExtractor.from_pretrained(model_name)
-        model = ParlerTTSForConditionalGeneration.from_pretrained(
-            model_name,
-            torch_dtype=torch.bfloat16,
-            attn_implementation=attention).to(device, dtype=torch.bfloat16)
-        if compile_mode != "none":
-            compile_forward_pass(model, tokenizer, device, compile_mode)
-        _CACHE = model, tokenizer, feature_extractor
-        print("Model/tokenizer/extractor cached.")
+    # Shared across requests and kept warm, per model and configuration.
+    model, tokenizer, feature_extractor = objects.get(
+        ("parler", model_name, attention, compile_mode, device),
+        lambda: load(model_name, attention, compile_mode, device),
+    )
 
     match split_type:
         case "sentence":
@@ -1,5 +1,6 @@
 import torch
 import io
+from owt import objects
 from owt.lib import stream, encoding, tts
 from TTS.api import TTS  # type: ignore
 
@@ -13,7 +14,10 @@ def run(
 ):
     device = "cuda:0" if torch.cuda.is_available() else "cpu"
     print(f"Using device: {device}")
-    model = TTS("tts_models/multilingual/multi-dataset/xtts_v2").to(device)
+    model_name = "tts_models/multilingual/multi-dataset/xtts_v2"
+    model = objects.get(
+        ("xtts", model_name, device), lambda: TTS(model_name).to(device)
+    )
 
     def generate(prompts):
         prompt = " ".join(prompts)
@@ -0,0 +1,164 @@
+import base64
+import dataclasses
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from owt.compiler import CodeKey, compile_adaptor
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(kw_only=True)
+class MountedAdaptor:
+    name: str
+    path: str
+    mtime: float
+    code_b64: str
+    namespace: dict[str, Any]
+    fn: Callable[..., Any]
+    loaded_at: float
+    reloads: int = 0
+    error: str | None = None
+
+
+@dataclass(kw_only=True)
+class Mount:
+    """Adaptor modules in directories on disk, served without sending their code.
+
+    Each <name>.py defining run is served at /<name> for requests that carry no
+    code. Files are polled for changes and recompiled in the background; a
+    reload runs in a copy of the previous namespace, so warm module state
+    survives unless the module reassigns it. Names listed in a module's
+    __owt_persist__ keep their previous values even then.
+    """
+
+    roots: list[str]
+    base_globals: Mapping[str, Any] = dataclasses.field(default_factory=dict)
+    poll_secs: float = 1.0
+    fn_name: str = "run"
+    _adaptors: dict[str, MountedAdaptor] = dataclasses.field(default_factory=dict)
+    # mtime of files that failed to load with no previous version to fall back on
+    _failed: dict[str, float] = dataclasses.field(default_factory=dict)
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+    _thread: threading.Thread | None = None
+    _stopped: threading.Event = dataclasses.field(default_factory=threading.Event)
+
+    def _files(self) -> dict[str, str]:
+        files = {}
+        for root in self.roots:
+            for filename in sorted(os.listdir(root)):
+                name, ext = os.path.splitext(filename)
+                if ext == ".py" and not name.startswith("_"):
+                    files[name] = os.path.join(root, filename)
+        return files
+
+    def _load(self, name: str, path: str, previous: MountedAdaptor | None) -> None:
+        mtime = os.stat(path).st_mtime
+        with open(path, "rb") as f:
+            source = f.read()
+        code_b64 = base64.b64encode(source).decode("utf-8")
+        if previous:
+            namespace = dict(previous.namespace)
+        else:
+            namespace = {
+                **self.base_globals,
+                "__name__": f"owt.mount.{name}",
+                "__file__": path,
+            }
+        start = time.perf_counter()
+        try:
+            compiled = compile_adaptor(
+                source.decode("utf-8"),
+                CodeKey.of(code_b64, self.fn_name),
+                self.base_globals,
+                namespace=namespace,
+                filename=path,
+            )
+        except Exception as e:
+            logger.exception("Failed to load mounted adaptor %s", path)
+            if previous:
+                # Keep serving the last good version.
+                previous.mtime, previous.error = mtime, str(e)
+            else:
+                self._failed[path] = mtime
+            return
+        self._failed.pop(path, None)
+        if previous:
+            for k in namespace.get("__owt_persist__", ()):
+                if k in previous.namespace:
+                    namespace[k] = previous.namespace[k]
+        with self._lock:
+            self._adaptors[name] = MountedAdaptor(
+                name=name,
+                path=path,
+                mtime=mtime,
+                code_b64=code_b64,
+                namespace=namespace,
+                fn=compiled.fn,
+                loaded_at=time.time(),
+                reloads=previous.reloads + 1 if previous else 0,
+            )
+        logger.info(
+            "%s mounted adaptor %s from %s in %.3fs",
+            "Reloaded" if previous else "Loaded",
+            name,
+            path,
+            time.perf_counter() - start,
+        )
+
+    def scan(self) -> None:
+        """Load new or changed modules and unmount deleted ones."""
+        files = self._files()
+        for name, path in files.items():
+            previous = self._adaptors.get(name)
+            try:
+                mtime = os.stat(path).st_mtime
+            except FileNotFoundError:
+                continue
+            if self._failed.get(path) == mtime:
+                continue
+            if previous is None or previous.path != path or previous.mtime != mtime:
+                self._load(name, path, previous)
+        with self._lock:
+            for name in set(self._adaptors) - set(files):
+                logger.info("Unmounted adaptor %s", name)
+                del self._adaptors[name]
+
+    def _poll(self) -> None:
+        while not self._stopped.wait(self.poll_secs):
+            try:
+                self.scan()
+            except Exception:
+                logger.exception("Error scanning mounted adaptors")
+
+    def start(self) -> None:
+        self.scan()
+        if self.poll_secs > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._poll, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def get(self, name: str) -> MountedAdaptor | None:
+        return self._adaptors.get(name)
+
+    def lookup(self, path: str) -> MountedAdaptor | None:
+        """The adaptor mounted at the first segment of a request path, if any."""
+        return self.get(path.strip("/").split("/")[0])
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            name: {
+                "path": adaptor.path,
+                "loaded_at": adaptor.loaded_at,
+                "reloads": adaptor.reloads,
+                "error": adaptor.error,
+            }
+            for name, adaptor in self._adaptors.items()
+        }
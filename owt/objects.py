@@ -0,0 +1,243 @@
+import collections
+import contextlib
+import dataclasses
+import itertools
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Hashable, Iterator
+from dataclasses import dataclass
+from typing import Any
+
+from owt.cache import sizeof
+
+logger = logging.getLogger(__name__)
+
+
+def rss() -> int | None:
+    """Resident bytes of this process, where known."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def measure(value: Any) -> int:
+    """Approximate bytes held by an object, counting the tensors of torch modules."""
+    match value:
+        case tuple() | list():
+            return sum(measure(v) for v in value)
+    if callable(getattr(value, "parameters", None)) and callable(
+        getattr(value, "buffers", None)
+    ):
+        return sum(
+            t.numel() * t.element_size()
+            for t in itertools.chain(value.parameters(), value.buffers())
+        )
+    return sizeof(value)
+
+
+@dataclass(kw_only=True)
+class WarmObject:
+    key: Hashable
+    value: Any = None
+    # Bytes counted against the budget.
+    size: int = 0
+    # Growth in resident memory while loading, which includes native allocations.
+    rss_delta: int | None = None
+    load_secs: float = 0.0
+    loaded_at: float = 0.0
+    hits: int = 0
+    # Callers in use() of the object, which is not evicted meanwhile.
+    users: int = 0
+    on_evict: Callable[[Any], None] | None = None
+    error: BaseException | None = None
+    ready: threading.Event = dataclasses.field(default_factory=threading.Event)
+    # Held by callers using the object exclusively.
+    lock: threading.RLock = dataclasses.field(default_factory=threading.RLock)
+
+
+@dataclass(kw_only=True)
+class Objects:
+    """Long-lived objects shared between requests, such as loaded models, by key.
+
+    Adaptors get an object by a key covering all of its configuration, with a factory
+    to build it if it isn't loaded. Concurrent callers for a missing key wait for one
+    load. The least recently used objects are evicted to keep within max_bytes, other
+    than those in use(); evicting only drops the registry's reference, so callers
+    still holding an object may keep using it. on_evict can free what the object's
+    reference doesn't, e.g. models held in a library's globals.
+    """
+
+    max_bytes: int | None = None
+    loads: int = 0
+    evictions: int = 0
+    _objects: collections.OrderedDict[Hashable, WarmObject] = dataclasses.field(
+        default_factory=collections.OrderedDict
+    )
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+
+    def get(
+        self,
+        key: Hashable,
+        factory: Callable[[], Any],
+        size: int | None = None,
+        on_evict: Callable[[Any], None] | None = None,
+    ) -> Any:
+        """The object for key, built by factory if not already loaded.
+
+        size overrides the measured size in bytes, e.g. for memory on a GPU.
+        """
+        return self._get(key, factory, size, on_evict, pin=False).value
+
+    @contextlib.contextmanager
+    def use(
+        self,
+        key: Hashable,
+        factory: Callable[[], Any],
+        size: int | None = None,
+        on_evict: Callable[[Any], None] | None = None,
+        exclusive: bool = False,
+    ) -> Iterator[Any]:
+        """As get, keeping the object loaded while in use, and if exclusive, used by
+        one caller at a time.
+        """
+        obj = self._get(key, factory, size, on_evict, pin=True)
+        try:
+            if exclusive:
+                with obj.lock:
+                    yield obj.value
+            else:
+                yield obj.value
+        finally:
+            with self._lock:
+                obj.users -= 1
+                evicted = self._evict()
+            self._evicted(evicted)
+
+    def discard(self, key: Hashable) -> bool:
+        """Evict the object for key now, unless it is in use or still loading."""
+        with self._lock:
+            obj = self._objects.get(key)
+            if obj is None or obj.users or not obj.ready.is_set():
+                return False
+            del self._objects[key]
+        self._evicted([obj])
+        return True
+
+    def _get(
+        self,
+        key: Hashable,
+        factory: Callable[[], Any],
+        size: int | None,
+        on_evict: Callable[[Any], None] | None,
+        pin: bool,
+    ) -> WarmObject:
+        with self._lock:
+            if (obj := self._objects.get(key)) is None:
+                obj = self._objects[key] = WarmObject(key=key, on_evict=on_evict)
+                loading = True
+            else:
+                self._objects.move_to_end(key)
+                loading = False
+            if pin:
+                obj.users += 1
+        if loading:
+            self._load(obj, factory, size)
+        else:
+            obj.ready.wait()
+            if obj.error is not None:
+                raise obj.error
+            obj.hits += 1
+        return obj
+
+    def _load(
+        self, obj: WarmObject, factory: Callable[[], Any], size: int | None
+    ) -> None:
+        rss_before = rss()
+        start = time.perf_counter()
+        try:
+            obj.value = factory()
+        except BaseException as e:
+            # Waiters see the error; later callers try again.
+            obj.error = e
+            with self._lock:
+                if self._objects.get(obj.key) is obj:
+                    del self._objects[obj.key]
+            obj.ready.set()
+            raise
+        obj.load_secs = time.perf_counter() - start
+        obj.loaded_at = time.time()
+        if rss_before is not None and (rss_after := rss()) is not None:
+            obj.rss_delta = rss_after - rss_before
+        obj.size = (
+            size if size is not None else max(measure(obj.value), obj.rss_delta or 0)
+        )
+        with self._lock:
+            self.loads += 1
+            obj.ready.set()
+            evicted = self._evict(keep=obj)
+        self._evicted(evicted)
+        logger.info("Loaded %r in %.3fs (%d bytes)", obj.key, obj.load_secs, obj.size)
+
+    def _evict(self, keep: WarmObject | None = None) -> list[WarmObject]:
+        if self.max_bytes is None:
+            return []
+        evicted = []
+        total = sum(o.size for o in self._objects.values())
+        for obj in list(self._objects.values()):
+            if total <= self.max_bytes:
+                break
+            if obj is keep or obj.users or not obj.ready.is_set():
+                continue
+            del self._objects[obj.key]
+            total -= obj.size
+            evicted.append(obj)
+        if total > self.max_bytes:
+            logger.warning(
+                "Warm objects use %d bytes, over budget of %d, with the rest in use",
+                total,
+                self.max_bytes,
+            )
+        return evicted
+
+    def _evicted(self, evicted: list[WarmObject]) -> None:
+        for obj in evicted:
+            self.evictions += 1
+            logger.info("Evicted %r (%d bytes)", obj.key, obj.size)
+            if obj.on_evict:
+                try:
+                    obj.on_evict(obj.value)
+                except Exception:
+                    logger.exception("Error evicting %r", obj.key)
+
+    def stats(self) -> dict[str, Any]:
+        objects = list(self._objects.values())
+        return {
+            "max_bytes": self.max_bytes,
+            "total_bytes": sum(o.size for o in objects),
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "objects": [
+                {
+                    "key": repr(o.key),
+                    "bytes": o.size,
+                    "rss_delta": o.rss_delta,
+                    "load_secs": o.load_secs,
+                    "loaded_at": o.loaded_at,
+                    "hits": o.hits,
+                    "users": o.users,
+                    "loading": not o.ready.is_set(),
+                }
+                for o in objects
+            ],
+        }
+
+
+# Shared by all adaptors in the process.
+OBJECTS = Objects()
+get = OBJECTS.get
+use = OBJECTS.use
+discard = OBJECTS.discard
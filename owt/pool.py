@@ -0,0 +1,460 @@
+import dataclasses
+import inspect
+import logging
+import mmap
+import multiprocessing
+import multiprocessing.connection
+import os
+import tempfile
+import threading
+import time
+import types
+import weakref
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from typing import Any
+
+from owt import formats
+
+logger = logging.getLogger(__name__)
+
+# Where large results are written for the server to map, in memory where available.
+SHM_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+class WorkerCrashed(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True, kw_only=True)
+class RequestData:
+    """What an adaptor may read of its request, for rebuilding it in a worker."""
+
+    method: str
+    path: str
+    query_string: bytes
+    headers: list[tuple[str, str]]
+    body: bytes
+
+    @classmethod
+    def of(cls, request: Any) -> "RequestData":
+        return cls(
+            method=request.method,
+            path=request.path,
+            query_string=request.query_string,
+            headers=request.headers.to_wsgi_list(),
+            body=request.get_data(),
+        )
+
+    def context(self, app: Any, path: str | None = None) -> Any:
+        """A request context in app for the request, or for the same request at path."""
+        return app.test_request_context(
+            path or self.path,
+            method=self.method,
+            query_string=self.query_string.decode("latin1"),
+            headers=self.headers,
+            data=self.body,
+        )
+
+
+@dataclass(frozen=True, kw_only=True)
+class Task:
+    code_b64: str
+    fn_name: str
+    kwargs: dict[str, Any]
+    request: RequestData
+
+
+@dataclass(kw_only=True)
+class PoolWorker:
+    index: int
+    process: Any = None
+    conn: multiprocessing.connection.Connection | None = None
+    lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+    tasks: int = 0
+    restarts: int = 0
+    # Seconds from starting the process to it being ready for tasks.
+    spawn_secs: float | None = None
+    # Code hashes this worker has run, and so has compiled and warm.
+    codes: set[str] = dataclasses.field(default_factory=set)
+
+    def send(self, message: Any) -> None:
+        assert self.conn
+        self.conn.send(message)
+
+    def recv(self, timeout: float | None) -> Any:
+        assert self.conn
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"No response from pool worker {self.index}")
+        return self.conn.recv()
+
+
+@dataclass(kw_only=True)
+class Pool:
+    """Long-lived worker processes running adaptors in isolation from the server.
+
+    Requests are routed by code hash, so that each worker keeps the adaptors it runs
+    compiled and their models loaded. A request waits up to spill_secs for a worker
+    already warm for its code before trying any idle worker. Results come back over a
+    pipe, or for large bytes and arrays through a file in shared memory that the server
+    maps. Streams come back chunk by chunk. Workers that crash or exceed timeout are
+    restarted.
+
+    Workers are spawned fresh, or with a zygote forked already warm from it.
+    """
+
+    size: int = 2
+    timeout: float | None = None
+    spill_secs: float = 1.0
+    shm_min_bytes: int = 1024 * 1024
+    adaptor_cache_size: int = 256
+    # Processes running adaptors in all, between which resource slots are divided.
+    resource_share: int = 1
+    # An owt.zygote.Zygote to fork workers from, if not spawning them.
+    zygote: Any = None
+    _workers: list[PoolWorker] = dataclasses.field(default_factory=list)
+    # Spawned rather than forked, since the server may already be running threads.
+    _context: Any = dataclasses.field(
+        default_factory=lambda: multiprocessing.get_context("spawn")
+    )
+
+    def start(self) -> None:
+        if self.zygote:
+            self.zygote.start()
+        self._workers = [PoolWorker(index=i) for i in range(self.size)]
+        # Start them all before waiting on any, so that spawned workers start in parallel.
+        starts = [self._launch(worker) for worker in self._workers]
+        for worker, start in zip(self._workers, starts):
+            self._await_ready(worker, start)
+
+    def stop(self) -> None:
+        for worker in self._workers:
+            if worker.process and worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+        if self.zygote:
+            self.zygote.stop()
+
+    def _launch(self, worker: PoolWorker) -> float:
+        start = time.perf_counter()
+        parent, child = self._context.Pipe()
+        if self.zygote:
+            worker.process = self.zygote.fork(child)
+            worker.codes = set(self.zygote.warmup.code_hashes)
+        else:
+            worker.process = self._context.Process(
+                target=serve_worker,
+                args=(
+                    child,
+                    self.shm_min_bytes,
+                    self.adaptor_cache_size,
+                    self.resource_share,
+                ),
+                daemon=True,
+                name=f"owt-pool-{worker.index}",
+            )
+            worker.process.start()
+            worker.codes = set()
+        child.close()
+        worker.conn = parent
+        return start
+
+    def _await_ready(self, worker: PoolWorker, start: float) -> None:
+        try:
+            worker.recv(None)
+        except (EOFError, OSError) as e:
+            raise WorkerCrashed(f"Pool worker {worker.index} failed to start") from e
+        worker.spawn_secs = time.perf_counter() - start
+        logger.info(
+            "Pool worker %d (%d) ready in %.3fs",
+            worker.index,
+            worker.process.pid,
+            worker.spawn_secs,
+        )
+
+    def _spawn(self, worker: PoolWorker) -> None:
+        self._await_ready(worker, self._launch(worker))
+
+    def _restart(self, worker: PoolWorker, reason: str) -> None:
+        logger.warning("Restarting pool worker %d: %s", worker.index, reason)
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join()
+        worker.restarts += 1
+        self._spawn(worker)
+
+    def _acquire(self, code_hash: str) -> PoolWorker:
+        affine = self._workers[int(code_hash[:8], 16) % len(self._workers)]
+        warm = [affine] + [
+            w for w in self._workers if w is not affine and code_hash in w.codes
+        ]
+        for worker in warm:
+            if worker.lock.acquire(blocking=False):
+                return worker
+        if affine.lock.acquire(timeout=self.spill_secs):
+            return affine
+        for worker in self._workers:
+            if worker.lock.acquire(blocking=False):
+                return worker
+        affine.lock.acquire()
+        return affine
+
+    def run(self, task: Task, code_hash: str) -> Any:
+        worker = self._acquire(code_hash)
+        try:
+            if not worker.process.is_alive():
+                self._restart(worker, f"exited with {worker.process.exitcode}")
+            worker.tasks += 1
+            worker.codes.add(code_hash)
+            worker.send(("run", task))
+            message = self._recv(worker)
+        except BaseException:
+            worker.lock.release()
+            raise
+        match message:
+            case ("stream", headers):
+                # The stream releases the worker when done, or if it is never started.
+                started = threading.Event()
+                chunks = self._stream(worker, started)
+                weakref.finalize(chunks, self._abandon, worker, started)
+                return chunks if headers is None else (chunks, headers)
+        worker.lock.release()
+        match message:
+            case ("value", value):
+                return value
+            case ("file", path, kind):
+                return load_file(path, kind)
+            case ("response", data, status, headers):
+                from flask import Response
+
+                return Response(data, status=status, headers=headers)
+            case ("error", error):
+                raise RuntimeError(error)
+            case _:
+                raise RuntimeError(f"Unexpected message from pool worker: {message}")
+
+    def _recv(self, worker: PoolWorker) -> Any:
+        try:
+            return worker.recv(self.timeout)
+        except TimeoutError:
+            self._restart(worker, f"timed out after {self.timeout}s")
+            raise
+        except (EOFError, OSError) as e:
+            self._restart(worker, f"crashed: {e!r}")
+            raise WorkerCrashed(f"Pool worker {worker.index} crashed") from e
+
+    def _stream(self, worker: PoolWorker, started: threading.Event) -> Iterator[Any]:
+        started.set()
+        done = False
+        try:
+            while True:
+                match self._recv(worker):
+                    case ("chunk", chunk):
+                        yield chunk
+                    case ("end",):
+                        done = True
+                        return
+                    case ("error", error):
+                        done = True
+                        raise RuntimeError(error)
+        except (TimeoutError, WorkerCrashed):
+            done = True
+            raise
+        finally:
+            if not done:
+                self._cancel(worker)
+            worker.lock.release()
+
+    def _abandon(self, worker: PoolWorker, started: threading.Event) -> None:
+        if not started.is_set():
+            self._cancel(worker)
+            worker.lock.release()
+
+    def _cancel(self, worker: PoolWorker) -> None:
+        # Stop the worker producing, and discard what it sent in the meantime.
+        try:
+            worker.send(("cancel",))
+            while self._recv(worker)[0] not in ("end", "error"):
+                pass
+        except Exception as e:
+            logger.warning(
+                "Failed to cancel stream in worker %d: %s",
+                worker.index,
+                e,
+                exc_info=True,
+            )
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": len(self._workers),
+            "zygote": self.zygote.stats() if self.zygote else None,
+            "workers": [
+                {
+                    "pid": w.process.pid if w.process else None,
+                    "alive": bool(w.process and w.process.is_alive()),
+                    "busy": w.lock.locked(),
+                    "tasks": w.tasks,
+                    "restarts": w.restarts,
+                    "codes": len(w.codes),
+                    "spawn_secs": w.spawn_secs,
+                    "memory": memory(w.process.pid) if w.process else None,
+                }
+                for w in self._workers
+            ],
+        }
+
+
+def memory(pid: int) -> dict[str, int] | None:
+    """Bytes resident for a process: in all (rss), and its share (pss) of pages it
+    shares with others, such as workers forked from a zygote. Linux only.
+    """
+    fields = {
+        "Rss:": "rss",
+        "Pss:": "pss",
+        "Private_Clean:": "private",
+        "Private_Dirty:": "private",
+    }
+    usage = {"rss": 0, "pss": 0, "private": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                match line.split():
+                    case [field, kb, "kB"] if field in fields:
+                        usage[fields[field]] += int(kb) * 1024
+    except OSError:
+        return None
+    return usage
+
+
+def load_file(path: str, kind: str) -> Any:
+    """Map a result written by a worker, removing its file."""
+    try:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    finally:
+        os.unlink(path)
+    if kind == "npy":
+        return formats.decode_npy(data)
+    return data
+
+
+def write_file(buffers: Iterable[bytes | bytearray | memoryview]) -> str:
+    fd, path = tempfile.mkstemp(prefix="owt-result-", dir=SHM_DIR)
+    with os.fdopen(fd, "wb") as f:
+        for buf in buffers:
+            f.write(buf)
+    return path
+
+
+def serve_worker(
+    conn: multiprocessing.connection.Connection,
+    shm_min_bytes: int,
+    adaptor_cache_size: int,
+    resource_share: int = 1,
+) -> None:
+    setup_worker(adaptor_cache_size, resource_share)
+    worker_loop(conn, shm_min_bytes)
+
+
+def setup_worker(adaptor_cache_size: int, resource_share: int = 1) -> None:
+    """Stand up the server state adaptors run against, without serving."""
+    import owt.server
+    from owt.admission import Admission
+    from owt.compiler import AdaptorCache
+
+    owt.server._SERVER = owt.server.Server(
+        address="",
+        port=0,
+        adaptor_cache=AdaptorCache(max_size=adaptor_cache_size),
+        admission=Admission(resource_share=resource_share),
+    )
+
+
+def worker_loop(
+    conn: multiprocessing.connection.Connection, shm_min_bytes: int
+) -> None:
+    """Run tasks from the server until it goes away."""
+    conn.send(("ready", os.getpid()))
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        match message:
+            case ("run", task):
+                run_task(conn, task, shm_min_bytes)
+            case ("cancel",):
+                # Arrived after the stream it was for had already ended.
+                pass
+
+
+def run_task(
+    conn: multiprocessing.connection.Connection, task: Task, shm_min_bytes: int
+) -> None:
+    from flask import Response
+
+    from owt.asgi import await_result
+    from owt.server import Unsafe, app
+
+    try:
+        with task.request.context(app):
+            unsafe = Unsafe(
+                code_b64=task.code_b64, fn_name=task.fn_name, raw_kwargs=task.kwargs
+            )
+            result = unsafe.unsafe_exec()
+            if inspect.isawaitable(result):
+                result = await_result(result, {})
+            match result:
+                case (
+                    (types.GeneratorType() | types.AsyncGeneratorType()) as chunks,
+                    headers,
+                ):
+                    send_stream(conn, chunks, headers)
+                case types.GeneratorType() | types.AsyncGeneratorType():
+                    send_stream(conn, result, None)
+                case Response():
+                    conn.send(
+                        (
+                            "response",
+                            result.get_data(),
+                            result.status_code,
+                            result.headers.to_wsgi_list(),
+                        )
+                    )
+                case _:
+                    send_value(conn, result, shm_min_bytes)
+    except Exception as e:
+        logger.exception("Error in pool worker")
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+def send_value(
+    conn: multiprocessing.connection.Connection, value: Any, shm_min_bytes: int
+) -> None:
+    match value:
+        case bytes() | bytearray() | memoryview() if len(value) >= shm_min_bytes:
+            conn.send(("file", write_file([value]), "bytes"))
+        case _ if formats.is_ndarray(value) and value.nbytes >= shm_min_bytes:
+            conn.send(("file", write_file(formats.npy_buffers(value)), "npy"))
+        case memoryview():
+            conn.send(("value", value.tobytes()))
+        case _:
+            conn.send(("value", value))
+
+
+def send_stream(
+    conn: multiprocessing.connection.Connection, chunks: Any, headers: Any
+) -> None:
+    from owt.asgi import iter_async
+
+    if isinstance(chunks, types.AsyncGeneratorType):
+        chunks = iter_async(chunks)
+    conn.send(("stream", headers))
+    start = time.perf_counter()
+    for chunk in chunks:
+        if conn.poll() and conn.recv() == ("cancel",):
+            logger.info("Stream cancelled after %.3fs", time.perf_counter() - start)
+            chunks.close()
+            break
+        conn.send(("chunk", chunk))
+    conn.send(("end",))
@@ -0,0 +1,193 @@
+import collections
+import contextlib
+import dataclasses
+import heapq
+import itertools
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import Any
+
+from owt.admission import Rejected
+
+
+def percentiles(samples: collections.deque[float]) -> dict[str, float | None]:
+    ordered = sorted(samples)
+    if not ordered:
+        return {"p50": None, "p90": None, "p99": None}
+    return {
+        f"p{p}": ordered[min(len(ordered) - 1, len(ordered) * p // 100)]
+        for p in (50, 90, 99)
+    }
+
+
+@dataclass(kw_only=True)
+class SchedClass:
+    weight: float
+    # Virtual time at which this class's latest request finishes.
+    finish: float = 0.0
+    served: int = 0
+    waiting: int = 0
+    rejected: int = 0
+    waits: collections.deque[float] = dataclasses.field(
+        default_factory=lambda: collections.deque(maxlen=1024)
+    )
+    latencies: collections.deque[float] = dataclasses.field(
+        default_factory=lambda: collections.deque(maxlen=1024)
+    )
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "weight": self.weight,
+            "served": self.served,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "wait_secs": percentiles(self.waits),
+            "latency_secs": percentiles(self.latencies),
+        }
+
+
+@dataclass(order=True)
+class Waiter:
+    finish: float
+    seq: int
+    start: float = dataclasses.field(compare=False)
+    sched_class: SchedClass = dataclasses.field(compare=False)
+    granted: threading.Event = dataclasses.field(
+        compare=False, default_factory=threading.Event
+    )
+
+
+@dataclass(kw_only=True)
+class Scheduler:
+    """Weighted fair queueing of execution slots across classes of request.
+
+    Each request is tagged on arrival with the virtual time at which it would finish
+    were each class served in proportion to its weight, given how long requests for
+    its code usually take. Free slots go to the waiting request that finishes first.
+    So quick calls overtake queued long ones, and a class with twice the weight gets
+    twice the slot time of another under contention, while no class starves.
+
+    Latency (from arrival to giving up the slot, which for a stream is when it ends)
+    and wait percentiles are kept per class over its most recent requests.
+
+    Classes are named by clients, so beyond max_classes those without a configured
+    weight share the default class rather than each being tracked.
+    """
+
+    slots: int
+    weights: dict[str, float] = dataclasses.field(default_factory=dict)
+    default_weight: float = 1.0
+    max_classes: int = 64
+    max_waiting: int | None = 256
+    max_wait_secs: float | None = None
+    # Estimated seconds per request, by code hash, learned from requests served.
+    max_costs: int = 4096
+    _costs: dict[str, float] = dataclasses.field(default_factory=dict)
+    _mean_cost: float = 1.0
+    _virtual: float = 0.0
+    _busy: int = 0
+    _heap: list[Waiter] = dataclasses.field(default_factory=list)
+    _classes: dict[str, SchedClass] = dataclasses.field(default_factory=dict)
+    _seq: Iterator[int] = dataclasses.field(default_factory=itertools.count)
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+
+    @property
+    def enabled(self) -> bool:
+        return self.slots > 0
+
+    def _class(self, name: str) -> SchedClass:
+        if (
+            name not in self._classes
+            and name not in self.weights
+            and len(self._classes) >= self.max_classes
+        ):
+            name = "default"
+        if (sched_class := self._classes.get(name)) is None:
+            sched_class = self._classes[name] = SchedClass(
+                weight=self.weights.get(name, self.default_weight)
+            )
+        return sched_class
+
+    def _learn(self, cost_key: str, secs: float) -> None:
+        previous = self._costs.pop(cost_key, None)
+        self._costs[cost_key] = (
+            secs if previous is None else 0.7 * previous + 0.3 * secs
+        )
+        if len(self._costs) > self.max_costs:
+            del self._costs[next(iter(self._costs))]
+        self._mean_cost = 0.9 * self._mean_cost + 0.1 * secs
+
+    def acquire(self, name: str, cost_key: str) -> SchedClass:
+        with self._lock:
+            sched_class = self._class(name)
+            start = max(self._virtual, sched_class.finish)
+            cost = self._costs.get(cost_key, self._mean_cost)
+            sched_class.finish = start + cost / sched_class.weight
+            if self._busy < self.slots and not self._heap:
+                self._busy += 1
+                self._virtual = start
+                return sched_class
+            if self.max_waiting is not None and len(self._heap) >= self.max_waiting:
+                sched_class.rejected += 1
+                raise Rejected(
+                    f"Too many requests waiting to be scheduled ({name})",
+                    429,
+                    max(1, round(self._mean_cost * len(self._heap) / self.slots)),
+                )
+            waiter = Waiter(
+                finish=sched_class.finish,
+                seq=next(self._seq),
+                start=start,
+                sched_class=sched_class,
+            )
+            heapq.heappush(self._heap, waiter)
+            sched_class.waiting += 1
+        if waiter.granted.wait(self.max_wait_secs):
+            return sched_class
+        with self._lock:
+            if waiter.granted.is_set():
+                return sched_class
+            self._heap.remove(waiter)
+            heapq.heapify(self._heap)
+            sched_class.waiting -= 1
+            sched_class.rejected += 1
+        raise Rejected(f"Timed out waiting to be scheduled ({name})", 503, 1)
+
+    def release(self, sched_class: SchedClass, cost_key: str, held_secs: float) -> None:
+        with self._lock:
+            sched_class.served += 1
+            self._learn(cost_key, held_secs)
+            if self._heap:
+                # Hand the slot straight to the next waiter.
+                waiter = heapq.heappop(self._heap)
+                waiter.sched_class.waiting -= 1
+                self._virtual = max(self._virtual, waiter.start)
+                waiter.granted.set()
+            else:
+                self._busy -= 1
+
+    @contextlib.contextmanager
+    def slot(self, name: str, cost_key: str) -> Iterator[None]:
+        arrived = time.monotonic()
+        sched_class = self.acquire(name, cost_key)
+        started = time.monotonic()
+        sched_class.waits.append(started - arrived)
+        try:
+            yield
+        finally:
+            ended = time.monotonic()
+            sched_class.latencies.append(ended - arrived)
+            self.release(sched_class, cost_key, ended - started)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            classes = dict(self._classes)
+            waiting = len(self._heap)
+        return {
+            "slots": self.slots,
+            "busy": self._busy,
+            "waiting": waiting,
+            "classes": {name: c.stats() for name, c in classes.items()},
+        }
@@ -1,22 +1,68 @@
 import argparse
-import traceback
 import types
 import sys
 import builtins
 import base64
+import collections
+import contextlib
 import dataclasses
+import functools
 import hashlib
+import inspect
+import itertools
 import json
 import logging
+import mmap
 import os
+import reprlib
+import threading
+import time
 from dataclasses import dataclass
 from logging.config import dictConfig
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Iterator, Mapping, Optional
+from owt import batching, formats, objects, wsgi
 from owt.summat import adaptor
 from owt.summat.syntax import pipe
-from flask import Flask, Response, request, Request, make_response
+from owt.compiler import (
+    AdaptorCache,
+    CodeKey,
+    CodeRegistry,
+    UnknownCodeHash,
+    compile_adaptor,
+    normalized_code_hash,
+)
+from owt.admission import Admission, Rejected, held_until_done
+from owt.jobs import JobQueueFull, Jobs
+from owt.mount import Mount
+from owt.objects import Objects
+from owt.pool import Pool, RequestData, Task
+from owt.scheduler import Scheduler
+from owt.warmup import Warmup, WarmupStatus
+from owt.zygote import Zygote
+from owt.cache import (
+    Cache,
+    DiskCache,
+    LiveRecordings,
+    Recording,
+    ResultCache,
+    SingleFlight,
+    TieredCache,
+)
+from flask import Flask, Response, g, request, Request, make_response
 from flask_cors import CORS
 from flask_httpauth import HTTPBasicAuth
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.exceptions import RequestEntityTooLarge
+
+loads_json: Callable[[bytes | str], Any]
+try:
+    import orjson
+
+    loads_json = orjson.loads
+except ImportError:
+    loads_json = json.loads
+
+logger = logging.getLogger(__name__)
 
 # Any syntax forwards to be available in the global namespace
 pipe = pipe
@@ -50,9 +96,11 @@ def configure_logging(verbosity: int = 0):
                 }
             },
             "root": {"level": level, "handlers": ["console"]},
+            # Keep the module loggers created on import.
+            "disable_existing_loggers": False,
         }
     )
-    logging.info(f"Setting verbosity/level to {verbosity}/{level}")
+    logger.info(f"Setting verbosity/level to {verbosity}/{level}")
 
 
 parser = argparse.ArgumentParser(
@@ -71,6 +119,237 @@ parser.add_argument(
     default=os.environ.get("OWT_AUTH", None),
     help="Basic auth username:password_sha256. --auth for owt:owt",
 )
+parser.add_argument(
+    "--adaptor-cache-size",
+    type=int,
+    default=int(os.environ.get("OWT_ADAPTOR_CACHE_SIZE", "256")),
+    help="Number of compiled adaptors to keep warm (0 to disable)",
+)
+parser.add_argument(
+    "--cache-max-bytes",
+    type=int,
+    default=int(os.environ.get("OWT_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+    help="Memory budget for cached results in bytes",
+)
+parser.add_argument(
+    "--cache-max-entries",
+    type=int,
+    default=int(os.environ.get("OWT_CACHE_MAX_ENTRIES", "1024")),
+    help="Maximum number of cached results",
+)
+parser.add_argument(
+    "--cache-ttl",
+    type=float,
+    default=os.environ.get("OWT_CACHE_TTL"),
+    help="Default TTL for cached results in seconds (default: no expiry)",
+)
+parser.add_argument(
+    "--cache-admit-min-secs",
+    type=float,
+    default=float(os.environ.get("OWT_CACHE_ADMIT_MIN_SECS", "0.0")),
+    help="Don't cache results faster than this to compute...",
+)
+parser.add_argument(
+    "--cache-admit-min-bytes",
+    type=int,
+    default=int(os.environ.get("OWT_CACHE_ADMIT_MIN_BYTES", "0")),
+    help="...and smaller than this many bytes",
+)
+parser.add_argument(
+    "--cache-dir",
+    default=os.environ.get("OWT_CACHE_DIR"),
+    help="Directory for a persistent cache tier, shareable between processes",
+)
+parser.add_argument(
+    "--cache-dir-max-bytes",
+    type=int,
+    default=int(os.environ.get("OWT_CACHE_DIR_MAX_BYTES", str(4 * 1024 * 1024 * 1024))),
+    help="Disk budget for the persistent cache tier in bytes",
+)
+parser.add_argument(
+    "--cache-spill-min-bytes",
+    type=int,
+    default=int(os.environ.get("OWT_CACHE_SPILL_MIN_BYTES", str(1024 * 1024))),
+    help="bytes/numpy results at least this large are served from disk via mmap",
+)
+parser.add_argument(
+    "--mount",
+    action="append",
+    default=[],
+    metavar="DIR",
+    help="Serve each adaptor module DIR/<name>.py at /<name> (repeatable)",
+)
+parser.add_argument(
+    "--mount-poll-secs",
+    type=float,
+    default=float(os.environ.get("OWT_MOUNT_POLL_SECS", "1.0")),
+    help="How often to check mounted adaptors for changes (0 to disable)",
+)
+parser.add_argument(
+    "--max-kwargs-bytes",
+    type=int,
+    default=int(os.environ.get("OWT_MAX_KWARGS_BYTES", str(64 * 1024 * 1024))),
+    help="Reject requests whose decoded kwargs exceed this many bytes (0 for no limit)",
+)
+parser.add_argument(
+    "--workers",
+    type=int,
+    default=int(os.environ.get("OWT_WORKERS", "0")),
+    help="Serve from this many worker processes (0 for the development server)",
+)
+parser.add_argument(
+    "--threads",
+    type=int,
+    default=int(os.environ.get("OWT_THREADS", "1")),
+    help="Threads per worker process",
+)
+parser.add_argument(
+    "--worker-timeout",
+    type=int,
+    default=int(os.environ.get("OWT_WORKER_TIMEOUT", "120")),
+    help="Restart workers silent for this many seconds (0 to never restart)",
+)
+parser.add_argument(
+    "--keepalive",
+    type=int,
+    default=int(os.environ.get("OWT_KEEPALIVE", "5")),
+    help="Seconds to hold idle keep-alive connections open",
+)
+parser.add_argument(
+    "--graceful-timeout",
+    type=int,
+    default=int(os.environ.get("OWT_GRACEFUL_TIMEOUT", "30")),
+    help="Seconds workers may finish requests on restart (SIGHUP) or shutdown",
+)
+parser.add_argument(
+    "--asgi",
+    action="store_true",
+    default=bool(os.environ.get("OWT_ASGI")),
+    help="Serve over ASGI with uvicorn, streaming async adaptors from an event loop",
+)
+parser.add_argument(
+    "--asgi-threads",
+    type=int,
+    default=int(os.environ.get("OWT_ASGI_THREADS", "32")),
+    help="In ASGI mode, threads for running blocking adaptors",
+)
+parser.add_argument(
+    "--pool",
+    type=int,
+    default=int(os.environ.get("OWT_POOL", "0")),
+    help="Run adaptors in this many isolated worker processes (0 to run in-process)",
+)
+parser.add_argument(
+    "--pool-timeout",
+    type=float,
+    default=os.environ.get("OWT_POOL_TIMEOUT"),
+    help="Restart pool workers taking longer than this many seconds to respond",
+)
+parser.add_argument(
+    "--pool-spill-secs",
+    type=float,
+    default=float(os.environ.get("OWT_POOL_SPILL_SECS", "1.0")),
+    help="How long to wait for a worker warm for the code before using any idle worker",
+)
+parser.add_argument(
+    "--zygote",
+    action="store_true",
+    default=bool(os.environ.get("OWT_ZYGOTE")),
+    help="Fork pool workers from a process warmed up once, rather than spawning each",
+)
+parser.add_argument(
+    "--warmup",
+    type=str,
+    default=os.environ.get("OWT_WARMUP"),
+    help=(
+        "JSON file of modules to import and adaptors to run at startup, before "
+        "/_owt/ready reports ready (in the zygote with --zygote)"
+    ),
+)
+parser.add_argument(
+    "--preload",
+    type=str,
+    action="append",
+    default=[],
+    help="Import this module at startup, as with --warmup (may be repeated)",
+)
+parser.add_argument(
+    "--jobs-workers",
+    type=int,
+    default=int(os.environ.get("OWT_JOBS_WORKERS", "2")),
+    help="Jobs submitted to /_owt/jobs to run at once (per server process)",
+)
+parser.add_argument(
+    "--jobs-max-queued",
+    type=int,
+    default=int(os.environ.get("OWT_JOBS_MAX_QUEUED", "256")),
+    help="Jobs to queue before refusing more with 503",
+)
+parser.add_argument(
+    "--jobs-retain-secs",
+    type=float,
+    default=float(os.environ.get("OWT_JOBS_RETAIN_SECS", "3600")),
+    help="Seconds to keep finished jobs' results",
+)
+parser.add_argument(
+    "--max-concurrency",
+    type=int,
+    default=int(os.environ.get("OWT_MAX_CONCURRENCY", "0")),
+    help="Adaptors to run at once in all (0 for no limit)",
+)
+parser.add_argument(
+    "--path-concurrency",
+    type=str,
+    action="append",
+    default=[],
+    metavar="PREFIX=N",
+    help="Adaptors to run at once for paths under PREFIX (may be repeated)",
+)
+parser.add_argument(
+    "--code-concurrency",
+    type=int,
+    default=int(os.environ.get("OWT_CODE_CONCURRENCY", "0")),
+    help="Adaptors to run at once for each code hash (0 for no limit)",
+)
+parser.add_argument(
+    "--max-waiting",
+    type=int,
+    default=int(os.environ.get("OWT_MAX_WAITING", "64")),
+    help="Requests to queue for each limit before rejecting with 429",
+)
+parser.add_argument(
+    "--max-wait-secs",
+    type=float,
+    default=float(os.environ.get("OWT_MAX_WAIT_SECS", "30")),
+    help="Seconds a request may queue for a limit before rejecting with 503",
+)
+parser.add_argument(
+    "--sched-slots",
+    type=int,
+    default=int(os.environ.get("OWT_SCHED_SLOTS", "0")),
+    help="Adaptors to run at once, shared fairly across request classes by weight "
+    "(0 to not schedule)",
+)
+parser.add_argument(
+    "--sched-weight",
+    type=str,
+    action="append",
+    default=[],
+    metavar="CLASS=WEIGHT",
+    help="Weight of a request class (sched_class or X-Owt-Class), default 1",
+)
+parser.add_argument(
+    "--sched-max-classes",
+    type=int,
+    default=int(os.environ.get("OWT_SCHED_MAX_CLASSES", "64")),
+    help="Request classes to track, beyond which unweighted ones share 'default'",
+)
+parser.add_argument(
+    "--objects-max-bytes",
+    type=int,
+    default=int(os.environ.get("OWT_OBJECTS_MAX_BYTES", "0")),
+    help="Memory budget in bytes for warm objects such as models (0 for no limit)",
+)
 v_group = parser.add_mutually_exclusive_group()
 v_group.add_argument("-v", action="store_true")
 v_group.add_argument("-vv", action="store_true")
@@ -83,6 +362,16 @@ auth = HTTPBasicAuth()
 CORS(app)
 
 
+@dataclass(frozen=True)
+class Lazy:
+    """Defers building an expensive log argument until the record is emitted."""
+
+    f: Callable[[], Any]
+
+    def __str__(self) -> str:
+        return str(self.f())
+
+
 @dataclass(frozen=True)
 class PlaintextPassword:
     password: str
@@ -113,9 +402,9 @@ class BasicAuth:
 
     def authenticate(self, username: str, password: PlaintextPassword) -> bool:
         if username not in self.usernameToSHA256:
-            logging.warning("User not known to auth: %s", username)
+            logger.warning("User not known to auth: %s", username)
             return False
-        logging.info("Checking sha256 for %s", username)
+        logger.info("Checking sha256 for %s", username)
         return self.usernameToSHA256.get(username) == password.sha256()
 
 
@@ -123,17 +412,94 @@ class BasicAuth:
 class Server:
     address: str
     port: int
-    cache: dict["CacheKey", Any] = dataclasses.field(default_factory=dict)
+    cache: Cache = dataclasses.field(default_factory=ResultCache)
+    adaptor_cache: AdaptorCache = dataclasses.field(default_factory=AdaptorCache)
+    flights: SingleFlight = dataclasses.field(default_factory=SingleFlight)
+    recordings: LiveRecordings = dataclasses.field(default_factory=LiveRecordings)
+    registry: CodeRegistry = dataclasses.field(default_factory=CodeRegistry)
+    mount: Mount | None = None
+    max_kwargs_bytes: int | None = 64 * 1024 * 1024
+    kwargs_stats: "DecodeStats" = dataclasses.field(
+        default_factory=lambda: DecodeStats()
+    )
+    workers: wsgi.Workers | None = None
+    asgi_threads: int | None = None
+    pool: Pool | None = None
+    jobs: Jobs = dataclasses.field(default_factory=Jobs)
+    admission: Admission = dataclasses.field(default_factory=Admission)
+    objects: Objects = dataclasses.field(default_factory=lambda: objects.OBJECTS)
+    scheduler: Scheduler = dataclasses.field(default_factory=lambda: Scheduler(slots=0))
     auth: BasicAuth | None = None
+    # Run in each server process at startup, unless the pool's zygote runs it.
+    warmup: Warmup | None = None
+    warmup_status: WarmupStatus = dataclasses.field(default_factory=WarmupStatus)
 
     @classmethod
     def serve(cls, **kwargs):
         global _SERVER
         _SERVER = cls(**kwargs)
         print(f"Owt starting on {_SERVER.address}:{_SERVER.port}")
-        if not app.config.get("TESTING"):
+        if app.config.get("TESTING"):
+            _SERVER.start()
+        elif _SERVER.asgi_threads:
+            from owt import asgi
+
+            asgi_app = asgi.App(flask_app=app, threads=_SERVER.asgi_threads)
+            if _SERVER.workers:
+                wsgi.serve(
+                    asgi_app,
+                    _SERVER.address,
+                    _SERVER.port,
+                    dataclasses.replace(
+                        _SERVER.workers, worker_class="uvicorn.workers.UvicornWorker"
+                    ),
+                    on_worker_start=_SERVER.start,
+                )
+            else:
+                asgi_app.on_startup = _SERVER.start
+                asgi.serve(asgi_app, _SERVER.address, _SERVER.port)
+        elif _SERVER.workers:
+            wsgi.serve(
+                app,
+                _SERVER.address,
+                _SERVER.port,
+                _SERVER.workers,
+                on_worker_start=_SERVER.start,
+            )
+        else:
+            _SERVER.start()
             app.run(port=_SERVER.port, host=_SERVER.address)
 
+    def start(self) -> None:
+        """Start background work, once in each process serving requests."""
+        if self.mount:
+            self.mount.start()
+        if self.pool:
+            self.pool.start()
+            if self.pool.zygote:
+                self.warmup_status.update(self.pool.zygote.warmup_secs)
+        if self.warmup:
+            # In the background, so that probes of /_owt/ready can see it warming up.
+            threading.Thread(
+                target=self.warm_up, name="owt-warmup", daemon=True
+            ).start()
+        else:
+            self.warmup_status.ready.set()
+
+    def warm_up(self) -> None:
+        """Run the warmup, becoming ready once it has succeeded."""
+        assert self.warmup
+        status = self.warmup_status
+        start = time.perf_counter()
+        try:
+            self.warmup.run(status.record)
+        except Exception as e:
+            status.error = f"{type(e).__name__}: {e}"
+            logger.exception("Warmup failed, so not ready: %s", status.error)
+            return
+        logger.info("Warmup complete in %.3fs", time.perf_counter() - start)
+        status.ready.set()
+
     @classmethod
     def sing(cls) -> "Server":
         global _SERVER
@@ -141,6 +507,26 @@ class Server:
             raise RuntimeError("Server not started")
         return _SERVER
 
+    def stats(self) -> dict[str, Any]:
+        return {
+            # Each worker process reports its own stats.
+            "pid": os.getpid(),
+            "adaptors": self.adaptor_cache.stats(),
+            "registry": self.registry.stats(),
+            "cache": self.cache.stats(),
+            "flights": self.flights.stats(),
+            "recordings": self.recordings.stats(),
+            "mounts": self.mount.stats() if self.mount else {},
+            "kwargs": self.kwargs_stats.stats(),
+            "pool": self.pool.stats() if self.pool else None,
+            "jobs": self.jobs.stats(),
+            "admission": self.admission.stats(),
+            "scheduler": self.scheduler.stats() if self.scheduler.enabled else None,
+            "batching": batching.stats(),
+            "objects": self.objects.stats(),
+            "warmup_secs": self.warmup_status.secs,
+        }
+
 
 _SERVER: Server | None = None
 
@@ -155,22 +541,192 @@ def verify(username, password):
 
 @dataclass(frozen=True, kw_only=True)
 class CacheKey:
-    path: str
-    kwargs_b64: str | None = None
+    # Request path, unless the result is shared across paths.
+    path: str | None = None
+
+    # Hash of the normalized adaptor code, so different code never shares results.
+    code_hash: str | None = None
+
+    # Hash of the canonically serialized kwargs, if results are per-kwargs.
+    kwargs_hash: str | None = None
 
     def __repr__(self):
-        if self.kwargs_b64:
-            return f"CacheKey({self.path}, {self.kwargs_b64})"
-        else:
-            return f"CacheKey({self.path})"
+        parts = [
+            self.path,
+            self.code_hash and f"code={self.code_hash[:12]}",
+            self.kwargs_hash and f"kwargs={self.kwargs_hash[:12]}",
+        ]
+        return f"CacheKey({', '.join(p for p in parts if p)})"
+
+    def digest(self) -> str:
+        """A stable hash of the full key, e.g. to name its entry in a DiskCache."""
+        fields = [self.path, self.code_hash, self.kwargs_hash]
+        return hashlib.sha256(json.dumps(fields).encode()).hexdigest()
+
+    @classmethod
+    def of(cls, unsafe: "Unsafe", path: str) -> "CacheKey":
+        if unsafe.cache_key_override:
+            return unsafe.cache_key_override
+        return cls(
+            path=path if unsafe.cache_path else None,
+            code_hash=normalized_code_hash(unsafe.code_b64, unsafe.fn_name),
+            kwargs_hash=(
+                hashlib.sha256(canonical_kwargs(unsafe.kwargs).encode()).hexdigest()
+                if unsafe.cache_kwargs
+                else None
+            ),
+        )
+
+
+def canonical_kwargs(kwargs: dict[str, Any]) -> str:
+    """Serialize kwargs independently of key order and whitespace in the request."""
+
+    def default(o: Any) -> Any:
+        match o:
+            case set() | frozenset():
+                return sorted(repr(x) for x in o)
+            case bytes() | bytearray() | memoryview():
+                return {"__sha256__": hashlib.sha256(o).hexdigest()}
+            case _ if formats.is_ndarray(o):
+                # repr elides large arrays, so hash the data itself.
+                return {
+                    "__ndarray__": [str(o.dtype), list(o.shape)],
+                    "__sha256__": hashlib.sha256(o.tobytes()).hexdigest(),
+                }
+            case _:
+                return repr(o)
+
+    try:
+        return json.dumps(
+            kwargs, sort_keys=True, separators=(",", ":"), default=default
+        )
+    except TypeError:
+        # e.g. mixed key types that cannot be sorted
+        return repr(sorted((repr(k), repr(v)) for k, v in kwargs.items()))
+
+
+class KwargsTooLarge(ValueError):
+    pass
+
+
+@contextlib.contextmanager
+def body_limited(request: Request) -> Iterator[None]:
+    """Refuse the request body before it is read if it exceeds the kwargs limit."""
+    max_bytes = Server.sing().max_kwargs_bytes
+    request.max_content_length = max_bytes
+    try:
+        yield
+    except RequestEntityTooLarge as e:
+        raise KwargsTooLarge(f"Body exceeds kwargs limit of {max_bytes} bytes") from e
+
+
+def read_body(request: Request) -> bytes:
+    """The request body, refused before it is read if it exceeds the kwargs limit."""
+    with body_limited(request):
+        return request.get_data()
+
+
+@dataclass(kw_only=True)
+class DecodeStats:
+    """Time spent decoding request kwargs, and how they were decoded."""
+
+    decodes: collections.Counter[str] = dataclasses.field(
+        default_factory=collections.Counter
+    )
+    total_secs: float = 0.0
+    max_secs: float = 0.0
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+
+    def record(self, how: str, secs: float) -> None:
+        with self._lock:
+            self.decodes[how] += 1
+            self.total_secs += secs
+            self.max_secs = max(self.max_secs, secs)
+
+    def stats(self) -> dict[str, Any]:
+        n = sum(self.decodes.values())
+        return {
+            "decodes": dict(self.decodes),
+            "total_secs": self.total_secs,
+            "mean_secs": self.total_secs / n if n else 0.0,
+            "max_secs": self.max_secs,
+        }
+
+
+def decode_kwargs(
+    kwargs_b64: str, max_bytes: int | None = None
+) -> tuple[dict[str, Any], str]:
+    """Decode kwargs, returning them along with how they were decoded.
+
+    Plain JSON is parsed directly; anything else is evaluated as a Python literal
+    expression, and failing that passed through as a string.
+    """
+    # Checked before decoding, since the base64 length bounds the decoded size.
+    if max_bytes and len(kwargs_b64) * 3 // 4 > max_bytes:
+        raise KwargsTooLarge(
+            f"kwargs of ~{len(kwargs_b64) * 3 // 4} bytes exceed limit of {max_bytes}"
+        )
+    raw_kwargs = base64.b64decode(kwargs_b64)
+    logger.debug("Raw kwargs: %s", Lazy(lambda: reprlib.repr(raw_kwargs)))
+
+    def decode(raw: bytes | str) -> tuple[Any, str]:
+        try:
+            return loads_json(raw), "json"
+        except ValueError:
+            pass
+        raw_str = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+        try:
+            return eval(raw_str), "eval"
+        except Exception:  # noqa: BLE001 - whatever does not eval is a string
+            logger.warning("Failed to eval kwargs, treating as string: %s", raw_str)
+            return {"__last__": raw_str}, "string"
+
+    def as_kwargs(raw: bytes | str) -> tuple[dict[str, Any], str]:
+        decoded_kwargs, how = decode(raw)
+        match decoded_kwargs:
+            case builtins.dict():
+                return decoded_kwargs, how
+            case builtins.str():
+                return as_kwargs(decoded_kwargs)
+            case _:
+                logger.warning(
+                    "Passing decoded kwargs as single value: %s", decoded_kwargs
+                )
+                return {"__last__": decoded_kwargs}, how
+
+    return as_kwargs(raw_kwargs)
+
+
+def response_format(value: str | None) -> str | None:
+    if value and value not in formats.RESPONSE_FORMATS:
+        expected = ", ".join(formats.RESPONSE_FORMATS)
+        raise ValueError(f"Unknown response_format {value!r}, expected {expected}")
+    return value or None
+
+
+def negotiate(requested: str | None, accept: MIMEAccept) -> str | None:
+    """The format in which to encode structured results, if not the default JSON."""
+    if not requested:
+        mimetype = accept.best_match(list(formats.RESPONSE_FORMATS.values()))
+        requested = next(
+            (k for k, v in formats.RESPONSE_FORMATS.items() if v == mimetype), None
+        )
+    return None if requested == "json" else requested
 
-    def __hash__(self):
-        return hash((self.path, self.kwargs_b64))
+
+def flag(value: Any) -> bool:
+    """Interpret a boolean request field, which arrives as a string via GET params."""
+    match value:
+        case str():
+            return value.lower() in ("1", "true", "yes", "on")
+        case _:
+            return bool(value)
 
 
 @dataclass(frozen=True, kw_only=True)
 class Unsafe:
     # Code to run, defining a Callable[[Request, ...], Response] with a function of the expected name.
+    # Requests may send code_hash instead, for code previously sent or registered.
     code_b64: str
 
     # The function to run in the given code.
@@ -180,106 +736,177 @@ class Unsafe:
     # Kwargs to pass to the run function
     kwargs_b64: str | None = None
 
+    # Kwargs sent natively in a msgpack or multipart body, e.g. binary data passed as bytes or memoryviews.
+    # These take precedence over kwargs_b64.
+    raw_kwargs: Mapping[str, Any] = dataclasses.field(default_factory=dict)
+
     # If true, results will be cached according to the name of the endpoint provided
     use_cache: bool = False
 
     # If true, cache key will include kwargs so that the same endpoint can simulate per-arg determinism
     cache_kwargs: bool = False
 
+    # If false, the cache key omits the request path, sharing results for the same code across paths
+    cache_path: bool = True
+
     # If provided, the cache key will be overridden with this value
     cache_key_override: CacheKey | None = None
 
+    # If provided, cached results expire after this many seconds
+    cache_ttl: float | None = None
+
+    # Name of the mounted adaptor serving this request, if no code was sent
+    mounted: str | None = None
+
+    # If provided, encode structured results as one of formats.RESPONSE_FORMATS rather than per the Accept header
+    response_format: str | None = None
+
+    # Priority class or tenant key, sharing execution slots with others by weight.
+    # If not provided, taken from the X-Owt-Class header, else "default".
+    sched_class: str | None = None
+
     @property
     def code(self) -> str:
         return base64.b64decode(self.code_b64).decode("utf-8")
 
-    @property
+    @functools.cached_property
     def kwargs(self) -> dict[str, Any]:
+        """The decoded kwargs, decoded once on first access."""
         if not self.kwargs_b64:
-            return {}
+            return dict(self.raw_kwargs)
+        server = Server.sing()
+        start = time.perf_counter()
         try:
-            raw_kwargs = base64.b64decode(self.kwargs_b64).decode("utf-8")
-            logging.info("Raw kwargs: %s", raw_kwargs)
-
-            def decode_kwargs(raw_kwargs: str) -> dict[str, Any]:
-                try:
-                    decoded_kwargs = eval(raw_kwargs)
-                except Exception:
-                    logging.warning(
-                        "Failed to eval kwargs, treating as string: %s", raw_kwargs
-                    )
-                    return {"__last__": raw_kwargs}
-
-                logging.info("Decoded kwargs: %s", decoded_kwargs)
-                match decoded_kwargs:
-                    case builtins.dict():
-                        return decoded_kwargs
-                    case builtins.str():
-                        return decode_kwargs(decoded_kwargs)
-                    case _:
-                        logging.warning(
-                            "Passing decoded kwargs as single value: %s", decoded_kwargs
-                        )
-                        return {"__last__": decoded_kwargs}
-
-            return decode_kwargs(raw_kwargs)
+            kwargs, how = decode_kwargs(self.kwargs_b64, server.max_kwargs_bytes)
+        except KwargsTooLarge:
+            raise
         except Exception as e:
             raise ValueError(f"Failed to decode kwargs: {e}")
+        elapsed = time.perf_counter() - start
+        server.kwargs_stats.record(how, elapsed)
+        logger.debug("Decoded kwargs via %s in %.6fs", how, elapsed)
+        return {**kwargs, **self.raw_kwargs}
 
     def to_json(self) -> str:
-        return json.dumps(self.__dict__)
+        # Only the encoded fields, not any cached decodings or raw binary kwargs.
+        return json.dumps(dataclasses.asdict(dataclasses.replace(self, raw_kwargs={})))
 
     @classmethod
-    def from_dict(cls, json_dict: dict[str, Any]) -> "Unsafe":
+    def from_dict(
+        cls,
+        json_dict: Mapping[str, Any],
+        path: str | None = None,
+        raw_kwargs: Mapping[str, Any] | None = None,
+    ) -> "Unsafe":
+        server = Server.sing()
+        mounted = None
+        if code_b64 := json_dict.get("code_b64"):
+            server.registry.register(code_b64)
+        elif code_hash := json_dict.get("code_hash"):
+            code_b64 = server.registry.lookup(code_hash)
+        elif path and server.mount and (adaptor := server.mount.lookup(path)):
+            code_b64, mounted = adaptor.code_b64, adaptor.name
+        else:
+            raise ValueError("One of code_b64 or code_hash is required")
         return cls(
-            code_b64=json_dict["code_b64"],
+            code_b64=code_b64,
+            mounted=mounted,
             kwargs_b64=json_dict.get("kwargs_b64"),
+            raw_kwargs=raw_kwargs or {},
             fn_name=json_dict.get("fn_name", "run"),
-            use_cache=json_dict.get("use_cache", False),
-            cache_kwargs=json_dict.get("cache_kwargs", False),
-            cache_key_override=json_dict.get("cache_key_override"),
+            use_cache=flag(json_dict.get("use_cache", False)),
+            cache_kwargs=flag(json_dict.get("cache_kwargs", False)),
+            cache_path=flag(json_dict.get("cache_path", True)),
+            cache_key_override=(
+                CacheKey(path=str(json_dict["cache_key_override"]))
+                if json_dict.get("cache_key_override")
+                else None
+            ),
+            cache_ttl=(
+                float(json_dict["cache_ttl"])
+                if json_dict.get("cache_ttl") is not None
+                else None
+            ),
+            response_format=response_format(json_dict.get("response_format")),
+            sched_class=json_dict.get("sched_class"),
         )
 
     @classmethod
-    def from_json(cls, data: bytes) -> "Unsafe":
+    def from_json(cls, data: bytes, path: str | None = None) -> "Unsafe":
         try:
             json_dict = json.loads(data)
-            unsafe = cls.from_dict(json_dict)
-            logging.info("Unsafe parsed from JSON POST data: %s", unsafe.code)
+            unsafe = cls.from_dict(json_dict, path)
+            logger.info(
+                "Unsafe parsed from JSON POST data: %s", Lazy(lambda: unsafe.code)
+            )
             return unsafe
+        except UnknownCodeHash:
+            raise
         except Exception as e:
             raise ValueError(f"Failed to parse Unsafe from JSON: {e}")
 
+    @classmethod
+    def from_msgpack(cls, data: bytes, path: str | None = None) -> "Unsafe":
+        """Fields as in JSON, with native kwargs under "kwargs"."""
+        try:
+            body = formats.unpack(data)
+            return cls.from_dict(body, path, raw_kwargs=body.get("kwargs"))
+        except UnknownCodeHash:
+            raise
+        except Exception as e:
+            raise ValueError(f"Failed to parse Unsafe from msgpack: {e}") from e
+
+    @classmethod
+    def from_multipart(cls, request: Request) -> "Unsafe":
+        """Fields as form values, with each uploaded part passed as a kwarg of its name."""
+        with body_limited(request):
+            files, form = request.files, request.form
+        raw_kwargs = {
+            name: formats.read_part(part.stream, part.mimetype)
+            for name, part in files.items()
+        }
+        return cls.from_dict(form.to_dict(), request.path, raw_kwargs)
+
     @classmethod
     def from_request(cls, request: Request) -> "Unsafe":
+        match request.mimetype:
+            case formats.MSGPACK:
+                return cls.from_msgpack(read_body(request), request.path)
+            case formats.MULTIPART:
+                return cls.from_multipart(request)
+
         try:
-            unsafe = cls.from_json(request.data)
-            logging.info(
-                "Unsafe parsed from JSON POST data: \n\n%s", unsafe.code_indented(4)
+            unsafe = cls.from_json(request.data, request.path)
+            logger.info(
+                "Unsafe parsed from JSON POST data: \n\n%s",
+                Lazy(lambda: unsafe.code_indented(4)),
             )
             return unsafe
+        except UnknownCodeHash:
+            raise
         except Exception as e:
-            logging.debug(e)
-            logging.debug(f"POST data: {request.data!r}")
-            logging.debug(
+            logger.debug(e, exc_info=True)
+            logger.debug(f"POST data: {request.data!r}")
+            logger.debug(
                 "Failed to parse Unsafe from JSON POST data, trying GET params"
             )
 
         try:
-            logging.debug("GET params: %s", request.args.to_dict())
+            logger.debug("GET params: %s", request.args.to_dict())
             params = {}
             for key, value in request.args.to_dict().items():
                 params[key] = value
-            logging.debug("Decoded code:")
-            logging.debug(base64.b64decode(params["code_b64"]))
-            unsafe = cls.from_dict(params)
-            logging.info(
-                "Unsafe parsed from GET params: \n\n%s", unsafe.code_indented(4)
+            unsafe = cls.from_dict(params, request.path)
+            logger.info(
+                "Unsafe parsed from GET params: \n\n%s",
+                Lazy(lambda: unsafe.code_indented(4)),
             )
             return unsafe
+        except UnknownCodeHash:
+            raise
         except Exception as e:
-            logging.error(e)
-            logging.error("Failed to parse Unsafe from GET data")
+            logger.error(e)
+            logger.error("Failed to parse Unsafe from GET data")
             raise e
 
     def lines(self, indent: int = 0, prefix: str = "") -> list[str]:
@@ -290,58 +917,45 @@ class Unsafe:
     def code_indented(self, indent: int, prefix: str = "") -> str:
         return "\n".join(self.lines(indent=indent, prefix=prefix))
 
-    def explicit_run_code(self) -> str:
-        return f"""
-from owt import *
-
-{self.code}
-"""
-
-    def implicit_run_code(self) -> str:
-        return f"""
-from owt import *
-
-{self.fn_name} = (
-{self.code_indented(4)}
-)
-"""
-
-    def implicit_terse_run_code(self) -> str:
-        return f"""
-from owt import *
-
-{self.fn_name} = (
-    pipe()
-{self.code_indented(4, prefix=".")}
-)
-"""
+    @property
+    def code_key(self) -> CodeKey:
+        return CodeKey.of(self.code_b64, self.fn_name)
 
     def unsafe_exec_fn[**T](self) -> Callable[T, Any] | adaptor.Adaptor[T, Any]:
-        def exec_code(code: str) -> Callable[T, Any] | adaptor.Adaptor[T, Any] | None:
-            _globals, _locals = globals(), locals()
-            logging.info("Running code:\n\n%s", code)
-            try:
-                exec(code, _globals, _locals)
-            except Exception as e:
-                logging.debug(f"Error compiling Unsafe code: {e}\n\n{code}")
-                return None
-            return _locals.get(self.fn_name) or _globals.get(self.fn_name)
-
-        for mode, code_fn in [
-            ("explicit", self.explicit_run_code),
-            ("implicit", self.implicit_run_code),
-            ("implicit_terse", self.implicit_terse_run_code),
-        ]:
-            run_fn = exec_code(code_fn())
-            if run_fn:
-                logging.debug(f"Valid '{self.fn_name}' method defined in {mode} code")
-                return run_fn
-            logging.debug(f"No '{self.fn_name}' method defined in {mode} code")
-
-        raise RuntimeError(f"No '{self.fn_name}' method defined in any mode")
+        if (
+            self.mounted
+            and (mount := Server.sing().mount)
+            and (mounted := mount.get(self.mounted))
+        ):
+            return mounted.fn
+        adaptor_cache = Server.sing().adaptor_cache
+        key = self.code_key
+        if compiled := adaptor_cache.get(key):
+            logger.info("Compiled adaptor cache hit for %s (%s)", key, compiled.mode)
+            return compiled.fn
+
+        logger.info("Compiling code:\n\n%s", Lazy(lambda: self.code_indented(4)))
+        compiled = compile_adaptor(self.code, key, globals())
+        logger.debug(f"Valid '{self.fn_name}' method defined in {compiled.mode} code")
+        adaptor_cache.put(compiled)
+        return compiled.fn
+
+    def pool_exec(self, pool: Pool, request: Request) -> Any:
+        """Run in a pool worker, which rebuilds the request from what is sent to it."""
+        task = Task(
+            code_b64=self.code_b64,
+            fn_name=self.fn_name,
+            # memoryviews can't be pickled, so are copied
+            kwargs={
+                k: v.tobytes() if isinstance(v, memoryview) else v
+                for k, v in self.kwargs.items()
+            },
+            request=RequestData.of(request),
+        )
+        return pool.run(task, self.code_key.code_hash)
 
     def unsafe_exec(self) -> Any:
-        logging.info("Running with kwargs: %s", self.kwargs)
+        logger.info("Running with kwargs: %s", Lazy(lambda: reprlib.repr(self.kwargs)))
         try:
             f_parsed: adaptor.Adaptor[Any, Any] | Callable[..., Any] = (
                 self.unsafe_exec_fn()
@@ -352,17 +966,43 @@ from owt import *
                 case _:
                     f = f_parsed
             return f(**self.kwargs)
+        except Rejected:
+            raise
         except Exception as e:
-            t = traceback.format_exc()
-            logging.error(f"Error executing Unsafe code: {e}\n\n{t}")
-            raise RuntimeError(f"Error executing Unsafe code: {e}")
+            logger.exception("Error executing Unsafe code")
+            raise RuntimeError(f"Error executing Unsafe code: {e}") from e
+
+
+type ValidResponse = str | bytes | Response | Iterator[Any] | tuple[str, int]
 
 
-type ValidResponse = str | bytes | Response | types.GeneratorType | tuple[str, int]
+def iter_buffer(buf: bytes | mmap.mmap | memoryview, chunk_size: int = 1024 * 1024):
+    """Stream a buffer in bounded chunks rather than copying it whole onto the heap."""
+    view = memoryview(buf)
+    for i in range(0, len(view), chunk_size):
+        yield bytes(view[i : i + chunk_size])
 
 
-def coerce_response(result: Any) -> ValidResponse:
+def encoded_response(result: Any, fmt: str) -> ValidResponse:
+    try:
+        buffers = formats.encode_result(result, fmt)
+    except Exception as e:
+        logger.warning("Failed to encode result as %s: %s", fmt, e, exc_info=True)
+        return f"Cannot encode result as {fmt}: {e}", 406
+    return Response(
+        itertools.chain.from_iterable(iter_buffer(buf) for buf in buffers),
+        mimetype=formats.RESPONSE_FORMATS[fmt],
+    )
+
+
+def coerce_response(result: Any, fmt: str | None = None) -> ValidResponse:
     match result:
+        case mmap.mmap() | memoryview():
+            return Response(iter_buffer(result), mimetype="application/octet-stream")
+        case _ if formats.is_ndarray(result) or formats.is_numpy_scalar(result):
+            return encoded_response(result, fmt or "json")
+        case list() | dict() if fmt:
+            return encoded_response(result, fmt)
         case (a, b):
             return coerce_response(a), b
         case Response():
@@ -375,16 +1015,26 @@ def coerce_response(result: Any) -> ValidResponse:
             return make_response(str(result))
         case types.GeneratorType():
             return result
+        case types.AsyncGeneratorType():
+            # owt.asgi, and with it asyncio, is only imported once needed.
+            from owt import asgi
+
+            # Streamed from the event loop when served over ASGI.
+            if asgi.LOOP_KEY in request.environ:
+                return asgi.AsyncResponse(result)
+            return asgi.iter_async(result)
         case adaptor.Nullary():
             return make_response("")
         case None:
             return make_response("")
+        case _ if fmt:
+            return encoded_response(result, fmt)
         case _:
             if hasattr(result, "__iter__"):
                 # Catch generators
                 return result
 
-            logging.warning("Returning raw result as JSON")
+            logger.warning("Returning raw result as JSON")
             return make_response(json.dumps(result))
 
 
@@ -395,51 +1045,430 @@ def coerce_response(result: Any) -> ValidResponse:
 def unsafe_exec(path: str | None = None) -> ValidResponse:
     del path
     result = _run_unsafe_exec(request)
-    return coerce_response(result)
+    return coerce_response(result, g.get("response_format"))
 
 
-def _run_unsafe_exec(request: Request) -> Any:
+@app.route("/_owt/stats", methods=["GET"])
+@auth.login_required
+def stats() -> ValidResponse:
+    return make_response(json.dumps(Server.sing().stats()))
+
+
+@app.route("/_owt/ready", methods=["GET"])
+def ready() -> ValidResponse:
+    # Unauthenticated, for load balancer and orchestrator probes.
+    status = Server.sing().warmup_status
+    return make_response(status.to_json(), 200 if status.ready.is_set() else 503)
+
+
+def cache_result(
+    cache: Cache,
+    recordings: LiveRecordings,
+    cache_key: CacheKey,
+    result: Any,
+    cost: float,
+    ttl: float | None,
+) -> Any:
+    """Cache a result and return the value to replay for each response.
+
+    Streams are recorded as they are sent, and cached once complete. Until then they
+    are kept in recordings, so that later requests for the key attach to them.
+    """
+    wrap: Callable[[Recording], Any]
+    match result:
+        case (types.GeneratorType() as source, headers):
+            wrap = lambda recording: (recording, headers)
+        case types.GeneratorType() as source:
+            wrap = lambda recording: recording
+        case types.AsyncGeneratorType() | (types.AsyncGeneratorType(), _):
+            logger.info("Not caching async stream for %s", cache_key)
+            return result
+        case _:
+            if cache.put(cache_key, result, cost=cost, ttl=ttl):
+                logger.info("Cached result for %s", cache_key)
+            return result
+
+    def on_complete(recording: Recording) -> None:
+        # Admitted with the full size and the time taken to generate the whole stream.
+        stream_cost = cost + (recording.elapsed or 0.0)
+        if cache.put(cache_key, live, cost=stream_cost, ttl=ttl):
+            logger.info(
+                "Cached %d recorded chunks for %s", len(recording.chunks), cache_key
+            )
+        # Only now, so that a request for the key finds the stream in one or the other.
+        recordings.remove(cache_key, live)
+
+    def on_error(recording: Recording, e: Exception) -> None:
+        logger.warning("Not caching failed stream for %s: %s", cache_key, e)
+        recordings.remove(cache_key, live)
+
+    live = wrap(Recording(source, on_complete=on_complete, on_error=on_error))
+    recordings.add(cache_key, live)
+    return live
+
+
+def replay(cached: Any) -> Any:
+    """Turn a cached value back into a response, replaying any recorded stream."""
+    match cached:
+        case (Recording() as recording, headers):
+            return iter(recording), headers
+        case Recording() as recording:
+            return iter(recording)
+        case _:
+            return cached
+
+
+@app.route("/_owt/register", methods=["POST"])
+@auth.login_required
+def register() -> ValidResponse:
+    """Register code once, returning the code_hash with which to call it."""
     try:
         unsafe = Unsafe.from_request(request)
     except Exception as e:
+        logger.debug("Invalid request to register", exc_info=True)
         return f"Invalid Unsafe data in request: {e}", 400
+    try:
+        # Compile now, both to report errors early and to keep the adaptor warm.
+        unsafe.unsafe_exec_fn()
+    except Exception as e:
+        logger.debug("Failed to compile registered code", exc_info=True)
+        return f"Error compiling Unsafe code: {e}", 400
+    return make_response(json.dumps({"code_hash": unsafe.code_key.code_hash}))
+
+
+def unknown_code_hash(e: UnknownCodeHash) -> tuple[str, int]:
+    return json.dumps({"error": "unknown_code_hash", "code_hash": e.code_hash}), 404
+
+
+def rejected(e: Rejected) -> Response:
+    return make_response(
+        json.dumps({"error": "rejected", "message": str(e)}),
+        e.status,
+        {"Retry-After": str(e.retry_after)},
+    )
+
+
+def resource(name: str, slots: int = 1) -> Any:
+    """For adaptors: hold one of a named resource's slots while using it.
+
+    e.g. `with resource("parler-model", slots=1): model.generate(...)`
+
+    Each process running adaptors (a server worker, or a pool worker) holds its own
+    slots, so the declared slots are divided between them, with at least one each.
+    """
+    return Server.sing().admission.resource(name, slots)
 
+
+def invalid_request(e: Exception) -> tuple[str, int]:
+    match e:
+        case KwargsTooLarge():
+            return str(e), 413
+        case _:
+            return f"Invalid Unsafe data in request: {e}", 400
+
+
+def _run_unsafe_exec(request: Request) -> Any:
+    try:
+        unsafe = Unsafe.from_request(request)
+    except UnknownCodeHash as e:
+        return unknown_code_hash(e)
+    except Exception as e:
+        return invalid_request(e)
+    g.response_format = negotiate(unsafe.response_format, request.accept_mimetypes)
+
+    cache = Server.sing().cache
     cache_key: CacheKey | None = None
     if unsafe.use_cache:
-        match (unsafe.cache_key_override, unsafe.cache_kwargs):
-            case (cache_key_override, _):
-                cache_key = cache_key_override
-            case (None, False):
-                cache_key = CacheKey(path=request.path)
-            case (None, True):
-                cache_key = CacheKey(path=request.path, kwargs_b64=unsafe.kwargs_b64)
-        logging.info(
+        try:
+            cache_key = CacheKey.of(unsafe, request.path)
+        except Exception as e:
+            logger.debug("Invalid request", exc_info=True)
+            return invalid_request(e)
+        logger.info(
             "Using cache for endpoint %s with key: %s",
             request.path,
             cache_key,
         )
 
-        if cache_key in Server.sing().cache:
-            logging.info("Cache hit; returning for %s", cache_key)
-            return Server.sing().cache[cache_key]
+        if entry := cache.lookup(cache_key):
+            logger.info("Cache hit; returning for %s", cache_key)
+            return replay(entry.value)
         else:
-            logging.info("Cache miss: %s", cache_key)
+            logger.info("Cache miss: %s", cache_key)
+
+    try:
+        # Decode before running, so bad kwargs are reported as such.
+        _ = unsafe.kwargs
+    except Exception as e:
+        logger.debug("Invalid request", exc_info=True)
+        return invalid_request(e)
+
+    admission, scheduler = Server.sing().admission, Server.sing().scheduler
+    code_hash = unsafe.code_key.code_hash
+    sched_class = unsafe.sched_class or request.headers.get("X-Owt-Class") or "default"
+
+    recordings = Server.sing().recordings
+
+    def execute() -> Any:
+        # Checked once leading the flight, as a stream outlives the flight that began it.
+        if cache_key is not None and (live := recordings.get(cache_key)) is not None:
+            logger.info("Attaching to live recording for %s", cache_key)
+            return live
+        with contextlib.ExitStack() as slots:
+            if admission.enabled:
+                slots.enter_context(admission.admit(request.path, code_hash))
+            if scheduler.enabled:
+                slots.enter_context(scheduler.slot(sched_class, code_hash))
+            start = time.perf_counter()
+            if pool := Server.sing().pool:
+                result = unsafe.pool_exec(pool, request)
+            else:
+                result = unsafe.unsafe_exec()
+            if inspect.isawaitable(result):
+                from owt import asgi
+
+                result = asgi.await_result(result, request.environ)
+            if admission.enabled or scheduler.enabled:
+                result = held_until_done(result, slots.pop_all())
+        if cache_key is None:
+            return result
+        cost = time.perf_counter() - start
+        return cache_result(
+            cache, recordings, cache_key, result, cost, unsafe.cache_ttl
+        )
 
     try:
-        result = unsafe.unsafe_exec()
-        if cache_key:
-            Server.sing().cache[cache_key] = result
-            logging.info("Cached result for %s", cache_key)
-        return result
+        if cache_key is None:
+            return execute()
+        # Concurrent misses for the same key share one execution.
+        cached, shared = Server.sing().flights.do(cache_key, execute)
+        if shared:
+            logger.info("Shared in-flight result for %s", cache_key)
+        return replay(cached)
+    except Rejected as e:
+        return rejected(e)
     except Exception as e:
         return f"Error executing Unsafe code: {e}", 500
 
 
+@app.route("/_owt/jobs", methods=["POST"])
+@app.route("/_owt/jobs/<path:path>", methods=["POST"])
+@auth.login_required
+def submit_job(path: str = "") -> ValidResponse:
+    """Run a request as a job at /<path>, returning its id at once.
+
+    The job runs whether or not the client stays connected, and its status and result
+    are then read from /_owt/jobs/<id> and /_owt/jobs/<id>/result.
+    """
+    try:
+        unsafe = Unsafe.from_request(request)
+        _ = unsafe.kwargs
+    except UnknownCodeHash as e:
+        return unknown_code_hash(e)
+    except Exception as e:
+        logger.debug("Invalid request", exc_info=True)
+        return invalid_request(e)
+    data = RequestData.of(request)
+    try:
+        job = Server.sing().jobs.submit(
+            run_job,
+            context=functools.partial(data.context, app, f"/{path}"),
+            response_format=negotiate(unsafe.response_format, request.accept_mimetypes),
+        )
+    except JobQueueFull as e:
+        return make_response(
+            json.dumps({"error": "queue_full", "message": str(e)}),
+            503,
+            {"Retry-After": "1"},
+        )
+    return make_response(
+        json.dumps(job.to_json()), 202, {"Location": f"/_owt/jobs/{job.id}"}
+    )
+
+
+def run_job() -> Any:
+    """Run a job's request, in its rebuilt request context."""
+    from owt import asgi
+
+    result = _run_unsafe_exec(request)
+    match result:
+        case (str() as error, int() as status) if status >= 400:
+            raise RuntimeError(error)
+        case Response() if result.status_code >= 400:
+            raise RuntimeError(result.get_data(as_text=True))
+        case (types.AsyncGeneratorType() as chunks, headers):
+            return asgi.iter_async(chunks), headers
+        case types.AsyncGeneratorType():
+            return asgi.iter_async(result)
+    return result
+
+
+@app.route("/_owt/jobs", methods=["GET"])
+@auth.login_required
+def list_jobs() -> ValidResponse:
+    return make_response(json.dumps(Server.sing().jobs.stats()))
+
+
+@app.route("/_owt/jobs/<job_id>", methods=["GET", "DELETE"])
+@auth.login_required
+def job_status(job_id: str) -> ValidResponse:
+    jobs = Server.sing().jobs
+    job = jobs.cancel(job_id) if request.method == "DELETE" else jobs.get(job_id)
+    if job is None:
+        return json.dumps({"error": "unknown_job", "id": job_id}), 404
+    return make_response(json.dumps(job.to_json()))
+
+
+@app.route("/_owt/jobs/<job_id>/result", methods=["GET"])
+@auth.login_required
+def job_result(job_id: str) -> ValidResponse:
+    """A job's result, or its stream so far and then as it is produced.
+
+    ?wait=<secs> waits up to that long for the job to finish; until it has, a job
+    without a stream gets 202 and its status.
+    """
+    if (job := Server.sing().jobs.get(job_id)) is None:
+        return json.dumps({"error": "unknown_job", "id": job_id}), 404
+    if wait := request.args.get("wait", type=float):
+        job.done.wait(min(wait, 60.0))
+    match job.status:
+        case "failed":
+            return json.dumps(job.to_json()), 500
+        case "cancelled":
+            return json.dumps(job.to_json()), 410
+        case _ if job.recording is not None:
+            chunks = iter(job.recording)
+            return coerce_response(
+                chunks if job.headers is None else (chunks, job.headers)
+            )
+        case "done":
+            return coerce_response(job.result, job.meta.get("response_format"))
+        case _:
+            return make_response(json.dumps(job.to_json()), 202, {"Retry-After": "1"})
+
+
+def mk_cache(args: argparse.Namespace) -> Cache:
+    memory = ResultCache(
+        max_bytes=args.cache_max_bytes,
+        max_entries=args.cache_max_entries,
+        default_ttl=args.cache_ttl,
+        admit_min_secs=args.cache_admit_min_secs,
+        admit_min_bytes=args.cache_admit_min_bytes,
+    )
+    if not args.cache_dir:
+        return memory
+    return TieredCache(
+        memory=memory,
+        disk=DiskCache(root=args.cache_dir, max_bytes=args.cache_dir_max_bytes),
+        spill_min_bytes=args.cache_spill_min_bytes,
+    )
+
+
+def mk_workers(args: argparse.Namespace) -> wsgi.Workers | None:
+    if args.workers <= 0:
+        return None
+    if args.workers > 1 and not args.cache_dir:
+        logger.warning("Cached results are per worker; use --cache-dir to share them")
+    return wsgi.Workers(
+        processes=args.workers,
+        threads=args.threads,
+        timeout=args.worker_timeout,
+        keepalive=args.keepalive,
+        graceful_timeout=args.graceful_timeout,
+    )
+
+
+def mk_admission(args: argparse.Namespace) -> Admission:
+    path_limits = {}
+    for spec in args.path_concurrency:
+        prefix, limit = spec.rsplit("=", 1)
+        path_limits[prefix] = int(limit)
+    return Admission(
+        limit=args.max_concurrency or None,
+        path_limits=path_limits,
+        code_limit=args.code_concurrency or None,
+        max_waiting=args.max_waiting,
+        max_wait_secs=args.max_wait_secs or None,
+        resource_share=max(1, args.workers),
+    )
+
+
+def mk_scheduler(args: argparse.Namespace) -> Scheduler:
+    weights = {}
+    for spec in args.sched_weight:
+        name, weight = spec.rsplit("=", 1)
+        weights[name] = float(weight)
+    return Scheduler(
+        slots=args.sched_slots,
+        weights=weights,
+        max_classes=args.sched_max_classes,
+        max_waiting=args.max_waiting,
+        max_wait_secs=args.max_wait_secs or None,
+    )
+
+
+def mk_objects(args: argparse.Namespace) -> Objects:
+    # Adaptors use the process-wide registry, so it is configured in place.
+    objects.OBJECTS.max_bytes = args.objects_max_bytes or None
+    return objects.OBJECTS
+
+
+def mk_jobs(args: argparse.Namespace) -> Jobs:
+    return Jobs(
+        workers=args.jobs_workers,
+        max_queued=args.jobs_max_queued,
+        retain_secs=args.jobs_retain_secs,
+    )
+
+
+def mk_warmup(args: argparse.Namespace) -> Warmup:
+    warmup = Warmup.load(args.warmup) if args.warmup else Warmup()
+    return warmup.extend(args.preload)
+
+
+def mk_server_warmup(args: argparse.Namespace) -> Warmup | None:
+    """The warmup for server processes to run, if not run by the pool's zygote."""
+    if not (args.warmup or args.preload):
+        return None
+    if args.pool > 0:
+        if not args.zygote:
+            logger.warning("--warmup and --preload need --zygote to warm up --pool")
+        return None
+    return mk_warmup(args)
+
+
+def mk_pool(args: argparse.Namespace) -> Pool | None:
+    if args.pool <= 0:
+        if args.zygote:
+            logger.warning("--zygote has no effect without --pool")
+        return None
+    # Each server process has its own pool.
+    resource_share = args.pool * max(1, args.workers)
+    return Pool(
+        size=args.pool,
+        timeout=args.pool_timeout,
+        spill_secs=args.pool_spill_secs,
+        shm_min_bytes=args.cache_spill_min_bytes,
+        adaptor_cache_size=args.adaptor_cache_size,
+        resource_share=resource_share,
+        zygote=(
+            Zygote(
+                warmup=mk_warmup(args),
+                shm_min_bytes=args.cache_spill_min_bytes,
+                adaptor_cache_size=args.adaptor_cache_size,
+                resource_share=resource_share,
+            )
+            if args.zygote
+            else None
+        ),
+    )
+
+
 def main(port: int | None = None):
     try:
         args = parser.parse_args()
     except argparse.ArgumentError as e:
-        logging.error(f"Error parsing arguments: {e}")
+        logger.error(f"Error parsing arguments: {e}")
         sys.exit(1)
     verbosity = max(
         [level for (level, v) in enumerate([True, args.v, args.vv, args.vvv]) if v]
@@ -449,6 +1478,24 @@ def main(port: int | None = None):
         address=args.address,
         port=port if port else args.port,
         auth=BasicAuth.maybe_single_user(args.auth),
+        adaptor_cache=AdaptorCache(max_size=args.adaptor_cache_size),
+        cache=mk_cache(args),
+        workers=mk_workers(args),
+        asgi_threads=args.asgi_threads if args.asgi else None,
+        pool=mk_pool(args),
+        jobs=mk_jobs(args),
+        admission=mk_admission(args),
+        scheduler=mk_scheduler(args),
+        objects=mk_objects(args),
+        warmup=mk_server_warmup(args),
+        max_kwargs_bytes=args.max_kwargs_bytes or None,
+        mount=(
+            Mount(
+                roots=args.mount, base_globals=globals(), poll_secs=args.mount_poll_secs
+            )
+            if args.mount
+            else None
+        ),
     )
 
 
@@ -1,8 +1,10 @@
 import abc
 import logging
-import copy
 import dataclasses
-from typing import Callable, Concatenate, Any
+from collections.abc import Callable, Sequence
+from typing import Any
+
+logger = logging.getLogger(__name__)
 
 
 class Special: ...
@@ -38,47 +40,47 @@ class PassKWs[U](Special):
 type CallOut[U] = KeepKWs[U] | DropKWs[U] | PassKWs[Any] | Passthrough[U]
 
 
-type OutKW[**T, U] = tuple[U, T.kwargs]
-type Out[**T, U] = (
-    OutKW[T, U] | OutKW[[], U] | OutKW[Concatenate[U, T], U] | OutKW[T, Nullary]
-)
+# An adaptor's value, or Nullary, and the kwargs it passes on: its own kwargs, none, or
+# more. ParamSpec kwargs can only be typed in a signature, so these are a plain dict.
+type Out[U] = tuple[U | Nullary, dict[str, Any]]
+
+
+def resolve[U](out: CallOut[U], kwargs: dict[str, Any]) -> Out[U]:
+    """The value and kwargs an adaptor outputs, given its call() and input kwargs."""
+    match out:
+        case Passthrough(u, new_kwargs):
+            match u:
+                case Nullary():
+                    return Nullary(), new_kwargs
+                case _:
+                    return u, new_kwargs
+        case PassKWs(new_kwargs):
+            if "__last__" not in new_kwargs and "__last__" in kwargs:
+                new_kwargs["__last__"] = kwargs["__last__"]
+            return Nullary(), new_kwargs
+        case KeepKWs(u):
+            return u, {**kwargs, "__last__": u}
+        case DropKWs(u):
+            return u, {"__last__": u}
+        case u:
+            raise ValueError(f"Invalid call() CallOut: {u}")
 
 
 class Adaptor[**T, U](abc.ABC):
-    def __call__(self, **kwargs: T.kwargs) -> Out[T, U]:
-        logging.debug("Calling %s with %s", self, kwargs)
-        match self.call(**kwargs):
-            case Passthrough(u, new_kwargs):
-                logging.debug("Passthrough with: %s, %s", u, new_kwargs)
-                match u:
-                    case Nullary():
-                        return Nullary(), new_kwargs
-                    case _:
-                        return u, new_kwargs
-            case PassKWs(new_kwargs):
-                if "__last__" not in new_kwargs and "__last__" in kwargs:
-                    new_kwargs["__last__"] = kwargs["__last__"]
-                return Nullary(), new_kwargs
-            case KeepKWs(u):
-                new_kwargs = copy.copy(kwargs)
-                new_kwargs["__last__"] = u
-                logging.debug("KeepKWs: %s, %s, %s", self, u, new_kwargs)
-                return u, new_kwargs
-            case DropKWs(u):
-                new_kwargs = {"__last__": u}
-                logging.debug("DropKWs: %s, %s, %s", self, u, new_kwargs)
-                return u, new_kwargs
-            case u:
-                raise ValueError(f"Invalid call() CallOut: {u}")
+    def __call__(self, **kwargs: T.kwargs) -> Out[U]:
+        logger.debug("Calling %s with %s", self, kwargs)
+        out = resolve(self.call(**kwargs), kwargs)
+        logger.debug("%s output: %s, %s", self, *out)
+        return out
 
     @abc.abstractmethod
     def call(self, *, __last__, **kwargs: T.kwargs) -> CallOut[U]: ...
 
     def done(self) -> Callable[T, U]:
         def _run(*args, **kwargs: T.kwargs) -> U:
-            logging.debug("Running %s with %s", self, kwargs)
+            logger.debug("Running %s with %s", self, kwargs)
             u = self.__call__(**kwargs)[0]
-            logging.debug("Result: %s", u)
+            logger.debug("Result: %s", u)
             match u:
                 case Nullary():
                     raise ValueError("Run cannot return Nullary")
@@ -90,17 +92,68 @@ class Adaptor[**T, U](abc.ABC):
     def compose[V](self: "Adaptor[T, U]", other: "Adaptor[[U], V]") -> "Adaptor[T, V]":
         this = self
 
-        logging.debug("Composing %s with %s", this, other)
+        logger.debug("Composing %s with %s", this, other)
 
         class Composed(Adaptor[T, V]):
             def call(self, **kwargs: T.kwargs) -> CallOut[V]:
-                logging.debug("Calling composed with kwargs: %s", kwargs)
+                logger.debug("Calling composed with kwargs: %s", kwargs)
                 u, u_kwargs = this(**kwargs)
-                logging.debug(
+                logger.debug(
                     "Composed intermediate result:\nOut: %s\nKwargs: %s", u, u_kwargs
                 )
                 res = other.call(**u_kwargs)
-                logging.debug("Composed final result: %s", res)
+                logger.debug("Composed final result: %s", res)
                 return res
 
         return Composed()
+
+
+class Pipeline[**T, U](Adaptor[T, U]):
+    """Adaptors composed in turn, run by a loop rather than nested Composed calls.
+
+    Runs as stages[0].compose(stages[1]).compose(...) would: each stage's output
+    is resolved against the pipeline's input kwargs, as each Composed resolves
+    its inner result against its own, and the last stage's call() is returned
+    as the pipeline's. But the depth of the pipeline doesn't add to the stack.
+    """
+
+    def __init__(self, stages: Sequence[Adaptor[..., Any]]) -> None:
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage")
+        self.stages = tuple(stages)
+        self._init, self._last = self.stages[:-1], self.stages[-1]
+
+    def compose[V](self, other: Adaptor[[U], V]) -> "Pipeline[T, V]":
+        # A composed Pipeline resolves its stages against its own input kwargs, so
+        # stays one stage rather than being spliced in.
+        return Pipeline(self.stages + (other,))
+
+    def call(self, **kwargs: T.kwargs) -> CallOut[U]:
+        debug = logger.isEnabledFor(logging.DEBUG)
+        # The next stage's kwargs: base, with __last__ bound over it unless _UNBOUND.
+        # KeepKWs binds its value over the pipeline's kwargs rather than copying
+        # them, as the stage's call copies them into its own kwargs anyway.
+        base, last = kwargs, _UNBOUND
+        for stage in self._init:
+            match out := _call_layered(stage, base, last):
+                case KeepKWs(u):
+                    base, last = kwargs, u
+                case _:
+                    u, base = resolve(out, kwargs)
+                    last = _UNBOUND
+            if debug:
+                logger.debug("%s output: %s", stage, u)
+        return _call_layered(self._last, base, last)
+
+
+_UNBOUND = object()
+
+
+def _call_layered[U](
+    stage: Adaptor[..., U], base: dict[str, Any], last: Any
+) -> CallOut[U]:
+    if last is _UNBOUND:
+        return stage.call(**base)
+    if "__last__" in base:
+        return stage.call(**{**base, "__last__": last})
+    return stage.call(**base, __last__=last)
@@ -1,14 +1,12 @@
 from owt.summat.adaptor import (
     Adaptor,
     CallOut,
-    KeepKWs,
     DropKWs,
     Passthrough,
-    PassKWs,
     Nullary,
 )
 
-from typing import Any, Callable
+from typing import Any, Callable, cast
 
 
 class F[**T, U](Adaptor[T, U]):
@@ -16,9 +14,8 @@ class F[**T, U](Adaptor[T, U]):
         self.f = f
 
     def call(self, **kwargs: T.kwargs) -> CallOut[U]:
-        match list(kwargs.keys()):
-            case ["__last__"]:
-                _in = kwargs["__last__"]
+        match kwargs:
+            case {"__last__": _in} if len(kwargs) == 1:
                 out = self.f(_in)
             case _:
                 try:
@@ -58,24 +55,11 @@ class Cond[**T, U, V](Adaptor[T, U | V]):
         self._else = _else
 
     def call(self, **kwargs: T.kwargs) -> CallOut[U | V]:
-        u: CallOut[U] | CallOut[V]
+        # The branch's result is passed on as it is: its kwargs are its own dict. The
+        # cast only widens its value type, as CallOut is invariant in it.
         if kwargs["__last__"]:
-            u = self._then.call(**kwargs)
-        else:
-            u = self._else.call(**kwargs)
-
-        def merge(u: CallOut[U] | CallOut[V]) -> CallOut[U | V]:
-            match u:
-                case Passthrough(l, kws):
-                    return Passthrough(l, dict(**kws))
-                case KeepKWs(value):
-                    return KeepKWs(value)
-                case DropKWs(value):
-                    return DropKWs(value)
-                case PassKWs(kwargs):
-                    return PassKWs(kwargs)
-
-        return merge(u)
+            return cast("CallOut[U | V]", self._then.call(**kwargs))
+        return cast("CallOut[U | V]", self._else.call(**kwargs))
 
 
 class Fork[**T, U, V](Adaptor[T, tuple[U | Nullary, V | Nullary]]):
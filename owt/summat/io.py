@@ -1,11 +1,9 @@
-from owt.summat.adaptor import Adaptor, CallOut, PassKWs
-from owt.summat.functional import Const, Exec, F
+from owt.summat.adaptor import Adaptor, CallOut, DropKWs, PassKWs
+from owt.summat.functional import Exec, F
 from typing import Any, Callable
 import subprocess
 import sys
 import importlib
-import copy
-from flask import request
 import json
 
 
@@ -20,19 +18,32 @@ class Input[**T](Adaptor[Any, T.kwargs]):
         return PassKWs(kws)
 
 
-class JSONDataSource(Const[Any]):
-    def __init__(self) -> None:
-        super().__init__(json.loads(request.data))
+class JSONDataSource(Adaptor[Any, Any]):
+    """The JSON body of the current request, read when the stage runs."""
 
+    def call(self, **_: Any) -> CallOut[Any]:
+        # Flask is imported on first use, so that importing owt doesn't pay for it.
+        from flask import request
 
-class QuerySource(Const[dict[str, str]]):
-    def __init__(self) -> None:
-        super().__init__(request.args.to_dict())
+        return DropKWs(json.loads(request.data))
 
 
-class PathSource(Const[list[str]]):
-    def __init__(self) -> None:
-        super().__init__(request.path.strip("/").split("/"))
+class QuerySource(Adaptor[Any, dict[str, str]]):
+    """The query parameters of the current request, read when the stage runs."""
+
+    def call(self, **_: Any) -> CallOut[dict[str, str]]:
+        from flask import request
+
+        return DropKWs(request.args.to_dict())
+
+
+class PathSource(Adaptor[Any, list[str]]):
+    """The path segments of the current request, read when the stage runs."""
+
+    def call(self, **_: Any) -> CallOut[list[str]]:
+        from flask import request
+
+        return DropKWs(request.path.strip("/").split("/"))
 
 
 class NameOutput[**T, U](Adaptor[T, U]):
@@ -42,9 +53,9 @@ class NameOutput[**T, U](Adaptor[T, U]):
         self.name = name
 
     def call(self, **kwargs: T.kwargs) -> CallOut[U]:
-        new_kwargs = copy.copy(kwargs)
-        new_kwargs[self.name] = new_kwargs["__last__"]
-        return PassKWs(new_kwargs)
+        # kwargs is this call's own dict, so is passed on without copying.
+        kwargs[self.name] = kwargs["__last__"]
+        return PassKWs(kwargs)
 
 
 class Kwargs[**T, U](Adaptor[T, U]):
@@ -54,9 +65,7 @@ class Kwargs[**T, U](Adaptor[T, U]):
         self.kwargs = kwargs
 
     def call(self, **bindings: T.kwargs) -> CallOut[U]:
-        new_kwargs = copy.copy(self.kwargs)
-        new_kwargs.update(bindings)
-        return PassKWs(new_kwargs)
+        return PassKWs({**self.kwargs, **bindings})
 
 
 class Import[**T, U](Exec[T, U]):
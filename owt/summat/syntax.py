@@ -1,7 +1,8 @@
 from typing import Callable, Sequence, Hashable, Any, Optional
 import io
 import builtins
-from owt.summat.adaptor import Adaptor, Nullary, CallOut
+import threading
+from owt.summat.adaptor import Adaptor, Nullary, CallOut, Pipeline
 from owt.summat.functional import (
     F,
     Exec,
@@ -25,7 +26,9 @@ from owt.summat.file import (
 )
 
 
-class InputKwargs[**T]:
+class InputKwargs[**T](threading.local):
+    """Per-thread input kwargs, so a built pipeline can serve concurrent requests."""
+
     def __init__(self, kws: Optional[T.kwargs] = None):
         self.kws = kws
 
@@ -35,11 +38,11 @@ class Owt[**T, U](Adaptor[T, U]):
         self,
         kwargs_cls: type[T.kwargs],
         input_kwargs: InputKwargs[T],
-        op: Adaptor[T, U] | None = None,
+        op: Pipeline[T, U] | None = None,
     ):
         self.kwargs_cls = kwargs_cls
         self.input_kwargs = input_kwargs
-        self.op: Adaptor[T, U] = op or self.mk_input()
+        self.op: Pipeline[T, U] = op or Pipeline([self.mk_input()])
 
     def to[V](self, adaptor: Adaptor[[U], V]) -> "Owt[T, V]":
         op = self.op.compose(adaptor)
@@ -175,7 +178,8 @@ class Owt[**T, U](Adaptor[T, U]):
 
     def call(self, **kwargs: T.kwargs) -> CallOut[U]:
         self.input_kwargs.kws = kwargs
-        run_kwargs = self.kwargs_cls(**kwargs)
+        # kwargs is already a dict of this call's own, unpacked again by op.call.
+        run_kwargs = kwargs if self.kwargs_cls is dict else self.kwargs_cls(**kwargs)
         return self.op.call(**run_kwargs)
 
 
@@ -0,0 +1,187 @@
+import base64
+import dataclasses
+import importlib
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+import types
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from owt.compiler import CodeKey
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, kw_only=True)
+class WarmupAdaptor:
+    """Adaptor code run once with fixed kwargs, to load its models and fill its caches."""
+
+    code_b64: str
+    fn_name: str = "run"
+    kwargs: dict[str, Any] = dataclasses.field(default_factory=dict)
+
+    # The request path to run under, for adaptors that read it.
+    path: str = "/"
+
+    # For logging.
+    name: str = ""
+
+    @property
+    def code_hash(self) -> str:
+        return CodeKey.of(self.code_b64, self.fn_name).code_hash
+
+    @classmethod
+    def from_dict(cls, d: dict[str, Any], root: str = ".") -> "WarmupAdaptor":
+        """From a config entry giving code inline as "code" or as a "file" path."""
+        match d:
+            case {"file": str(file)}:
+                path = os.path.join(root, file)
+                with open(path, "rb") as f:
+                    code_b64 = base64.b64encode(f.read()).decode("utf-8")
+                name = d.get("name", file)
+            case {"code": str(code)}:
+                code_b64 = base64.b64encode(code.encode("utf-8")).decode("utf-8")
+                name = d.get("name", "")
+            case _:
+                raise ValueError(f"Warmup adaptor needs code or file: {d}")
+        return cls(
+            code_b64=code_b64,
+            fn_name=d.get("fn_name", "run"),
+            kwargs=d.get("kwargs", {}),
+            path=d.get("path", "/"),
+            name=name,
+        )
+
+
+@dataclass(frozen=True, kw_only=True)
+class Warmup:
+    """Modules to import and adaptors to run before serving.
+
+    Loaded from a JSON file of the form:
+
+        {
+            "modules": ["torch", "owt.lib.parler"],
+            "adaptors": [
+                {"file": "parler.py", "kwargs": {"text": "Hello"}, "path": "/tts"},
+                {"code": "def run(): ...", "fn_name": "run"}
+            ]
+        }
+
+    where adaptor files are relative to the config file.
+    """
+
+    modules: list[str] = dataclasses.field(default_factory=list)
+    adaptors: list[WarmupAdaptor] = dataclasses.field(default_factory=list)
+
+    @classmethod
+    def load(cls, path: str) -> "Warmup":
+        with open(path) as f:
+            config = json.load(f)
+        root = os.path.dirname(path)
+        return cls(
+            modules=config.get("modules", []),
+            adaptors=[
+                WarmupAdaptor.from_dict(a, root) for a in config.get("adaptors", [])
+            ],
+        )
+
+    def extend(self, modules: list[str]) -> "Warmup":
+        return dataclasses.replace(self, modules=self.modules + modules)
+
+    @property
+    def code_hashes(self) -> set[str]:
+        return {a.code_hash for a in self.adaptors}
+
+    def run(
+        self, record: Callable[[str, float], None] | None = None
+    ) -> dict[str, float]:
+        """Import the modules and run the adaptors, returning the seconds each step took.
+
+        Each step and its seconds are also passed to record as the step completes, if
+        given. Needs a Server to compile adaptors into, and raises if any step fails.
+        """
+        timings: dict[str, float] = {}
+        for module in self.modules:
+            step = f"import {module}"
+            start = time.perf_counter()
+            importlib.import_module(module)
+            timings[step] = elapsed = time.perf_counter() - start
+            if record:
+                record(step, elapsed)
+            logger.info("Warmup imported %s in %.3fs", module, elapsed)
+        for i, adaptor in enumerate(self.adaptors):
+            name = adaptor.name or f"adaptor {i}"
+            step = f"run {name}"
+            start = time.perf_counter()
+            run_adaptor(adaptor)
+            timings[step] = elapsed = time.perf_counter() - start
+            if record:
+                record(step, elapsed)
+            logger.info("Warmup ran %s in %.3fs", name, elapsed)
+        return timings
+
+
+@dataclass(kw_only=True)
+class WarmupStatus:
+    """Progress of a server process's warmup, reported by /_owt/ready.
+
+    Steps are recorded by the warmup thread while request threads report them, so the
+    timings are only read and written under the lock.
+    """
+
+    ready: threading.Event = dataclasses.field(default_factory=threading.Event)
+    error: str | None = None
+    # Seconds taken by each step completed so far.
+    _secs: dict[str, float] = dataclasses.field(default_factory=dict)
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+
+    def record(self, step: str, secs: float) -> None:
+        with self._lock:
+            self._secs[step] = secs
+
+    def update(self, timings: dict[str, float]) -> None:
+        with self._lock:
+            self._secs.update(timings)
+
+    @property
+    def secs(self) -> dict[str, float]:
+        """A copy of the timings so far, safe to serialize while warmup runs."""
+        with self._lock:
+            return dict(self._secs)
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "ready": self.ready.is_set(),
+                "warmup_secs": self.secs,
+                "error": self.error,
+            }
+        )
+
+
+def run_adaptor(adaptor: WarmupAdaptor) -> Any:
+    """Run an adaptor as if requested, consuming any stream it returns."""
+    from owt.asgi import await_result, iter_async
+    from owt.server import Unsafe, app
+
+    with app.test_request_context(adaptor.path, method="POST"):
+        result = Unsafe(
+            code_b64=adaptor.code_b64,
+            fn_name=adaptor.fn_name,
+            raw_kwargs=adaptor.kwargs,
+        ).unsafe_exec()
+        if inspect.isawaitable(result):
+            result = await_result(result, {})
+        if isinstance(result, tuple) and len(result) == 2:
+            result = result[0]
+        match result:
+            case types.GeneratorType():
+                return list(result)
+            case types.AsyncGeneratorType():
+                return list(iter_async(result))
+        return result
@@ -0,0 +1,98 @@
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, kw_only=True)
+class Workers:
+    """Serving across worker processes rather than with Flask's development server."""
+
+    processes: int = 1
+    threads: int = 1
+
+    # Workers silent for longer than this are restarted (0 to never restart).
+    timeout: int = 120
+
+    # How long to hold idle keep-alive connections open.
+    keepalive: int = 5
+
+    # On restart (SIGHUP) or shutdown, how long workers may finish in-flight requests.
+    graceful_timeout: int = 30
+
+    # gunicorn worker class; threaded workers also support keep-alive, unlike sync workers.
+    worker_class: str = "gthread"
+
+
+def serve(
+    app: Any,
+    address: str,
+    port: int,
+    workers: Workers,
+    on_worker_start: Callable[[], None],
+) -> None:
+    """Prefork-serve a WSGI app with gunicorn, or werkzeug if it is not installed.
+
+    ASGI apps may be served by gunicorn with an ASGI worker_class.
+
+    on_worker_start runs in each worker, since background threads started before
+    forking do not survive into the workers.
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        if workers.worker_class != "gthread":
+            raise RuntimeError(
+                f"{workers.worker_class} workers need gunicorn: "
+                "pip install -r requirements.prod.txt"
+            )
+        serve_werkzeug(app, address, port, workers, on_worker_start)
+        return
+
+    options = {
+        "bind": f"{address}:{port}",
+        "workers": workers.processes,
+        "threads": workers.threads,
+        "worker_class": workers.worker_class,
+        "timeout": workers.timeout,
+        "keepalive": workers.keepalive,
+        "graceful_timeout": workers.graceful_timeout,
+        "post_fork": lambda server, worker: on_worker_start(),
+    }
+
+    class Application(BaseApplication):
+        def load_config(self) -> None:
+            for k, v in options.items():
+                self.cfg.set(k, v)
+
+        def load(self) -> Any:
+            return app
+
+    logger.info(
+        "Serving with gunicorn: %d processes x %d threads",
+        workers.processes,
+        workers.threads,
+    )
+    Application().run()
+
+
+def serve_werkzeug(
+    app: Any,
+    address: str,
+    port: int,
+    workers: Workers,
+    on_worker_start: Callable[[], None],
+) -> None:
+    # werkzeug can fork a process per request or use threads, but not both, and
+    # results cached in memory by a forked process die with it.
+    logger.warning(
+        "gunicorn is not installed (pip install -r requirements.prod.txt); "
+        "falling back to werkzeug"
+    )
+    on_worker_start()
+    if workers.threads > 1 or workers.processes <= 1:
+        app.run(host=address, port=port, threaded=True)
+    else:
+        app.run(host=address, port=port, threaded=False, processes=workers.processes)
@@ -0,0 +1,195 @@
+import dataclasses
+import gc
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import random
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from multiprocessing.reduction import recv_handle, send_handle
+from typing import Any
+
+from owt import pool
+from owt.warmup import Warmup
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(kw_only=True)
+class ForkedProcess:
+    """A worker forked by the zygote, in place of a multiprocessing.Process.
+
+    It is the zygote's child rather than ours, so is watched by pid and not waited on.
+    """
+
+    pid: int
+    exitcode: int | None = None
+
+    def is_alive(self) -> bool:
+        try:
+            os.kill(self.pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            # Exited, and the pid taken by a process we don't own.
+            return False
+        return True
+
+    def kill(self) -> None:
+        try:
+            os.kill(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def join(self, timeout: float | None = 5.0) -> None:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.is_alive():
+            if deadline is not None and time.monotonic() > deadline:
+                return
+            time.sleep(0.01)
+
+
+@dataclass(kw_only=True)
+class Zygote:
+    """A warmed process that forks pool workers, rather than each spawning and warming up.
+
+    The zygote imports the warmup modules and runs the warmup adaptors once. Workers
+    forked from it start with those modules imported and adaptors compiled, sharing the
+    pages that hold them copy-on-write until written. Threads and device handles don't
+    survive fork, so modules that start them on import (e.g. initialising CUDA) should
+    be left for workers to import.
+    """
+
+    warmup: Warmup = dataclasses.field(default_factory=Warmup)
+    shm_min_bytes: int = 1024 * 1024
+    adaptor_cache_size: int = 256
+    resource_share: int = 1
+    starts: int = 0
+    forks: int = 0
+    warmup_secs: dict[str, float] = dataclasses.field(default_factory=dict)
+    _process: Any = None
+    _conn: multiprocessing.connection.Connection | None = None
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+    _context: Any = dataclasses.field(
+        default_factory=lambda: multiprocessing.get_context("spawn")
+    )
+
+    def start(self) -> None:
+        parent, child = self._context.Pipe()
+        self._process = self._context.Process(
+            target=serve_zygote,
+            args=(
+                child,
+                self.warmup,
+                self.shm_min_bytes,
+                self.adaptor_cache_size,
+                self.resource_share,
+            ),
+            daemon=True,
+            name="owt-zygote",
+        )
+        start = time.perf_counter()
+        self._process.start()
+        child.close()
+        self._conn = parent
+        try:
+            message = parent.recv()
+        except EOFError:
+            message = ("error", f"exited with {self._process.exitcode}")
+        match message:
+            case ("ready", timings):
+                self.warmup_secs = timings
+            case ("error", error):
+                self.stop()
+                raise RuntimeError(f"Zygote failed to warm up: {error}")
+        self.starts += 1
+        logger.info(
+            "Zygote %d warm in %.3fs", self._process.pid, time.perf_counter() - start
+        )
+
+    def stop(self) -> None:
+        if self._process and self._process.is_alive():
+            self._process.kill()
+            self._process.join()
+
+    def fork(self, conn: multiprocessing.connection.Connection) -> ForkedProcess:
+        """Fork a pool worker serving the given end of a pipe."""
+        with self._lock:
+            if not self._process.is_alive():
+                logger.warning(
+                    "Restarting zygote: exited with %s", self._process.exitcode
+                )
+                self.start()
+            assert self._conn
+            self._conn.send(("fork",))
+            send_handle(self._conn, conn.fileno(), self._process.pid)
+            match self._conn.recv():
+                case ("forked", pid):
+                    self.forks += 1
+                    return ForkedProcess(pid=pid)
+                case message:
+                    raise RuntimeError(f"Unexpected message from zygote: {message}")
+
+    def stats(self) -> dict[str, Any]:
+        pid = self._process.pid if self._process else None
+        return {
+            "pid": pid,
+            "alive": bool(self._process and self._process.is_alive()),
+            "starts": self.starts,
+            "forks": self.forks,
+            "warmup_secs": self.warmup_secs,
+            "memory": pool.memory(pid) if pid else None,
+        }
+
+
+def serve_zygote(
+    conn: multiprocessing.connection.Connection,
+    warmup: Warmup,
+    shm_min_bytes: int,
+    adaptor_cache_size: int,
+    resource_share: int = 1,
+) -> None:
+    """Warm up, then fork a worker for each pipe end sent until the server goes away."""
+    pool.setup_worker(adaptor_cache_size, resource_share)
+    try:
+        timings = warmup.run()
+    except Exception as e:
+        logger.exception("Zygote warmup failed")
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+        return
+    # Reap workers as they exit, and stop the collector touching (and so copying)
+    # the pages of everything loaded so far.
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    gc.freeze()
+    conn.send(("ready", timings))
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        match message:
+            case ("fork",):
+                fd = recv_handle(conn)
+                pid = os.fork()
+                if pid == 0:
+                    conn.close()
+                    serve_forked(fd, shm_min_bytes)
+                os.close(fd)
+                conn.send(("forked", pid))
+
+
+def serve_forked(fd: int, shm_min_bytes: int) -> None:
+    """Serve as a pool worker in a freshly forked child of the zygote, then exit."""
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    random.seed()
+    code = 0
+    try:
+        pool.worker_loop(multiprocessing.connection.Connection(fd), shm_min_bytes)
+    except BaseException:
+        logger.exception("Forked pool worker failed")
+        code = 1
+    finally:
+        os._exit(code)
@@ -0,0 +1,76 @@
+import gc
+import threading
+
+import pytest
+
+from owt.admission import Admission, Gate, Rejected, held_until_done
+
+
+def test_gate_queues_then_rejects():
+    gate = Gate(name="g", limit=1, max_waiting=1, max_wait_secs=5)
+    gate.acquire()
+    waiter = threading.Thread(target=gate.acquire)
+    waiter.start()
+    while not gate.waiting:
+        pass
+    with pytest.raises(Rejected) as e:
+        gate.acquire()
+    assert (e.value.status, e.value.retry_after) == (429, 1)
+    gate.release(0.1)
+    waiter.join()
+    assert (gate.in_flight, gate.admitted, gate.rejected) == (1, 2, 1)
+
+
+def test_gate_wait_times_out():
+    gate = Gate(name="g", limit=1, max_wait_secs=0.05)
+    gate.acquire()
+    with pytest.raises(Rejected) as e:
+        gate.acquire()
+    assert e.value.status == 503
+    assert gate.stats()["timed_out"] == 1
+
+
+def test_gates_apply_by_path_and_code():
+    admission = Admission(
+        limit=4, path_limits={"/tts": 1, "/tts/bark": 2}, code_limit=2
+    )
+    names = [g.name for g in admission.gates("/tts/bark/x", "ab" * 32)]
+    assert names == ["path:/tts/bark", f"code:{'ab' * 6}", "global"]
+    assert [g.name for g in Admission(limit=1).gates("/other", "")] == ["global"]
+
+
+def test_stream_holds_slots_until_consumed():
+    admission = Admission(limit=1, max_wait_secs=0.01)
+
+    def chunks():
+        yield "a"
+
+    stream = held_until_done(chunks(), admission.admit("/", "0" * 64))
+    with pytest.raises(Rejected):
+        admission.admit("/", "0" * 64)
+    assert list(stream) == ["a"]
+    admission.admit("/", "0" * 64).close()
+    # Dropped without being started.
+    unstarted = held_until_done(chunks(), admission.admit("/", "0" * 64))
+    del unstarted
+    gc.collect()
+    admission.admit("/", "0" * 64).close()
+
+
+def test_resource():
+    admission = Admission(max_wait_secs=0.01)
+    with (
+        admission.resource("model", 1),
+        pytest.raises(Rejected),
+        admission.resource("model", 1),
+    ):
+        pass
+    assert admission.stats()["resource:model"]["admitted"] == 1
+
+
+def test_resource_shared_between_processes():
+    admission = Admission(resource_share=2)
+    admission.resource("gpu", 4)
+    admission.resource("model", 1)
+    stats = admission.stats()
+    assert (stats["resource:gpu"]["limit"], stats["resource:model"]["limit"]) == (2, 1)
@@ -0,0 +1,97 @@
+import asyncio
+import base64
+
+import pytest
+
+from owt import asgi
+from owt.server import Server, app
+
+
+@pytest.fixture(autouse=True, scope="module")
+def init_server():
+    app.config["TESTING"] = True
+    Server.serve(address="127.0.0.1", port=9876, auth=None)
+
+
+async def call(
+    asgi_app: asgi.App, code: str, disconnect: asyncio.Event | None = None
+) -> tuple[int, list[bytes]]:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/asgi",
+        "query_string": b"code_b64=" + base64.b64encode(code.encode()),
+        "headers": [(b"host", b"localhost")],
+    }
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await (disconnect or asyncio.Event()).wait()
+        return {"type": "http.disconnect"}
+
+    status = 0
+    chunks: list[bytes] = []
+
+    async def send(message):
+        nonlocal status
+        match message["type"]:
+            case "http.response.start":
+                status = message["status"]
+            case "http.response.body":
+                chunks.append(message["body"])
+
+    await asgi_app(scope, receive, send)
+    return status, chunks
+
+
+def test_sync_run():
+    asgi_app = asgi.App(flask_app=app, threads=2)
+    status, chunks = asyncio.run(call(asgi_app, "def run():\n    return 'sync'"))
+    assert status == 200
+    assert b"".join(chunks) == b"sync"
+
+
+def test_async_generator_streams_chunks():
+    code = """
+import asyncio
+async def run():
+    for i in range(3):
+        await asyncio.sleep(0)
+        yield str(i)
+"""
+    status, chunks = asyncio.run(call(asgi.App(flask_app=app, threads=2), code))
+    assert status == 200
+    assert [c for c in chunks if c] == [b"0", b"1", b"2"]
+
+
+def test_many_idle_streams_need_no_threads():
+    code = """
+import asyncio
+async def run():
+    yield "start"
+    await asyncio.sleep(3600)
+"""
+    asgi_app = asgi.App(flask_app=app, threads=2)
+
+    async def many() -> list[tuple[int, list[bytes]]]:
+        disconnect = asyncio.Event()
+        calls = [
+            asyncio.ensure_future(call(asgi_app, code, disconnect)) for _ in range(50)
+        ]
+        await asyncio.sleep(0.5)
+        disconnect.set()
+        return await asyncio.wait_for(asyncio.gather(*calls), timeout=5)
+
+    results = asyncio.run(many())
+    assert all(status == 200 and chunks == [b"start"] for status, chunks in results)
+
+
+def test_errors_become_responses():
+    status, _ = asyncio.run(
+        call(asgi.App(flask_app=app, threads=1), "def run(:\n    pass")
+    )
+    assert status == 500
@@ -0,0 +1,67 @@
+import asyncio
+import concurrent.futures
+
+import pytest
+
+from owt.batching import batched, stats
+
+
+def test_concurrent_calls_batched():
+    sizes = []
+
+    @batched(max_size=4, max_wait_ms=200)
+    def double(xs: list[int]) -> list[int]:
+        sizes.append(len(xs))
+        return [x * 2 for x in xs]
+
+    with concurrent.futures.ThreadPoolExecutor(8) as pool:
+        assert list(pool.map(double, range(8))) == [x * 2 for x in range(8)]
+    assert sorted(sizes) == [4, 4]
+    assert stats()["test_concurrent_calls_batched.<locals>.double"]["mean_size"] == 4
+
+
+def test_batches_by_kwargs():
+    calls = []
+
+    @batched(max_size=2, max_wait_ms=200)
+    def label(xs: list[int], prefix: str) -> list[str]:
+        calls.append(prefix)
+        return [f"{prefix}{x}" for x in xs]
+
+    with concurrent.futures.ThreadPoolExecutor(4) as pool:
+        results = [
+            pool.submit(label, x, prefix=prefix) for prefix in "ab" for x in range(2)
+        ]
+        assert [r.result() for r in results] == ["a0", "a1", "b0", "b1"]
+    assert sorted(calls) == ["a", "b"]
+
+
+def test_map_splits_into_batches():
+    @batched(max_size=3, max_wait_ms=0)
+    def sizes(xs: list[int]) -> list[int]:
+        return [len(xs)] * len(xs)
+
+    assert sizes.map(list(range(5))) == [3, 3, 3, 2, 2]
+
+
+def test_errors_reach_every_caller():
+    @batched(max_size=2, max_wait_ms=200)
+    def bad(xs: list[int]) -> list[int]:
+        return []
+
+    with concurrent.futures.ThreadPoolExecutor(2) as pool:
+        futures = [pool.submit(bad, x) for x in range(2)]
+        for future in futures:
+            with pytest.raises(ValueError, match="returned 0 results for 2 items"):
+                future.result()
+
+
+def test_async():
+    @batched(max_size=2, max_wait_ms=200)
+    def inc(xs: list[int]) -> list[int]:
+        return [x + 1 for x in xs]
+
+    async def main():
+        return await asyncio.gather(inc.amap([1]), inc.amap([2]))
+
+    assert asyncio.run(main()) == [[2], [3]]
@@ -0,0 +1,293 @@
+import mmap
+import threading
+import time
+
+import pytest
+
+from owt.cache import (
+    DiskCache,
+    Recording,
+    ResultCache,
+    SingleFlight,
+    StreamAbandoned,
+    TieredCache,
+    sizeof,
+)
+
+
+def test_sizeof_counts_nested_buffers():
+    assert sizeof(b"x" * 1000) >= 1000
+    assert sizeof(("a" * 500, [b"b" * 500])) >= 1000
+    assert sizeof(memoryview(b"x" * 100)) == 100
+
+
+def test_result_cache_hit_and_miss():
+    cache = ResultCache()
+    assert cache.lookup("a") is None
+    assert cache.put("a", "value")
+    assert cache.get("a") == "value"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_result_cache_entry_limit():
+    cache = ResultCache(max_entries=2)
+    for k in "abc":
+        cache.put(k, k)
+    assert len(cache) == 2
+    assert cache.stats()["evictions"] == 1
+
+
+def test_result_cache_byte_budget_evicts_cheapest_per_byte():
+    cache = ResultCache(max_bytes=3000, max_entries=None)
+    cache.put("slow", b"s" * 1000, cost=10.0)
+    cache.put("fast", b"f" * 1000, cost=0.001)
+    cache.put("new", b"n" * 1000, cost=1.0)
+    assert "slow" in cache
+    assert "new" in cache
+    assert "fast" not in cache
+    assert cache.stats()["bytes"] <= 3000
+
+
+def test_result_cache_rejects_oversized():
+    cache = ResultCache(max_bytes=100)
+    assert not cache.put("big", b"x" * 1000)
+    assert cache.stats()["rejections"] == 1
+
+
+def test_result_cache_admission_thresholds():
+    cache = ResultCache(admit_min_secs=0.5, admit_min_bytes=1024)
+    assert not cache.put("tiny_cheap", "x", cost=0.01)
+    assert cache.put("tiny_slow", "x", cost=1.0)
+    assert cache.put("big_cheap", b"x" * 2048, cost=0.01)
+
+
+def test_result_cache_ttl():
+    cache = ResultCache(default_ttl=60)
+    cache.put("short", 1, ttl=0.01)
+    cache.put("long", 2)
+    time.sleep(0.02)
+    assert "short" not in cache
+    assert "long" in cache
+    assert cache.stats()["expirations"] == 1
+
+
+def test_result_cache_on_evict():
+    evicted = []
+    cache = ResultCache(max_entries=1, on_evict=lambda k, e: evicted.append(k))
+    cache.put("a", 1, cost=0.0)
+    cache.put("b", 2, cost=1.0)
+    assert evicted == ["a"]
+
+
+def test_result_cache_on_evict_runs_without_lock():
+    looked_up = []
+
+    def on_evict(key, entry):
+        # Another thread can use the cache while an eviction is handled.
+        t = threading.Thread(target=lambda: looked_up.append(cache.get("b")))
+        t.start()
+        t.join(timeout=1)
+        assert not t.is_alive()
+
+    cache = ResultCache(max_entries=1, on_evict=on_evict)
+    cache.put("a", 1, cost=0.0)
+    cache.put("b", 2, cost=1.0)
+    assert looked_up == [2]
+
+
+def test_recording_replays_and_completes():
+    completed = []
+    recording = Recording(iter([1, None, 3]), on_complete=completed.append)
+    first = iter(recording)
+    assert next(first) == 1
+    # A second consumer attaches mid-stream and drives it to completion.
+    assert list(recording) == [1, None, 3]
+    assert completed == [recording]
+    assert list(first) == [None, 3]
+    assert list(recording) == [1, None, 3]
+
+
+def test_recording_concurrent_consumers_share_one_source():
+    pulled = []
+
+    def source():
+        for i in range(5):
+            pulled.append(i)
+            time.sleep(0.01)
+            yield i
+
+    recording = Recording(source())
+    results: list[list[int]] = []
+    threads = [
+        threading.Thread(target=lambda: results.append(list(recording)))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [[0, 1, 2, 3, 4]] * 4
+    assert pulled == [0, 1, 2, 3, 4]
+
+
+def test_recording_fans_out_errors():
+    errors = []
+
+    def source():
+        yield 1
+        raise ValueError("boom")
+
+    recording = Recording(source(), on_error=lambda r, e: errors.append(e))
+    with pytest.raises(ValueError):
+        list(recording)
+    with pytest.raises(ValueError):
+        list(recording)
+    assert len(errors) == 1
+
+
+def test_recording_closes_abandoned_source():
+    closed = []
+    errors = []
+
+    def source():
+        try:
+            yield from range(10)
+        finally:
+            closed.append(True)
+
+    recording = Recording(source(), on_error=lambda r, e: errors.append(e))
+    first, second = iter(recording), iter(recording)
+    assert (next(first), next(second)) == (0, 0)
+    first.close()
+    # Another consumer is still attached.
+    assert closed == []
+    assert next(second) == 1
+    second.close()
+    assert closed == [True]
+    assert [type(e) for e in errors] == [StreamAbandoned]
+    with pytest.raises(StreamAbandoned):
+        list(recording)
+
+
+def test_disk_cache_persists_bytes_as_mmap(tmp_path):
+    DiskCache(root=str(tmp_path)).put("k", b"payload", cost=1.0)
+    entry = DiskCache(root=str(tmp_path)).lookup("k")
+    assert entry is not None
+    assert isinstance(entry.value, mmap.mmap)
+    assert entry.value[:] == b"payload"
+    assert entry.cost == 1.0
+
+
+def test_disk_cache_numpy_memmap(tmp_path):
+    np = pytest.importorskip("numpy")
+    cache = DiskCache(root=str(tmp_path))
+    cache.put("arr", np.arange(10, dtype=np.float32))
+    value = cache.get("arr")
+    assert isinstance(value, np.memmap)
+    assert value.tolist() == list(range(10))
+
+
+def test_disk_cache_stream_and_pickle(tmp_path):
+    cache = DiskCache(root=str(tmp_path))
+    headers = {"Content-Type": "text/event-stream"}
+    assert not cache.put("live", (Recording(iter([1])), headers))
+    cache.put("stream", (Recording.of(["a", "b"]), headers))
+    cache.put("obj", {"x": [1, 2]})
+    recording, restored_headers = cache.get("stream")
+    assert list(recording) == ["a", "b"]
+    assert restored_headers == headers
+    assert cache.get("obj") == {"x": [1, 2]}
+
+
+def test_disk_cache_ttl_and_budget(tmp_path):
+    cache = DiskCache(root=str(tmp_path), max_bytes=2500)
+    cache.put("short", b"x", ttl=0.01)
+    time.sleep(0.02)
+    assert cache.lookup("short") is None
+    assert cache.stats()["expirations"] == 1
+    for k in ["a", "b", "c"]:
+        cache.put(k, b"x" * 1000)
+        time.sleep(0.01)
+    assert not cache.stored("a")
+    assert cache.stored("b") and cache.stored("c")
+
+
+def test_tiered_cache_spills_and_survives_restart(tmp_path):
+    def mk() -> TieredCache:
+        return TieredCache(
+            memory=ResultCache(max_entries=1),
+            disk=DiskCache(root=str(tmp_path)),
+            spill_min_bytes=100,
+            write_through=False,
+        )
+
+    cache = mk()
+    cache.put("a", "first", cost=1.0)
+    cache.put("b", "second", cost=2.0)
+    assert cache.disk.stored("a")
+    assert cache.get("a") == "first"
+
+    cache.put("big", b"x" * 1000)
+    assert "big" not in cache.memory
+    assert isinstance(cache.get("big"), mmap.mmap)
+
+    restarted = TieredCache(
+        memory=ResultCache(), disk=DiskCache(root=str(tmp_path)), spill_min_bytes=100
+    )
+    assert restarted.get("a") == "first"
+    assert bytes(restarted.get("big")) == b"x" * 1000
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flights = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def slow():
+        calls.append(1)
+        release.wait()
+        return "result"
+
+    results: list[tuple[str, bool]] = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flights.do("k", slow)))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    while flights.stats()["coalesced"] < 3:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join()
+    assert calls == [1]
+    assert sorted(results) == [("result", False)] + [("result", True)] * 3
+    assert flights.in_flight() == 0
+
+
+def test_single_flight_fans_out_errors():
+    flights = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def fail():
+        release.wait()
+        raise ValueError("boom")
+
+    def call():
+        try:
+            flights.do("k", fail)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for t in threads:
+        t.start()
+    while flights.stats()["coalesced"] < 2:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join()
+    assert len(errors) == 3
+    assert len({id(e) for e in errors}) == 1
@@ -0,0 +1,98 @@
+import subprocess
+import sys
+
+import pytest
+
+from owt.compiler import (
+    AdaptorCache,
+    CodeKey,
+    compile_adaptor,
+    parse_adaptor,
+    prelude,
+)
+
+
+@pytest.mark.parametrize(
+    "code, mode",
+    [
+        ("def run(name):\n    return name", "explicit"),
+        ("run = pipe().const(1)", "explicit"),
+        ("from owt.lib.shell import run", "explicit"),
+        ("pipe().const(1)", "implicit"),
+        ("pipe()\n.const(1)\n.f(str)", "implicit"),
+        ("lambda: 1", "implicit"),
+        ("const(1).f(str)", "implicit_terse"),
+        ("json().get('x')", "implicit_terse"),
+        ("path()\n.last()", "implicit_terse"),
+    ],
+)
+def test_parse_adaptor_modes(code: str, mode: str):
+    assert parse_adaptor(code)[0] == mode
+
+
+def test_parse_adaptor_custom_fn_name():
+    assert parse_adaptor("def go():\n    return 1", "go")[0] == "explicit"
+    with pytest.raises(RuntimeError):
+        parse_adaptor("def run():\n    return 1", "go")
+
+
+def test_parse_adaptor_reports_syntax_error_line():
+    with pytest.raises(SyntaxError) as e:
+        parse_adaptor("def run():\n    return 1\n\ndef oops(:\n    pass")
+    assert e.value.lineno == 4
+
+
+def test_compile_adaptor_runs_side_effects_once():
+    calls: list[int] = []
+    code = "calls.append(1)\ndef helper():\n    return 'ok'\ndef run():\n    return helper()"
+    compiled = compile_adaptor(code, CodeKey.of(code), {"calls": calls})
+    assert compiled.mode == "explicit"
+    assert compiled.fn() == "ok"
+    assert calls == [1]
+
+
+def test_compile_adaptor_prelude():
+    code = (
+        "def run():\n"
+        "    return owt.shell.run('echo hi'), owt.lib.shell.run('echo lib'), pipe\n"
+        "def bare():\n"
+        "    return shell.run('echo bare'), lib.shell.run('echo bare lib')"
+    )
+    compiled = compile_adaptor(code, CodeKey.of(code), {})
+    assert compiled.fn()[:2] == (b"hi\n", b"lib\n")
+    bare = compile_adaptor(code, CodeKey.of(code, "bare"), {})
+    assert bare.fn() == (b"bare\n", b"bare lib\n")
+    assert set(prelude()) == {"lib", "owt", "pipe", "shell", "summat", "syntax"}
+
+
+def test_prelude_does_not_import_lib():
+    # In a fresh interpreter, as other tests import owt.lib.
+    code = (
+        "import sys, owt, owt.compiler\n"
+        "owt.compiler.prelude()\n"
+        "print(sorted(m for m in sys.modules if m.startswith('owt.lib')))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    )
+    assert out.stdout.strip() == "[]"
+
+
+def test_compile_adaptor_missing_fn():
+    code = "x = 1"
+    with pytest.raises(RuntimeError):
+        compile_adaptor(code, CodeKey.of(code), {})
+
+
+def test_adaptor_cache_lru():
+    cache = AdaptorCache(max_size=2)
+    compiled = [
+        compile_adaptor(code, CodeKey.of(code), {})
+        for code in ["const(1)", "const(2)", "const(3)"]
+    ]
+    for c in compiled:
+        cache.put(c)
+    assert compiled[0].key not in cache
+    assert cache.get(compiled[2].key) is compiled[2]
+    assert cache.get(compiled[0].key) is None
+    assert cache.stats() == {"size": 2, "max_size": 2, "hits": 1, "misses": 1}
@@ -0,0 +1,79 @@
+import io
+import tempfile
+
+import numpy as np
+import pytest
+
+from owt import formats
+
+
+def test_npy_roundtrip_without_copy():
+    array = np.arange(12, dtype=np.float32).reshape(3, 4)
+    data = formats.encode_npy(array)
+    decoded = formats.decode_npy(data)
+    np.testing.assert_array_equal(decoded, array)
+    assert np.shares_memory(decoded, np.frombuffer(data, dtype=np.uint8))
+
+
+def test_npy_fortran_order():
+    array = np.asfortranarray(np.arange(6).reshape(2, 3))
+    np.testing.assert_array_equal(formats.decode_npy(formats.encode_npy(array)), array)
+
+
+def test_decode_npy_rejects_other_data():
+    with pytest.raises(ValueError):
+        formats.decode_npy(b"RIFF....WAVE")
+
+
+def test_msgpack_roundtrip():
+    pytest.importorskip("msgpack")
+    value = {"audio": b"\x00\x01" * 10, "array": np.ones(3), "text": "hi"}
+    decoded = formats.unpack(formats.pack(value))
+    assert decoded["audio"] == value["audio"]
+    assert decoded["text"] == "hi"
+    np.testing.assert_array_equal(decoded["array"], value["array"])
+
+
+def test_read_part_in_memory():
+    assert formats.read_part(io.BytesIO(b"small")) == b"small"
+
+
+def test_read_part_spooled_to_disk_is_mapped():
+    with tempfile.SpooledTemporaryFile(max_size=4) as spooled:
+        spooled.write(b"larger than max_size")
+        part = formats.read_part(spooled)
+        assert isinstance(part, memoryview)
+        assert part.tobytes() == b"larger than max_size"
+
+
+def test_read_part_npy():
+    stream = io.BytesIO(formats.encode_npy(np.arange(4)))
+    np.testing.assert_array_equal(formats.read_part(stream, formats.NPY), np.arange(4))
+
+
+def test_npy_buffers_share_array_memory():
+    array = np.arange(6, dtype=np.int16).reshape(2, 3)
+    header, data = formats.npy_buffers(array)
+    assert np.shares_memory(np.frombuffer(data, dtype=np.int16), array)
+    decoded = formats.decode(header + bytes(data), formats.NPY)
+    np.testing.assert_array_equal(decoded, array)
+
+
+def test_npy_buffers_non_contiguous():
+    array = np.arange(12).reshape(3, 4)[:, ::2]
+    header, data = formats.npy_buffers(array)
+    np.testing.assert_array_equal(formats.decode_npy(header + bytes(data)), array)
+
+
+def test_arrow_roundtrip():
+    pytest.importorskip("pyarrow")
+    array = np.arange(24, dtype=np.float64).reshape(2, 3, 4)
+    decoded = formats.decode(bytes(formats.encode_arrow(array)), formats.ARROW)
+    np.testing.assert_array_equal(decoded, array)
+    columns = formats.decode_arrow(formats.encode_arrow({"a": [1, 2], "b": [3, 4]}))
+    assert list(columns["a"]) == [1, 2] and list(columns["b"]) == [3, 4]
+
+
+def test_json_default_numpy():
+    value = {"x": np.arange(3), "y": np.float32(0.5)}
+    assert formats.encode_result(value, "json") == [b'{"x": [0, 1, 2], "y": 0.5}']
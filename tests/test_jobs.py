@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+
+from owt.jobs import JobQueueFull, Jobs
+
+
+def test_runs_job():
+    jobs = Jobs(workers=1)
+    job = jobs.submit(lambda: 42, note="x")
+    assert job.done.wait(5)
+    assert (job.status, job.result, job.meta) == ("done", 42, {"note": "x"})
+    assert jobs.get(job.id) is job
+
+
+def test_failed_job():
+    jobs = Jobs(workers=1)
+    job = jobs.submit(lambda: 1 / 0)
+    assert job.done.wait(5)
+    assert job.status == "failed"
+    assert job.error == "ZeroDivisionError: division by zero"
+
+
+def test_stream_recorded_while_running():
+    release = threading.Event()
+
+    def chunks():
+        yield "a"
+        release.wait(5)
+        yield "b"
+
+    jobs = Jobs(workers=1)
+    job = jobs.submit(lambda: (chunks(), {"X-Test": "1"}))
+    reader = None
+    while reader is None:
+        if job.recording is not None:
+            reader = iter(job.recording)
+    assert next(reader) == "a"
+    release.set()
+    assert list(reader) == ["b"]
+    assert job.done.wait(5)
+    assert (job.status, job.headers) == ("done", {"X-Test": "1"})
+
+
+def test_bounded_queue_and_cancel():
+    release = threading.Event()
+    jobs = Jobs(workers=1, max_queued=1)
+    running = jobs.submit(release.wait)
+    while running.status != "running":
+        pass
+    queued = jobs.submit(lambda: "never")
+    with pytest.raises(JobQueueFull):
+        jobs.submit(lambda: "refused")
+    assert jobs.cancel(queued.id).status == "cancelled"
+    assert jobs.cancel(running.id).status == "running"
+    release.set()
+    assert running.done.wait(5)
+    assert (running.status, running.result) == ("cancelled", None)
+    assert jobs.stats()["cancelled"] == 2
+
+
+def test_cancel_stops_stream():
+    produced = []
+
+    def chunks():
+        for i in range(1000):
+            if i == 1:
+                jobs.cancel(job.id)
+            produced.append(i)
+            yield i
+
+    jobs = Jobs(workers=1)
+    job = jobs.submit(chunks)
+    assert job.done.wait(5)
+    assert job.status == "cancelled"
+    # Stopped on receiving the chunk produced after cancelling.
+    assert produced == [0, 1]
+
+
+def test_finished_jobs_expire():
+    jobs = Jobs(workers=1, retain_secs=0)
+    job = jobs.submit(lambda: 1)
+    assert job.done.wait(5)
+    assert jobs.get(job.id) is None
@@ -0,0 +1,56 @@
+import os
+
+from owt.mount import Mount
+
+
+def write(path, code: str, mtime: float) -> None:
+    path.write_text(code)
+    os.utime(path, (mtime, mtime))
+
+
+def test_mount_loads_and_reloads_keeping_warm_state(tmp_path):
+    adaptor = tmp_path / "greet.py"
+    write(
+        adaptor,
+        "models = {}\n__owt_persist__ = ('loads',)\nloads = []\n"
+        "def run(name):\n    loads.append(1)\n    return f'Hello {name}'\n",
+        1000,
+    )
+    (tmp_path / "_private.py").write_text("def run():\n    pass\n")
+    mount = Mount(roots=[str(tmp_path)], poll_secs=0)
+    mount.start()
+    assert mount.lookup("/_private") is None
+    greet = mount.lookup("/greet/extra/segments")
+    assert greet is not None
+    assert greet.fn(name="World") == "Hello World"
+    greet.namespace["models"]["warm"] = True
+
+    write(
+        adaptor,
+        "__owt_persist__ = ('loads',)\nloads = []\n"
+        "def run(name):\n    loads.append(1)\n    return f'Hi {name}, {len(loads)}, {models}'\n",
+        2000,
+    )
+    mount.scan()
+    reloaded = mount.get("greet")
+    assert reloaded is not None
+    assert reloaded.reloads == 1
+    assert reloaded.fn(name="World") == "Hi World, 2, {'warm': True}"
+
+
+def test_mount_keeps_last_good_version_and_unmounts(tmp_path):
+    adaptor = tmp_path / "echo.py"
+    write(adaptor, "def run(x):\n    return x\n", 1000)
+    mount = Mount(roots=[str(tmp_path)], poll_secs=0)
+    mount.scan()
+
+    write(adaptor, "def run(x:\n", 2000)
+    mount.scan()
+    echo = mount.get("echo")
+    assert echo is not None
+    assert echo.fn(x=1) == 1
+    assert echo.error is not None
+
+    adaptor.unlink()
+    mount.scan()
+    assert mount.get("echo") is None
@@ -0,0 +1,119 @@
+import threading
+
+import pytest
+
+from owt.objects import Objects
+
+
+def test_loads_once_under_concurrency():
+    objects = Objects()
+    release = threading.Event()
+    loads = []
+
+    def factory():
+        loads.append(1)
+        release.wait(5)
+        return "model"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(objects.get("k", factory)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert (loads, results) == ([1], ["model"] * 8)
+    [entry] = objects.stats()["objects"]
+    assert (entry["hits"], entry["loading"]) == (7, False)
+
+
+def test_keyed_on_full_config():
+    objects = Objects()
+    a = objects.get(("m", "small", "cpu"), lambda: object())
+    b = objects.get(("m", "large", "cpu"), lambda: object())
+    assert a is not b
+    assert objects.get(("m", "small", "cpu"), lambda: object()) is a
+
+
+def test_evicts_least_recently_used_within_budget():
+    objects = Objects(max_bytes=250)
+    evicted = []
+    for key in "abc":
+        objects.get(key, lambda key=key: key, size=100, on_evict=evicted.append)
+        if key == "b":
+            # a is now more recently used than b.
+            objects.get("a", lambda: "unused")
+    assert evicted == ["b"]
+    assert [o["key"] for o in objects.stats()["objects"]] == ["'a'", "'c'"]
+    assert objects.stats()["total_bytes"] == 200
+    assert objects.evictions == 1
+
+
+def test_objects_in_use_are_not_evicted():
+    objects = Objects(max_bytes=150)
+    with objects.use("a", lambda: "a", size=100) as a:
+        objects.get("b", lambda: "b", size=100)
+        assert a == "a"
+        # Over budget, as both are needed.
+        assert objects.stats()["total_bytes"] == 200
+    assert [o["key"] for o in objects.stats()["objects"]] == ["'b'"]
+
+
+def test_exclusive_use():
+    objects = Objects()
+    inside = []
+
+    def use():
+        with objects.use("k", lambda: "v", exclusive=True):
+            inside.append(1)
+            assert len(inside) == 1
+            inside.pop()
+
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert objects.stats()["objects"][0]["users"] == 0
+
+
+def test_failed_load_is_retried():
+    objects = Objects()
+    with pytest.raises(ZeroDivisionError):
+        objects.get("k", lambda: 1 / 0)
+    assert objects.get("k", lambda: 1) == 1
+    assert objects.loads == 1
+
+
+def test_measures_torch_modules():
+    class Tensor:
+        def numel(self):
+            return 10
+
+        def element_size(self):
+            return 4
+
+    class Module:
+        def parameters(self):
+            return [Tensor(), Tensor()]
+
+        def buffers(self):
+            return [Tensor()]
+
+    objects = Objects()
+    objects.get("k", Module)
+    assert objects.stats()["objects"][0]["bytes"] >= 120
+
+
+def test_discard():
+    objects = Objects()
+    evicted = []
+    with objects.use("a", lambda: "a", on_evict=evicted.append):
+        assert not objects.discard("a")
+    assert objects.discard("a")
+    assert not objects.discard("a")
+    assert evicted == ["a"]
+    assert objects.get("a", lambda: "reloaded") == "reloaded"
@@ -1,15 +1,42 @@
 import base64
+import io
+import dataclasses
+import functools
+import sys
 import unittest.mock
+import owt.admission
+import owt.cache
+import owt.client
+import owt.formats
+import owt.pool
+import owt.server
+from owt.mount import Mount
 from typing import Any, Callable
-from owt.summat.io import Install
+from owt.summat.adaptor import (
+    Adaptor,
+    DropKWs,
+    KeepKWs,
+    Nullary,
+    PassKWs,
+    Passthrough,
+    Pipeline,
+)
+from owt.summat.functional import Cond, Exec, F, Identity
+from owt.summat.io import Install, Kwargs, NameOutput
 from owt import pipe
 from owt.summat.syntax import Owt
 import pytest
+import requests
 import json
 import logging
+import threading
 from flask.testing import FlaskClient
+from owt.scheduler import Scheduler
+from owt.warmup import Warmup, WarmupAdaptor, WarmupStatus
 from owt.server import app, Server, configure_logging
 
+logger = logging.getLogger(__name__)
+
 
 @pytest.fixture
 def client():
@@ -61,7 +88,7 @@ def assert_owt_exec(
     else:
         raise ValueError(f"Unsupported method: {method}")
 
-    logging.info(response.data)
+    logger.info(response.data)
 
     assert response.status_code == 200
     assert response.data.decode() == expected
@@ -360,3 +387,675 @@ def test_raw_pipe() -> None:
     assert p() == (2, {"__last__": 2})
     run: Callable[[Any], int] = p.done()
     assert run(None) == 2
+
+
+class Out(Adaptor[Any, Any]):
+    def __init__(self, out: Callable[..., Any]) -> None:
+        self.out = out
+
+    def call(self, **kwargs: Any) -> Any:
+        return self.out(kwargs)
+
+
+def test_pipeline_matches_composed() -> None:
+    stages = [
+        Kwargs(a=1),
+        Out(lambda kws: KeepKWs(kws.get("a", 0) + 10)),
+        NameOutput("b"),
+        Out(lambda kws: PassKWs({"c": sorted(kws)})),
+        Out(lambda kws: Passthrough(Nullary(), {**kws, "d": 4})),
+        Identity(),
+        Cond(Out(lambda kws: KeepKWs("then")), Identity()),
+        Exec(lambda **kws: None),
+        Out(lambda kws: DropKWs(kws)),
+        Out(lambda kws: KeepKWs(kws["__last__"])),
+        F(lambda **kws: sorted(kws)),
+    ]
+
+    def plain(out: Any) -> Any:
+        # Nullary compares by identity.
+        match out:
+            case Nullary():
+                return Nullary
+            case tuple() | list():
+                return [plain(x) for x in out]
+            case dict():
+                return {k: plain(v) for k, v in out.items()}
+        return out
+
+    for n in range(1, len(stages) + 1):
+        composed = functools.reduce(Adaptor.compose, stages[:n])
+        expected = plain(composed(x=0, __last__=-1))
+        assert plain(Pipeline(stages[:n])(x=0, __last__=-1)) == expected
+
+
+def test_deep_pipe() -> None:
+    p = pipe().const(0)
+    for _ in range(sys.getrecursionlimit() * 2):
+        p = p.f(lambda x: x + 1)
+    assert p.done()(None) == sys.getrecursionlimit() * 2
+
+
+def test_compiled_adaptor_cache(client: FlaskClient):
+    adaptor_cache = Server.sing().adaptor_cache
+    code = """path().last().f(lambda p: f"Cached {p}!")"""
+    hits, misses = adaptor_cache.hits, adaptor_cache.misses
+
+    assert_owt_exec(client, path="/one", expected="Cached one!", code=code)
+    assert_owt_exec(client, path="/two", expected="Cached two!", code=code)
+
+    assert adaptor_cache.misses == misses + 1
+    assert adaptor_cache.hits == hits + 1
+    stats = json.loads(client.get("/_owt/stats").data)
+    assert stats["adaptors"]["hits"] == adaptor_cache.hits
+
+
+def test_use_cache(client: FlaskClient):
+    code = """
+import random
+
+def run():
+    return str(random.random())
+"""
+    params = {"code_b64": base64.b64encode(code.encode()).decode(), "use_cache": "true"}
+    first = client.get("/cached/random", query_string=params).data
+    second = client.get("/cached/random", query_string=params).data
+    uncached = client.get(
+        "/cached/random", query_string={**params, "use_cache": "false"}
+    ).data
+    assert first == second
+    assert uncached != first
+    assert json.loads(client.get("/_owt/stats").data)["cache"]["hits"] >= 1
+
+
+def test_use_cache_keyed_on_fn_name(client: FlaskClient):
+    code = "def one():\n    return '1'\n\ndef two():\n    return '2'"
+    params = {"code_b64": base64.b64encode(code.encode()).decode(), "use_cache": "1"}
+    for _ in range(2):
+        for fn_name, expected in [("one", b"1"), ("two", b"2")]:
+            query_string = {**params, "fn_name": fn_name}
+            assert client.get("/fns", query_string=query_string).data == expected
+
+
+def test_use_cache_replays_stream(client: FlaskClient):
+    code = """
+calls = []
+
+def run():
+    calls.append(1)
+    def chunks():
+        yield f"data: {len(calls)}\\n\\n"
+        yield "data: [DONE]\\n\\n"
+    return chunks(), {"Content-Type": "text/event-stream"}
+"""
+    params = {"code_b64": base64.b64encode(code.encode()).decode(), "use_cache": "1"}
+    # Cached once the first stream is complete.
+    for _ in range(3):
+        response = client.get("/cached/stream", query_string=params)
+        assert response.headers["Content-Type"] == "text/event-stream"
+        assert response.data == b"data: 1\n\ndata: [DONE]\n\n"
+
+
+def test_use_cache_attaches_to_live_stream(client: FlaskClient):
+    code = """
+calls = []
+
+def run():
+    calls.append(1)
+    for i in range(3):
+        yield f"{len(calls)}:{i} "
+"""
+    params = {"code_b64": base64.b64encode(code.encode()).decode(), "use_cache": "1"}
+    attached = Server.sing().recordings.stats()["attached"]
+    first = client.get("/cached/live", query_string=params)
+    assert next(first.response) == b"1:0 "
+    # Arrives mid-stream, so it replays the first chunk and shares the rest.
+    second = client.get("/cached/live", query_string=params)
+    assert second.data == b"1:0 1:1 1:2 "
+    assert b"".join(first.response) == b"1:1 1:2 "
+    assert Server.sing().recordings.stats() == {"live": 0, "attached": attached + 1}
+    # Cached once complete, and never generated again.
+    assert client.get("/cached/live", query_string=params).data == b"1:0 1:1 1:2 "
+
+
+def test_cache_key_includes_code_and_canonical_kwargs(client: FlaskClient):
+    def get(code: str, kwargs: str, **extra: str) -> bytes:
+        params = {
+            "code_b64": base64.b64encode(code.encode()).decode(),
+            "kwargs_b64": base64.b64encode(kwargs.encode()).decode(),
+            "use_cache": "1",
+            "cache_kwargs": "1",
+            **extra,
+        }
+        return client.get("/cached/keys", query_string=params).data
+
+    code = "import random\ndef run(x, y):\n    return f'{x}{y}{random.random()}'"
+    reformatted = "import random\n\n# Same code\ndef run(x,y):\n  return f'{x}{y}{random.random()}'"
+    other = "import random\ndef run(x, y):\n    return f'{y}{x}{random.random()}'"
+
+    first = get(code, '{"x": 1, "y": 2}')
+    assert get(code, "{'y':2,'x':1}") == first
+    assert get(reformatted, '{"x": 1, "y": 2}') == first
+    assert get(other, '{"x": 1, "y": 2}') != first
+    assert get(code, '{"x": 2, "y": 1}') != first
+
+
+def test_cache_key_without_path(client: FlaskClient):
+    code = "import random\ndef run():\n    return str(random.random())"
+    params = {
+        "code_b64": base64.b64encode(code.encode()).decode(),
+        "use_cache": "1",
+        "cache_path": "0",
+    }
+    first = client.get("/cached/a", query_string=params).data
+    assert client.get("/cached/b", query_string=params).data == first
+
+
+def test_cache_keys_sharing_a_prefix_are_stored_apart(tmp_path):
+    # repr shows only a prefix of each hash; the disk cache must not collide on it.
+    a = owt.server.CacheKey(code_hash="0" * 12 + "a" * 52)
+    b = owt.server.CacheKey(code_hash="0" * 12 + "b" * 52)
+    assert repr(a) == repr(b)
+    assert a.digest() != b.digest()
+    cache = owt.cache.DiskCache(root=str(tmp_path))
+    cache.put(a, "a")
+    cache.put(b, "b")
+    assert cache.get(a) == "a"
+    assert cache.get(b) == "b"
+
+
+def test_register_and_call_by_hash(client: FlaskClient):
+    code = "def run(name):\n    return f'Registered {name}!'"
+    code_b64 = base64.b64encode(code.encode()).decode()
+    response = client.post("/_owt/register", json={"code_b64": code_b64})
+    assert response.status_code == 200
+    code_hash = json.loads(response.data)["code_hash"]
+
+    kwargs_b64 = base64.b64encode(b"{'name': 'hash'}").decode()
+    params = {"code_hash": code_hash, "kwargs_b64": kwargs_b64}
+    assert client.get("/by/hash", query_string=params).data == b"Registered hash!"
+    assert client.post("/by/hash", json=params).data == b"Registered hash!"
+
+
+def test_unknown_code_hash(client: FlaskClient):
+    response = client.get("/by/hash", query_string={"code_hash": "0" * 64})
+    assert response.status_code == 404
+    assert json.loads(response.data)["error"] == "unknown_code_hash"
+
+
+def test_register_reports_compile_errors(client: FlaskClient):
+    code_b64 = base64.b64encode(b"def run(:\n    pass").decode()
+    response = client.post("/_owt/register", json={"code_b64": code_b64})
+    assert response.status_code == 400
+
+
+def test_client_falls_back_to_uploading_code(client: FlaskClient):
+    sent: list[dict] = []
+
+    def send(address: str, method: str, data: dict) -> requests.Response:
+        sent.append(data)
+        flask_response = client.post(address, json=data)
+        response = requests.Response()
+        response.status_code = flask_response.status_code
+        response._content = flask_response.data
+        return response
+
+    code = "def run(x):\n    return str(x * 2)"
+    with unittest.mock.patch.object(owt.client, "send", side_effect=send):
+        for _ in range(2):
+            result = owt.client.call_owt(
+                "/client", "POST", code, "{'x': 21}", "run", url_only=False
+            )
+            assert result == b"42"
+    assert ["code_b64" in data for data in sent] == [False, True, False]
+
+
+def test_mounted_adaptor(client: FlaskClient, tmp_path, monkeypatch):
+    (tmp_path / "shout.py").write_text("def run(text):\n    return text.upper()\n")
+    mount = Mount(roots=[str(tmp_path)], poll_secs=0)
+    mount.start()
+    monkeypatch.setattr(
+        owt.server, "_SERVER", dataclasses.replace(Server.sing(), mount=mount)
+    )
+    assert_owt_exec(client, expected="HEY", args={"text": "hey"}, path="/shout")
+
+
+def test_decode_kwargs() -> None:
+    def b64(s: str) -> str:
+        return base64.b64encode(s.encode()).decode()
+
+    assert owt.server.decode_kwargs(b64('{"x": [1, 2]}')) == ({"x": [1, 2]}, "json")
+    assert owt.server.decode_kwargs(b64("{'x': (1, 2)}")) == ({"x": (1, 2)}, "eval")
+    assert owt.server.decode_kwargs(b64('"{\\"x\\": 1}"')) == ({"x": 1}, "json")
+    assert owt.server.decode_kwargs(b64("[1, 2]")) == ({"__last__": [1, 2]}, "json")
+    assert owt.server.decode_kwargs(b64("not kwargs")) == (
+        {"__last__": "not kwargs"},
+        "string",
+    )
+    with pytest.raises(owt.server.KwargsTooLarge):
+        owt.server.decode_kwargs(b64("[" + "1," * 100 + "1]"), max_bytes=100)
+
+
+def test_kwargs_decoded_once(client: FlaskClient):
+    with unittest.mock.patch.object(
+        owt.server, "decode_kwargs", wraps=owt.server.decode_kwargs
+    ) as decode:
+        assert_owt_exec(
+            client,
+            expected="3",
+            args={"x": 1, "y": 2},
+            extra_params={"use_cache": "1", "cache_kwargs": "1"},
+            code="def run(x, y):\n    return str(x + y)",
+        )
+    assert decode.call_count == 1
+    assert Server.sing().stats()["kwargs"]["decodes"]["json"] >= 1
+
+
+def test_kwargs_too_large(client: FlaskClient, monkeypatch):
+    monkeypatch.setattr(
+        owt.server,
+        "_SERVER",
+        dataclasses.replace(Server.sing(), max_kwargs_bytes=16),
+    )
+    params = {
+        "code_b64": base64.b64encode(b"def run(**_):\n    return ''").decode(),
+        "kwargs_b64": base64.b64encode(json.dumps({"x": "y" * 64}).encode()).decode(),
+    }
+    assert client.get("/big", query_string=params).status_code == 413
+
+
+def test_msgpack_body_too_large(client: FlaskClient, monkeypatch):
+    monkeypatch.setattr(
+        owt.server,
+        "_SERVER",
+        dataclasses.replace(Server.sing(), max_kwargs_bytes=16),
+    )
+    # Refused before decoding, so the body need not be valid msgpack.
+    response = client.post(
+        "/big", data=b"\x00" * 64, headers={"Content-Type": "application/msgpack"}
+    )
+    assert response.status_code == 413
+
+
+def test_multipart_body_too_large(client: FlaskClient, monkeypatch):
+    monkeypatch.setattr(
+        owt.server,
+        "_SERVER",
+        dataclasses.replace(Server.sing(), max_kwargs_bytes=1024),
+    )
+    code = "def run(audio):\n    return str(len(audio))"
+    response = client.post(
+        "/big",
+        data={
+            "code_b64": base64.b64encode(code.encode()).decode(),
+            "audio": (io.BytesIO(b"\x00" * 4096), "audio.wav"),
+        },
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 413
+
+
+def test_multipart_binary_kwargs(client: FlaskClient):
+    code = "def run(audio, n):\n    return f'{type(audio).__name__} {len(audio)} {n}'"
+    for size, kind in [(16, "bytes"), (1024 * 1024, "memoryview")]:
+        response = client.post(
+            "/binary",
+            data={
+                "code_b64": base64.b64encode(code.encode()).decode(),
+                "kwargs_b64": base64.b64encode(b'{"n": 1}').decode(),
+                "audio": (io.BytesIO(b"\x00" * size), "audio.wav"),
+            },
+            content_type="multipart/form-data",
+        )
+        assert response.data.decode() == f"{kind} {size} 1"
+
+
+def test_client_binary_kwargs(client: FlaskClient):
+    np = pytest.importorskip("numpy")
+    code = "def run(x, scale):\n    return str(float((x * scale).sum()))"
+    data = {
+        "code_b64": base64.b64encode(code.encode()).decode(),
+        "kwargs_b64": base64.b64encode(b"{'scale': 2}").decode(),
+    }
+    binary_formats = ["multipart"]
+    try:
+        import msgpack  # noqa: F401
+
+        binary_formats.append("msgpack")
+    except ImportError:
+        pass
+    for binary_format in binary_formats:
+        prepared = owt.client.binary_request(
+            "http://localhost/binary", data, {"x": np.arange(4.0)}, binary_format
+        )
+        response = client.post(
+            "/binary", data=prepared.body, headers=dict(prepared.headers)
+        )
+        assert response.data == b"12.0"
+
+
+def test_numpy_result_defaults_to_json(client: FlaskClient):
+    assert_owt_exec(
+        client,
+        expected="[[0, 1], [2, 3]]",
+        code="import numpy as np\ndef run():\n    return np.arange(4).reshape(2, 2)",
+    )
+
+
+def test_response_formats(client: FlaskClient):
+    np = pytest.importorskip("numpy")
+    code = "import numpy as np\ndef run():\n    return np.arange(6.0).reshape(2, 3)"
+    params = {"code_b64": base64.b64encode(code.encode()).decode()}
+    response_formats = ["npy"]
+    for module, response_format in [("msgpack", "msgpack"), ("pyarrow", "arrow")]:
+        try:
+            __import__(module)
+            response_formats.append(response_format)
+        except ImportError:
+            pass
+    for response_format in response_formats:
+        mimetype = owt.formats.RESPONSE_FORMATS[response_format]
+        for response in [
+            client.get("/array", query_string=params, headers={"Accept": mimetype}),
+            client.get(
+                "/array", query_string={**params, "response_format": response_format}
+            ),
+        ]:
+            assert response.mimetype == mimetype
+            decoded = owt.formats.decode(response.data, response.content_type)
+            np.testing.assert_array_equal(decoded, np.arange(6.0).reshape(2, 3))
+
+
+def test_client_decodes_response_formats(client: FlaskClient):
+    np = pytest.importorskip("numpy")
+
+    def send(address: str, method: str, data: dict, *args) -> requests.Response:
+        flask_response = client.post(address, json=data)
+        response = requests.Response()
+        response.status_code = flask_response.status_code
+        response.headers.update(flask_response.headers)
+        response._content = flask_response.data
+        return response
+
+    code = "import numpy as np\ndef run():\n    return np.arange(6.0).reshape(2, 3)"
+    with unittest.mock.patch.object(owt.client, "send", side_effect=send):
+        for response_format in [None, "npy"]:
+            result = owt.client.call_owt(
+                "/array",
+                "POST",
+                code,
+                "{}",
+                "run",
+                url_only=False,
+                response_format=response_format,
+            )
+            np.testing.assert_array_equal(result, np.arange(6.0).reshape(2, 3))
+
+
+def test_unknown_response_format(client: FlaskClient):
+    params = {
+        "code_b64": base64.b64encode(b"def run():\n    return [1]").decode(),
+        "response_format": "xml",
+    }
+    assert client.get("/array", query_string=params).status_code == 400
+
+
+def test_async_run(client: FlaskClient):
+    assert_owt_exec(
+        client,
+        expected="async hello",
+        args={"name": "hello"},
+        code="""
+import asyncio
+async def run(name):
+    await asyncio.sleep(0)
+    return f"async {name}"
+""",
+    )
+
+
+def test_async_generator_stream(client: FlaskClient):
+    assert_owt_exec(
+        client,
+        expected='data: {"i": 0}\n\ndata: {"i": 1}\n\ndata: [DONE]\n\n',
+        code="""
+import asyncio
+from owt.lib import stream
+
+async def events():
+    for i in range(2):
+        await asyncio.sleep(0)
+        yield stream.event(i=i)
+    yield stream.done()
+
+def run():
+    return stream.response(events)
+""",
+    )
+
+
+def test_pool_exec(client: FlaskClient, monkeypatch):
+    pool = owt.pool.Pool(size=1)
+    pool.start()
+    monkeypatch.setattr(
+        owt.server, "_SERVER", dataclasses.replace(Server.sing(), pool=pool)
+    )
+    try:
+        assert_owt_exec(
+            client,
+            expected="pooled 2",
+            args={"x": 1},
+            code="import os\ndef run(x):\n    return f'pooled {x + 1}'",
+        )
+        assert Server.sing().stats()["pool"]["workers"][0]["tasks"] == 1
+    finally:
+        pool.stop()
+
+
+def submit_job(client: FlaskClient, code: str, path: str = "", **kwargs) -> str:
+    response = client.post(
+        f"/_owt/jobs{path}",
+        json={
+            "code_b64": base64.b64encode(code.encode()).decode(),
+            "kwargs_b64": base64.b64encode(json.dumps(kwargs).encode()).decode(),
+        },
+    )
+    assert response.status_code == 202
+    job_id = json.loads(response.data)["id"]
+    assert response.headers["Location"] == f"/_owt/jobs/{job_id}"
+    return job_id
+
+
+def job_result(client: FlaskClient, job_id: str) -> Any:
+    return client.get(f"/_owt/jobs/{job_id}/result", query_string={"wait": 5})
+
+
+def test_job(client: FlaskClient):
+    code = "def run(x):\n    return f'{request.path} {x}'"
+    job_id = submit_job(client, code, path="/render", x=1)
+    assert job_result(client, job_id).data == b"/render 1"
+    assert json.loads(client.get(f"/_owt/jobs/{job_id}").data)["status"] == "done"
+    assert client.get("/_owt/jobs/nope").status_code == 404
+
+
+def test_job_errors(client: FlaskClient):
+    response = client.post("/_owt/jobs", json={"code_b64": "not base64!"})
+    assert response.status_code == 400
+    result = job_result(client, submit_job(client, "def run():\n    return 1 / 0"))
+    assert result.status_code == 500
+    assert "division by zero" in json.loads(result.data)["error"]
+
+
+def test_job_stream(client: FlaskClient):
+    code = "def run():\n    for i in range(3):\n        yield str(i)"
+    assert job_result(client, submit_job(client, code)).data == b"012"
+
+
+def test_client_job(client: FlaskClient):
+    def as_requests(flask_response: Any) -> requests.Response:
+        response = requests.Response()
+        response.status_code = flask_response.status_code
+        response.headers.update(flask_response.headers)
+        response._content = flask_response.data
+        return response
+
+    def send(address: str, method: str, data: dict, *args) -> requests.Response:
+        return as_requests(client.post(address, json=data))
+
+    def get(address: str, params: dict) -> requests.Response:
+        return as_requests(client.get(address, query_string=params))
+
+    with (
+        unittest.mock.patch.object(owt.client, "send", side_effect=send),
+        unittest.mock.patch.object(owt.client.requests, "get", side_effect=get),
+    ):
+        result = owt.client.call_owt(
+            "/jobbed",
+            "GET",
+            "def run(x):\n    return f'{request.path} {x}'",
+            "{'x': 2}",
+            "run",
+            url_only=False,
+            job=True,
+        )
+    assert result == b"/jobbed 2"
+
+
+def test_client_job_timeout():
+    def response(status_code: int, content: bytes = b"") -> requests.Response:
+        r = requests.Response()
+        r.status_code = status_code
+        r._content = content
+        return r
+
+    # A job that never finishes, on a server that answers polls without waiting.
+    polls: list[dict] = []
+    deleted: list[str] = []
+    with (
+        unittest.mock.patch.object(
+            owt.client, "send", return_value=response(202, b'{"id": "j"}')
+        ),
+        unittest.mock.patch.object(
+            owt.client.requests,
+            "get",
+            side_effect=lambda _, params: polls.append(params) or response(202),
+        ),
+        unittest.mock.patch.object(
+            owt.client.requests, "delete", side_effect=deleted.append
+        ),
+        pytest.raises(TimeoutError),
+    ):
+        owt.client.run_job(
+            "http://localhost/slow",
+            "GET",
+            {},
+            timeout=0.2,
+            backoff_secs=0.01,
+            max_backoff_secs=0.04,
+        )
+    # Polled with backoff rather than in a busy loop, then cancelled.
+    assert 3 <= len(polls) <= 12
+    assert all(p["wait"] <= 0.2 for p in polls)
+    assert deleted == ["http://localhost/_owt/jobs/j"]
+
+
+def test_admission_rejects_with_retry_after(client: FlaskClient, monkeypatch):
+    admission = owt.admission.Admission(path_limits={"/limited": 1}, max_waiting=0)
+    monkeypatch.setattr(
+        owt.server, "_SERVER", dataclasses.replace(Server.sing(), admission=admission)
+    )
+    code = "def run():\n    for c in 'ab':\n        yield c"
+    params = {"code_b64": base64.b64encode(code.encode()).decode()}
+    streaming = client.get("/limited", query_string=params)
+    rejected = client.get("/limited", query_string=params)
+    assert rejected.status_code == 429
+    assert rejected.headers["Retry-After"] == "1"
+    assert streaming.data == b"ab"
+    streaming.close()
+    assert client.get("/limited", query_string=params).data == b"ab"
+    assert client.get("/unlimited", query_string=params).status_code == 200
+
+
+def test_dropped_cached_stream_releases_slots(client: FlaskClient, monkeypatch):
+    monkeypatch.setattr(
+        owt.server,
+        "_SERVER",
+        dataclasses.replace(
+            Server.sing(),
+            admission=owt.admission.Admission(limit=1, max_wait_secs=1),
+            scheduler=Scheduler(slots=1, max_wait_secs=1),
+        ),
+    )
+    code = "import itertools\ndef run():\n    yield from itertools.repeat('x')"
+    params = {"code_b64": base64.b64encode(code.encode()).decode(), "use_cache": "1"}
+    dropped = client.get("/dropped", query_string=params)
+    assert next(dropped.response) == b"x"
+    dropped.close()
+    code = "def run():\n    return 'admitted'"
+    params = {"code_b64": base64.b64encode(code.encode()).decode()}
+    assert client.get("/admitted", query_string=params).data == b"admitted"
+    stats = Server.sing().stats()
+    assert stats["admission"]["global"]["admitted"] == 2
+    assert (stats["scheduler"]["busy"], stats["scheduler"]["waiting"]) == (0, 0)
+
+
+def test_adaptor_resource(client: FlaskClient):
+    assert_owt_exec(
+        client,
+        expected="held",
+        code="def run():\n    with resource('test-slot', 1):\n        return 'held'",
+    )
+    assert Server.sing().stats()["admission"]["resource:test-slot"]["admitted"] == 1
+
+
+def test_scheduled_classes(client: FlaskClient, monkeypatch):
+    monkeypatch.setattr(
+        owt.server,
+        "_SERVER",
+        dataclasses.replace(Server.sing(), scheduler=Scheduler(slots=1)),
+    )
+    code = "def run():\n    return 'ok'"
+    assert_owt_exec(client, "ok", code=code, extra_params={"sched_class": "batch"})
+    params = {"code_b64": base64.b64encode(code.encode()).decode()}
+    client.get("/sched", query_string=params, headers={"X-Owt-Class": "chat"})
+    classes = Server.sing().stats()["scheduler"]["classes"]
+    assert {name: c["served"] for name, c in classes.items()} == {"batch": 1, "chat": 1}
+
+
+def warm_server(monkeypatch, warmup: Warmup) -> Server:
+    server = dataclasses.replace(
+        Server.sing(), warmup=warmup, warmup_status=WarmupStatus()
+    )
+    monkeypatch.setattr(owt.server, "_SERVER", server)
+    return server
+
+
+def test_ready_after_warmup(client: FlaskClient, monkeypatch):
+    release = threading.Event()
+    code = "import threading\ndef run(release):\n    release.wait(5)"
+    warmup = Warmup(
+        modules=["json"],
+        adaptors=[
+            WarmupAdaptor.from_dict(
+                {"code": code, "name": "wait", "kwargs": {"release": release}}
+            )
+        ],
+    )
+    server = warm_server(monkeypatch, warmup)
+    server.start()
+    resp = client.get("/_owt/ready")
+    assert resp.status_code == 503
+    assert not json.loads(resp.data)["ready"]
+    release.set()
+    assert server.warmup_status.ready.wait(5)
+    resp = client.get("/_owt/ready")
+    assert resp.status_code == 200
+    assert set(json.loads(resp.data)["warmup_secs"]) == {"import json", "run wait"}
+
+
+def test_not_ready_after_failed_warmup(client: FlaskClient, monkeypatch):
+    server = warm_server(monkeypatch, Warmup(modules=["owt.no_such_module"]))
+    server.warm_up()
+    resp = client.get("/_owt/ready")
+    assert resp.status_code == 503
+    assert "No module named" in json.loads(resp.data)["error"]
@@ -0,0 +1,86 @@
+import base64
+import gc
+import mmap
+
+import pytest
+
+from owt.pool import Pool, RequestData, Task, WorkerCrashed
+
+
+def task(code: str, path: str = "/pool", **kwargs) -> Task:
+    return Task(
+        code_b64=base64.b64encode(code.encode()).decode(),
+        fn_name="run",
+        kwargs=kwargs,
+        request=RequestData(
+            method="GET", path=path, query_string=b"", headers=[], body=b""
+        ),
+    )
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = Pool(size=2, timeout=5.0, shm_min_bytes=1024)
+    pool.start()
+    yield pool
+    pool.stop()
+
+
+def test_runs_with_affinity(pool: Pool):
+    pid = "import os\ndef run(x):\n    return (os.getpid(), x)"
+    first, x = pool.run(task(pid, x=1), "a" * 64)
+    assert x == 1
+    assert pool.run(task(pid, x=2), "a" * 64)[0] == first
+
+
+def test_request_is_rebuilt(pool: Pool):
+    assert (
+        pool.run(task("path().f(lambda p: p[0].upper())", path="/hi"), "b" * 64) == "HI"
+    )
+
+
+def test_stream(pool: Pool):
+    code = "def run():\n    for i in range(3):\n        yield str(i)"
+    assert list(pool.run(task(code), "c" * 64)) == ["0", "1", "2"]
+
+
+def test_abandoned_stream_releases_worker(pool: Pool):
+    code = "def run():\n    while True:\n        yield 'x'"
+    chunks = pool.run(task(code), "d" * 64)
+    assert next(chunks) == "x"
+    chunks.close()
+    unstarted = pool.run(task(code), "d" * 64)
+    del unstarted
+    gc.collect()
+    assert pool.run(task("def run():\n    return 'free'"), "d" * 64) == "free"
+
+
+def test_large_results_mapped(pool: Pool):
+    result = pool.run(task("def run():\n    return b'x' * 4096"), "e" * 64)
+    assert isinstance(result, mmap.mmap)
+    assert result[:] == b"x" * 4096
+
+
+def test_errors(pool: Pool):
+    with pytest.raises(RuntimeError, match="division by zero"):
+        pool.run(task("def run():\n    return 1 / 0"), "f" * 64)
+
+
+def test_crashed_worker_restarts(pool: Pool):
+    restarts = sum(w["restarts"] for w in pool.stats()["workers"])
+    with pytest.raises(WorkerCrashed):
+        pool.run(task("import os\ndef run():\n    os._exit(1)"), "0" * 64)
+    assert pool.run(task("def run():\n    return 'ok'"), "0" * 64) == "ok"
+    assert sum(w["restarts"] for w in pool.stats()["workers"]) == restarts + 1
+
+
+def test_timeout_restarts_worker():
+    pool = Pool(size=1, timeout=0.5)
+    pool.start()
+    try:
+        with pytest.raises(TimeoutError):
+            pool.run(task("import time\ndef run():\n    time.sleep(10)"), "1" * 64)
+        assert pool.run(task("def run():\n    return 'ok'"), "1" * 64) == "ok"
+        assert pool.stats()["workers"][0]["restarts"] == 1
+    finally:
+        pool.stop()
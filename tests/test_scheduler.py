@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+
+from owt.admission import Rejected
+from owt.scheduler import Scheduler
+
+
+def queue_up(sched: Scheduler, requests: list[tuple[str, str]]) -> list[str]:
+    """Queue requests behind a held slot, then release it and return the grant order."""
+    order: list[str] = []
+    holder = sched.acquire("holder", "hold")
+
+    def run(name: str, cost_key: str) -> None:
+        with sched.slot(name, cost_key):
+            order.append(name)
+
+    threads = [threading.Thread(target=run, args=r) for r in requests]
+    for i, thread in enumerate(threads):
+        thread.start()
+        while len(sched._heap) <= i:
+            time.sleep(0.001)
+    sched.release(holder, "hold", 0.0)
+    for thread in threads:
+        thread.join()
+    return order
+
+
+def test_quick_calls_overtake_queued_long_ones():
+    sched = Scheduler(slots=1)
+    sched._learn("tts", 5.0)
+    sched._learn("echo", 0.01)
+    order = queue_up(sched, [("bulk", "tts")] * 3 + [("interactive", "echo")])
+    assert order[0] == "interactive"
+
+
+def test_slots_shared_by_weight():
+    sched = Scheduler(slots=1, weights={"heavy": 2.0})
+    sched._learn("x", 1.0)
+    order = queue_up(sched, [("light", "x"), ("heavy", "x")] * 6)
+    assert order[:6].count("heavy") == 4
+    stats = sched.stats()
+    assert stats["classes"]["heavy"]["served"] == 6
+    assert stats["classes"]["light"]["latency_secs"]["p99"] is not None
+
+
+def test_bounded_queue():
+    sched = Scheduler(slots=1, max_waiting=0)
+    holder = sched.acquire("a", "x")
+    with pytest.raises(Rejected) as e:
+        sched.acquire("b", "x")
+    assert e.value.status == 429
+    sched.release(holder, "x", 0.1)
+    sched.release(sched.acquire("b", "x"), "x", 0.1)
+
+
+def test_wait_timeout():
+    sched = Scheduler(slots=1, max_wait_secs=0.01)
+    sched.acquire("a", "x")
+    with pytest.raises(Rejected) as e:
+        sched.acquire("b", "x")
+    assert e.value.status == 503
+    assert sched.stats()["waiting"] == 0
+
+
+def test_classes_bounded():
+    sched = Scheduler(slots=1, weights={"chat": 2.0}, max_classes=2)
+    for name in ["a", "b", "c", "chat"]:
+        sched.release(sched.acquire(name, "x"), "x", 0.1)
+    classes = sched.stats()["classes"]
+    assert {name: c["served"] for name, c in classes.items()} == {
+        "a": 1,
+        "b": 1,
+        "default": 1,
+        "chat": 1,
+    }
@@ -0,0 +1,22 @@
+import builtins
+import unittest.mock
+
+from owt import wsgi
+
+
+def test_falls_back_to_werkzeug(monkeypatch):
+    real_import = builtins.__import__
+
+    def no_gunicorn(name, *args, **kwargs):
+        if name.startswith("gunicorn"):
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", no_gunicorn)
+    app = unittest.mock.Mock()
+    started = unittest.mock.Mock()
+    wsgi.serve(app, "127.0.0.1", 9876, wsgi.Workers(processes=4), started)
+    started.assert_called_once()
+    app.run.assert_called_once_with(
+        host="127.0.0.1", port=9876, threaded=False, processes=4
+    )
@@ -0,0 +1,90 @@
+import base64
+import json
+import os
+
+import pytest
+
+from owt.pool import Pool, RequestData, Task, WorkerCrashed, memory
+from owt.warmup import Warmup, WarmupAdaptor
+from owt.zygote import Zygote
+
+WARM = "import json\nWARMED = []\ndef run(x):\n    WARMED.append(x)\n    return len(WARMED)"
+
+
+def task(code: str, **kwargs) -> Task:
+    return Task(
+        code_b64=base64.b64encode(code.encode()).decode(),
+        fn_name="run",
+        kwargs=kwargs,
+        request=RequestData(
+            method="GET", path="/zygote", query_string=b"", headers=[], body=b""
+        ),
+    )
+
+
+@pytest.fixture(scope="module")
+def pool():
+    warmup = Warmup(
+        modules=["json"],
+        adaptors=[WarmupAdaptor.from_dict({"code": WARM, "kwargs": {"x": 0}})],
+    )
+    pool = Pool(size=2, timeout=5.0, zygote=Zygote(warmup=warmup))
+    pool.start()
+    yield pool
+    pool.stop()
+
+
+def test_workers_are_forked_warm(pool: Pool):
+    stats = pool.stats()
+    zygote_pid = stats["zygote"]["pid"]
+    assert stats["zygote"]["forks"] == 2
+    assert set(stats["zygote"]["warmup_secs"]) == {"import json", "run adaptor 0"}
+    for worker in stats["workers"]:
+        assert worker["pid"] != zygote_pid
+        assert worker["spawn_secs"] is not None
+        assert worker["codes"] == 1
+    # The warmup call's state was inherited: this is the second call in the worker.
+    warm_hash = WarmupAdaptor.from_dict({"code": WARM}).code_hash
+    assert pool.run(task(WARM, x=1), warm_hash) == 2
+
+
+def test_crashed_forked_worker_restarts(pool: Pool):
+    forks = pool.stats()["zygote"]["forks"]
+    with pytest.raises(WorkerCrashed):
+        pool.run(task("import os\ndef run():\n    os._exit(1)"), "0" * 64)
+    assert pool.run(task("def run():\n    return 'ok'"), "0" * 64) == "ok"
+    assert pool.stats()["zygote"]["forks"] == forks + 1
+
+
+def test_failed_warmup():
+    zygote = Zygote(warmup=Warmup(modules=["owt.no_such_module"]))
+    with pytest.raises(RuntimeError, match="No module named"):
+        zygote.start()
+
+
+def test_load_warmup(tmp_path):
+    (tmp_path / "a.py").write_text("def run():\n    return 1")
+    (tmp_path / "warmup.json").write_text(
+        json.dumps(
+            {
+                "modules": ["json"],
+                "adaptors": [
+                    {"file": "a.py", "path": "/a"},
+                    {"code": "lambda x: x", "kwargs": {"x": 1}},
+                ],
+            }
+        )
+    )
+    warmup = Warmup.load(str(tmp_path / "warmup.json")).extend(["os"])
+    assert warmup.modules == ["json", "os"]
+    assert [(a.name, a.path, a.kwargs) for a in warmup.adaptors] == [
+        ("a.py", "/a", {}),
+        ("", "/", {"x": 1}),
+    ]
+    assert len(warmup.code_hashes) == 2
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/smaps_rollup"), reason="Linux only")
+def test_memory():
+    usage = memory(os.getpid())
+    assert usage and usage["rss"] >= usage["pss"] > 0